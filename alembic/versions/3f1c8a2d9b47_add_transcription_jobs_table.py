@@ -0,0 +1,56 @@
+"""add transcription jobs table
+
+Revision ID: 3f1c8a2d9b47
+Revises: ffaf0cc528bf
+Create Date: 2026-10-16 09:12:03.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c8a2d9b47'
+down_revision: Union[str, Sequence[str], None] = 'ffaf0cc528bf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'transcription_jobs',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey(
+            'users.id'), nullable=False),
+        sa.Column('email', sa.String, nullable=False),
+        sa.Column('filename', sa.String, nullable=False),
+        sa.Column('original_filename', sa.String, nullable=True),
+        sa.Column('file_size', sa.Integer, nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False,
+                  server_default='queued'),
+        sa.Column('stage', sa.String(length=32), nullable=True),
+        sa.Column('progress', sa.Float, nullable=False,
+                  server_default=sa.text('0')),
+        sa.Column('timings', sa.JSON, nullable=True),
+        sa.Column('error', sa.Text, nullable=True),
+        sa.Column('user_file_id', sa.Integer, sa.ForeignKey(
+            'user_files.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=True,
+                  server_default=sa.func.now()),
+        sa.Column('started_at', sa.DateTime, nullable=True),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+    )
+    op.create_index('ix_transcription_jobs_user_id',
+                    'transcription_jobs', ['user_id'])
+    op.create_index('ix_transcription_jobs_status',
+                    'transcription_jobs', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_transcription_jobs_status',
+                  table_name='transcription_jobs')
+    op.drop_index('ix_transcription_jobs_user_id',
+                  table_name='transcription_jobs')
+    op.drop_table('transcription_jobs')
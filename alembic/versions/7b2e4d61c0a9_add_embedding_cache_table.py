@@ -0,0 +1,37 @@
+"""add embedding cache table
+
+Revision ID: 7b2e4d61c0a9
+Revises: 3f1c8a2d9b47
+Create Date: 2026-10-16 11:40:27.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4d61c0a9'
+down_revision: Union[str, Sequence[str], None] = '3f1c8a2d9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'embedding_cache',
+        sa.Column('model', sa.String(length=64), primary_key=True),
+        sa.Column('text_hash', sa.String(length=64), primary_key=True),
+        sa.Column('embedding', sa.LargeBinary, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=True,
+                  server_default=sa.func.now()),
+    )
+    op.create_index('ix_embedding_cache_created_at',
+                    'embedding_cache', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_embedding_cache_created_at',
+                  table_name='embedding_cache')
+    op.drop_table('embedding_cache')
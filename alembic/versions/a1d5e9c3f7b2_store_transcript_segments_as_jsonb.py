@@ -0,0 +1,37 @@
+"""store transcript segments as jsonb
+
+Revision ID: a1d5e9c3f7b2
+Revises: f4c8d2a6b1e9
+Create Date: 2026-10-16 19:58:42.660318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d5e9c3f7b2'
+down_revision: Union[str, Sequence[str], None] = 'f4c8d2a6b1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('user_files', 'transcript_segments',
+                        type_=postgresql.JSONB,
+                        postgresql_using='transcript_segments::jsonb')
+    else:
+        op.alter_column('user_files', 'transcript_segments', type_=sa.JSON)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column('user_files', 'transcript_segments',
+                        type_=sa.Text,
+                        postgresql_using='transcript_segments::text')
+    else:
+        op.alter_column('user_files', 'transcript_segments', type_=sa.Text)
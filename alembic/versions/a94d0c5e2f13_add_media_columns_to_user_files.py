@@ -0,0 +1,29 @@
+"""add media columns to user_files
+
+Revision ID: a94d0c5e2f13
+Revises: 7b2e4d61c0a9
+Create Date: 2026-10-16 14:02:51.270336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a94d0c5e2f13'
+down_revision: Union[str, Sequence[str], None] = '7b2e4d61c0a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('user_files', sa.Column('duration', sa.Float, nullable=True))
+    op.add_column('user_files', sa.Column(
+        'media_codec', sa.String, nullable=True))
+
+
+def downgrade():
+    op.drop_column('user_files', 'media_codec')
+    op.drop_column('user_files', 'duration')
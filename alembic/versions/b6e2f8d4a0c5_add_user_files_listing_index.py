@@ -0,0 +1,34 @@
+"""add user files listing index
+
+Revision ID: b6e2f8d4a0c5
+Revises: a1d5e9c3f7b2
+Create Date: 2026-10-16 20:31:19.442907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2f8d4a0c5'
+down_revision: Union[str, Sequence[str], None] = 'a1d5e9c3f7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('user_files', sa.Column(
+        'updated_at', sa.DateTime, nullable=True, server_default=sa.func.now()))
+    # Keyset pagination compares (upload_timestamp, id); NULLs would drop out.
+    op.execute(
+        "UPDATE user_files SET upload_timestamp = '1970-01-01' WHERE upload_timestamp IS NULL")
+    op.create_index('ix_user_files_user_id_upload_timestamp_id',
+                    'user_files', ['user_id', 'upload_timestamp', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_user_files_user_id_upload_timestamp_id',
+                  table_name='user_files')
+    op.drop_column('user_files', 'updated_at')
@@ -0,0 +1,43 @@
+"""add segment patches table
+
+Revision ID: c3f7a9e1d5b8
+Revises: b6e2f8d4a0c5
+Create Date: 2026-10-16 21:07:42.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a9e1d5b8'
+down_revision: Union[str, Sequence[str], None] = 'b6e2f8d4a0c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('user_files', sa.Column(
+        'segments_version', sa.Integer, nullable=False, server_default='0'))
+    op.add_column('user_files', sa.Column(
+        'segments_snapshot_version', sa.Integer, nullable=False, server_default='0'))
+    op.create_table(
+        'segment_patches',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_file_id', sa.Integer,
+                  sa.ForeignKey('user_files.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('version', sa.Integer, nullable=False),
+        sa.Column('ops', sa.JSON, nullable=False),
+        sa.Column('email', sa.String, nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=True),
+        sa.UniqueConstraint('user_file_id', 'version',
+                            name='uq_segment_patches_user_file_id_version'),
+    )
+
+
+def downgrade():
+    op.drop_table('segment_patches')
+    op.drop_column('user_files', 'segments_snapshot_version')
+    op.drop_column('user_files', 'segments_version')
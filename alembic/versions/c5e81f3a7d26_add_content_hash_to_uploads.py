@@ -0,0 +1,36 @@
+"""add content hash to uploads
+
+Revision ID: c5e81f3a7d26
+Revises: a94d0c5e2f13
+Create Date: 2026-10-16 16:25:10.551872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e81f3a7d26'
+down_revision: Union[str, Sequence[str], None] = 'a94d0c5e2f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('user_files', sa.Column(
+        'content_sha256', sa.String(length=64), nullable=True))
+    op.add_column('user_files', sa.Column(
+        'engine', sa.String(length=64), nullable=True))
+    op.create_index('ix_user_files_content_sha256',
+                    'user_files', ['content_sha256'])
+    op.add_column('transcription_jobs', sa.Column(
+        'content_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('transcription_jobs', 'content_sha256')
+    op.drop_index('ix_user_files_content_sha256', table_name='user_files')
+    op.drop_column('user_files', 'engine')
+    op.drop_column('user_files', 'content_sha256')
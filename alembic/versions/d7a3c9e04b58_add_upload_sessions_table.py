@@ -0,0 +1,51 @@
+"""add upload sessions table
+
+Revision ID: d7a3c9e04b58
+Revises: c5e81f3a7d26
+Create Date: 2026-10-16 18:03:44.716092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3c9e04b58'
+down_revision: Union[str, Sequence[str], None] = 'c5e81f3a7d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_sessions',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey(
+            'users.id'), nullable=False),
+        sa.Column('original_filename', sa.String, nullable=False),
+        sa.Column('total_size', sa.BigInteger, nullable=False),
+        sa.Column('chunk_size', sa.Integer, nullable=False),
+        sa.Column('expected_sha256', sa.String(length=64), nullable=True),
+        sa.Column('received_chunks', sa.JSON, nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False,
+                  server_default='open'),
+        sa.Column('job_id', sa.String(length=32), sa.ForeignKey(
+            'transcription_jobs.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=True,
+                  server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime, nullable=True,
+                  server_default=sa.func.now()),
+    )
+    op.create_index('ix_upload_sessions_user_id',
+                    'upload_sessions', ['user_id'])
+    op.create_index('ix_upload_sessions_updated_at',
+                    'upload_sessions', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_upload_sessions_updated_at',
+                  table_name='upload_sessions')
+    op.drop_index('ix_upload_sessions_user_id', table_name='upload_sessions')
+    op.drop_table('upload_sessions')
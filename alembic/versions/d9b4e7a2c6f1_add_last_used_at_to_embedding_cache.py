@@ -0,0 +1,37 @@
+"""add last_used_at to embedding cache
+
+Revision ID: d9b4e7a2c6f1
+Revises: c3f7a9e1d5b8
+Create Date: 2026-10-16 23:18:05.642917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4e7a2c6f1'
+down_revision: Union[str, Sequence[str], None] = 'c3f7a9e1d5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('embedding_cache', sa.Column(
+        'last_used_at', sa.DateTime, nullable=True, server_default=sa.func.now()))
+    op.execute("UPDATE embedding_cache SET last_used_at = created_at WHERE created_at IS NOT NULL")
+    # Eviction now goes by last use, not age.
+    op.drop_index('ix_embedding_cache_created_at',
+                  table_name='embedding_cache')
+    op.create_index('ix_embedding_cache_last_used_at',
+                    'embedding_cache', ['last_used_at'])
+
+
+def downgrade():
+    op.drop_index('ix_embedding_cache_last_used_at',
+                  table_name='embedding_cache')
+    op.create_index('ix_embedding_cache_created_at',
+                    'embedding_cache', ['created_at'])
+    op.drop_column('embedding_cache', 'last_used_at')
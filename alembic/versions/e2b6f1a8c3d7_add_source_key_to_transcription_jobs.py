@@ -0,0 +1,31 @@
+"""add source key to transcription jobs
+
+Revision ID: e2b6f1a8c3d7
+Revises: d7a3c9e04b58
+Create Date: 2026-10-16 18:41:27.309514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6f1a8c3d7'
+down_revision: Union[str, Sequence[str], None] = 'd7a3c9e04b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('transcription_jobs', sa.Column(
+        'source_key', sa.String, nullable=True))
+    op.create_index('ix_transcription_jobs_source_key',
+                    'transcription_jobs', ['source_key'])
+
+
+def downgrade():
+    op.drop_index('ix_transcription_jobs_source_key',
+                  table_name='transcription_jobs')
+    op.drop_column('transcription_jobs', 'source_key')
@@ -0,0 +1,33 @@
+"""make transcription job source_key unique
+
+Revision ID: e5a1c8f3b7d2
+Revises: d9b4e7a2c6f1
+Create Date: 2026-10-16 23:52:41.207385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c8f3b7d2'
+down_revision: Union[str, Sequence[str], None] = 'd9b4e7a2c6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # One job per direct-upload object, even when two completes race.
+    op.drop_index('ix_transcription_jobs_source_key',
+                  table_name='transcription_jobs')
+    op.create_index('ix_transcription_jobs_source_key',
+                    'transcription_jobs', ['source_key'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_transcription_jobs_source_key',
+                  table_name='transcription_jobs')
+    op.create_index('ix_transcription_jobs_source_key',
+                    'transcription_jobs', ['source_key'])
@@ -0,0 +1,34 @@
+"""add timing columns to transcription jobs
+
+Revision ID: f4c8d2a6b1e9
+Revises: e2b6f1a8c3d7
+Create Date: 2026-10-16 19:12:05.184377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c8d2a6b1e9'
+down_revision: Union[str, Sequence[str], None] = 'e2b6f1a8c3d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('transcription_jobs', sa.Column(
+        'audio_duration', sa.Float, nullable=True))
+    op.add_column('transcription_jobs', sa.Column(
+        'real_time_factor', sa.Float, nullable=True))
+    op.create_index('ix_transcription_jobs_finished_at',
+                    'transcription_jobs', ['finished_at'])
+
+
+def downgrade():
+    op.drop_index('ix_transcription_jobs_finished_at',
+                  table_name='transcription_jobs')
+    op.drop_column('transcription_jobs', 'real_time_factor')
+    op.drop_column('transcription_jobs', 'audio_duration')
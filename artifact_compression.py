@@ -0,0 +1,165 @@
+# artifact_compression.py
+
+import threading
+
+from botocore.exceptions import ClientError
+
+from config import settings
+from s3_utils import s3
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ENCODING = "zstd"
+# x-amz-meta-zstd-dict: id of the trained dictionary an object needs.
+DICT_METADATA_KEY = "zstd-dict"
+DICT_PREFIX = "zstd-dicts/"
+CURRENT_DICT_KEY = f"{DICT_PREFIX}segments.current"
+# Tiny, frequently rewritten objects: not worth compressing.
+RAW_SUFFIXES = ("_note.json", "_tag.json")
+
+
+def dictionary_key(dict_id: int) -> str:
+    return f"{DICT_PREFIX}segments-{dict_id}.dict"
+
+
+def artifact_kind(key: str):
+    """
+    "segments", "quiz" or "text" for transcript artifacts that are stored
+    zstd-compressed, None for everything else.
+    """
+    if not key.startswith("transcripts/") or key.endswith(RAW_SUFFIXES):
+        return None
+    if key.endswith("_quiz.json"):
+        return "quiz"
+    if key.endswith(".json"):
+        return "segments"
+    if key.endswith(".txt"):
+        return "text"
+    return None
+
+
+class _Dictionaries:
+    """
+    Trained zstd dictionaries for segment JSON, fetched from S3 by id and
+    kept for the life of the process (a dictionary never changes once
+    published; training a new one gives it a new id).
+    """
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+        self._by_id = {}
+        self._current = None
+        self._current_loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, dict_id: int):
+        with self._lock:
+            dictionary = self._by_id.get(dict_id)
+        if dictionary is None:
+            data = self.client.get_object(
+                Bucket=self.bucket, Key=dictionary_key(dict_id))["Body"].read()
+            dictionary = zstandard.ZstdCompressionDict(data)
+            dictionary.precompute_compress(level=settings.artifact_zstd_level)
+            with self._lock:
+                self._by_id[dict_id] = dictionary
+        return dictionary
+
+    def current(self):
+        """Dictionary new segment artifacts are compressed with, or None if none was trained."""
+        if not self._current_loaded:
+            try:
+                dict_id = int(self.client.get_object(
+                    Bucket=self.bucket, Key=CURRENT_DICT_KEY)["Body"].read())
+                self._current = self.get(dict_id)
+            except (ClientError, ValueError):
+                self._current = None
+            self._current_loaded = True
+        return self._current
+
+    def publish(self, dictionary) -> int:
+        """Upload a trained dictionary and make it the one writers use."""
+        dict_id = dictionary.dict_id()
+        self.client.put_object(Bucket=self.bucket, Key=dictionary_key(dict_id),
+                               Body=dictionary.as_bytes(), ContentType="application/octet-stream")
+        self.client.put_object(Bucket=self.bucket, Key=CURRENT_DICT_KEY,
+                               Body=str(dict_id).encode("ascii"), ContentType="text/plain")
+        dictionary.precompute_compress(level=settings.artifact_zstd_level)
+        with self._lock:
+            self._by_id[dict_id] = dictionary
+            self._current = dictionary
+            self._current_loaded = True
+        return dict_id
+
+
+dictionaries = _Dictionaries(s3, settings.s3_bucket)
+
+
+def train_segments_dictionary(samples, dict_size: int = None):
+    """Train a zstd dictionary from segment JSON bodies (bytes)."""
+    if zstandard is None:
+        raise RuntimeError("Training a dictionary requires the zstandard package.")
+    return zstandard.train_dictionary(
+        dict_size or settings.artifact_dict_size, list(samples),
+        level=settings.artifact_zstd_level)
+
+
+def compress_artifact(key: str, body: bytes):
+    """
+    (body, extra put_object params) for storing `key`. Transcript artifacts
+    are zstd-compressed, segment JSON with the current trained dictionary;
+    anything else, or a body that wouldn't shrink, is returned unchanged.
+    """
+    kind = artifact_kind(key)
+    if not settings.artifact_compression or zstandard is None or kind is None or not body:
+        return body, {}
+    compressed = zstandard.ZstdCompressor(level=settings.artifact_zstd_level).compress(body)
+    dictionary = dictionaries.current() if kind == "segments" else None
+    if dictionary is not None:
+        # The dictionary pays off most on short transcripts; long ones can
+        # do as well without it, so keep whichever frame is smaller.
+        with_dict = zstandard.ZstdCompressor(
+            level=settings.artifact_zstd_level, dict_data=dictionary).compress(body)
+        if len(with_dict) < len(compressed):
+            compressed = with_dict
+        else:
+            dictionary = None
+    if len(compressed) >= len(body):
+        return body, {}
+    extra = {"ContentEncoding": ENCODING}
+    if dictionary is not None:
+        extra["Metadata"] = {DICT_METADATA_KEY: str(dictionary.dict_id())}
+    return compressed, extra
+
+
+def decompress_artifact(body: bytes, content_encoding: str = None) -> bytes:
+    """Original bytes of an object body; legacy uncompressed objects pass through."""
+    if (content_encoding or "").lower() != ENCODING:
+        return body
+    if zstandard is None:
+        raise RuntimeError("Reading zstd-compressed artifacts requires the zstandard package.")
+    dict_id = zstandard.get_frame_parameters(body).dict_id
+    if dict_id:
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionaries.get(dict_id))
+    else:
+        decompressor = zstandard.ZstdDecompressor()
+    return decompressor.decompress(body)
+
+
+def read_object(key: str, client=None, bucket: str = None) -> bytes:
+    """get_object body for `key`, decompressed if it was stored compressed."""
+    obj = (client or s3).get_object(Bucket=bucket or settings.s3_bucket, Key=key)
+    return decompress_artifact(obj["Body"].read(), obj.get("ContentEncoding"))
+
+
+def put_object(key: str, body: bytes, content_type: str, client=None, bucket: str = None, **params):
+    """put_object that compresses transcript artifacts on the way in."""
+    body, extra = compress_artifact(key, body)
+    if "Metadata" in params and "Metadata" in extra:
+        extra["Metadata"] = {**params.pop("Metadata"), **extra["Metadata"]}
+    return (client or s3).put_object(
+        Bucket=bucket or settings.s3_bucket, Key=key, Body=body,
+        ContentType=content_type, **extra, **params)
@@ -0,0 +1,74 @@
+# audio_processing.py
+
+import json
+import subprocess
+
+import numpy as np
+
+# Whisper works on 16 kHz mono audio.
+SAMPLE_RATE = 16000
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".avi", ".webm"}
+
+
+def probe_media(path: str) -> dict:
+    """Read duration and codec details with ffprobe."""
+    command = [
+        "ffprobe", "-v", "error", "-print_format", "json",
+        "-show_format", "-show_streams", path
+    ]
+    try:
+        out = subprocess.run(command, check=True,
+                             capture_output=True, text=True).stdout
+        info = json.loads(out)
+    except (subprocess.CalledProcessError, json.JSONDecodeError, FileNotFoundError) as e:
+        print(f"⚠️ ffprobe failed for {path}: {e}")
+        return {}
+
+    streams = info.get("streams", [])
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    has_video = any(s.get("codec_type") == "video"
+                    and not s.get("disposition", {}).get("attached_pic")
+                    for s in streams)
+    duration = info.get("format", {}).get("duration") or audio.get("duration")
+
+    return {
+        "duration": round(float(duration), 2) if duration else None,
+        "container": info.get("format", {}).get("format_name"),
+        "codec": audio.get("codec_name"),
+        "sample_rate": int(audio["sample_rate"]) if audio.get("sample_rate") else None,
+        "channels": audio.get("channels"),
+        "has_video": has_video,
+    }
+
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode any media file to mono float32 PCM at `sample_rate`, piped
+    straight from ffmpeg so Whisper can skip its own decode step.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-vn", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate), "-"
+    ]
+    try:
+        out = subprocess.run(command, check=True, capture_output=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(
+            f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def encode_playback_audio(input_path: str, output_path: str, bitrate: str = "64k"):
+    """Write a compact mono AAC (.m4a) copy suitable for browser playback."""
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-i", input_path,
+        "-vn", "-ac", "1", "-c:a", "aac", "-b:a", bitrate,
+        "-movflags", "+faststart", output_path
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ FFmpeg error: {e.stderr}")
+        raise
+
@@ -0,0 +1,83 @@
+# backfill_transcripts.py
+#
+# Copy transcript text and segments from S3 into user_files rows that were
+# created before ingestion started storing them in the database.
+#
+#   python backfill_transcripts.py [--batch-size 100] [--workers 8] [--dry-run]
+#
+# Safe to re-run: only rows with an empty transcript_text are touched.
+
+import os
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from database import SessionLocal
+from models import UserFile
+from artifact_compression import read_object
+
+
+def fetch_transcript(filename: str):
+    """(text, segments) for an upload from S3; text is None if missing."""
+    base_name = os.path.splitext(filename)[0]
+    try:
+        text = read_object(f"transcripts/{base_name}.txt").decode("utf-8")
+    except ClientError:
+        return None, None
+    try:
+        segments = json.loads(read_object(f"transcripts/{base_name}.json"))
+    except (ClientError, ValueError):
+        segments = []
+    return text, segments
+
+
+def backfill(batch_size: int = 100, workers: int = 8, dry_run: bool = False):
+    db = SessionLocal()
+    filled = missing = 0
+    last_id = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                rows = db.query(UserFile).filter(
+                    UserFile.transcript_text.is_(None), UserFile.id > last_id
+                ).order_by(UserFile.id).limit(batch_size).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+
+                results = pool.map(fetch_transcript, [r.filename for r in rows])
+                for row, (text, segments) in zip(rows, results):
+                    if text is None:
+                        missing += 1
+                        print(f"⚠️ No transcript in S3 for {row.filename}")
+                        continue
+                    row.transcript_text = text
+                    row.transcript_segments = segments
+                    filled += 1
+
+                if dry_run:
+                    db.rollback()
+                else:
+                    db.commit()
+                print(f"… {filled} filled, {missing} missing (up to id {last_id})")
+    finally:
+        db.close()
+    print(f"✅ Backfill {'checked' if dry_run else 'complete'}: "
+          f"{filled} transcripts stored, {missing} not found in S3.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Copy transcripts from S3 into the user_files table.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Fetch and report without writing")
+    args = parser.parse_args()
+    backfill(args.batch_size, args.workers, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
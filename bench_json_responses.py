@@ -0,0 +1,103 @@
+# bench_json_responses.py
+#
+# Before/after numbers for transcript responses: FastAPI's default path
+# (jsonable_encoder + stdlib JSONResponse) against FastJSONResponse (orjson),
+# and the size/time of each response compression the middleware offers.
+#
+#   python bench_json_responses.py [--db 20] [--files a.json b.json ...]
+#       [--segments 20000] [--repeat 20]
+#
+# Payloads are {"transcript", "segments"} bodies as GET /api/transcript
+# returns them: the largest --db transcripts from user_files, segment JSON
+# files (e.g. from a ZIP export) given with --files, or a synthetic
+# transcript of --segments segments when neither is given.
+
+import json
+import time
+import argparse
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from json_responses import FastJSONResponse
+from compression import CompressionMiddleware
+from bench_segment_store import synthetic_segments
+
+
+def payloads_from_db(limit: int):
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import UserFile
+
+    db = SessionLocal()
+    try:
+        rows = db.query(UserFile.filename, UserFile.transcript_text, UserFile.transcript_segments).filter(
+            UserFile.transcript_text.isnot(None)
+        ).order_by(func.length(UserFile.transcript_text).desc()).limit(limit).all()
+        return [(r.filename, {"transcript": r.transcript_text, "segments": r.transcript_segments or []})
+                for r in rows]
+    finally:
+        db.close()
+
+
+def payloads_from_files(paths):
+    payloads = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            segments = json.load(f)
+        text = " ".join((s.get("text") or "").strip() for s in segments)
+        payloads.append((path, {"transcript": text, "segments": segments}))
+    return payloads
+
+
+def timed(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark JSON rendering and response compression.")
+    parser.add_argument("--db", type=int, default=0,
+                        help="Use the N largest transcripts in the database")
+    parser.add_argument("--files", nargs="*", default=[],
+                        help="Segment JSON files to use as payloads")
+    parser.add_argument("--segments", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = payloads_from_files(args.files)
+    if args.db:
+        payloads += payloads_from_db(args.db)
+    if not payloads:
+        segments = synthetic_segments(args.segments)
+        text = " ".join(s["text"] for s in segments)
+        payloads = [(f"synthetic-{args.segments}", {"transcript": text, "segments": segments})]
+
+    middleware = CompressionMiddleware(None)
+    print(f"{'payload':<28} {'size (KB)':>10} {'stdlib (ms)':>12} {'orjson (ms)':>12} {'speedup':>8}")
+    bodies = []
+    for name, payload in payloads:
+        before, before_time = timed(
+            lambda: JSONResponse(content=jsonable_encoder(payload)).body, args.repeat)
+        after, after_time = timed(
+            lambda: FastJSONResponse(content=payload).body, args.repeat)
+        if json.loads(before) != json.loads(after):
+            print(f"⚠️ {name}: orjson output differs from the stdlib encoder")
+        bodies.append((name, after))
+        print(f"{name[-28:]:<28} {len(after) / 1024:>10.0f} {before_time * 1000:>12.2f} "
+              f"{after_time * 1000:>12.2f} {before_time / after_time:>7.1f}x")
+
+    print(f"\n{'payload':<28} {'coding':<6} {'size (KB)':>10} {'ratio':>7} {'compress (ms)':>14}")
+    for name, body in bodies:
+        for encoding in middleware.encodings:
+            compressed, elapsed = timed(
+                lambda: middleware.compress(encoding, body), args.repeat)
+            print(f"{name[-28:]:<28} {encoding:<6} {len(compressed) / 1024:>10.0f} "
+                  f"{len(body) / len(compressed):>6.1f}x {elapsed * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_parallel_transcription.py
+#
+# Compare single-pass Whisper with windowed parallel transcription.
+#
+#   python bench_parallel_transcription.py sample.mp3 [--reference ref.txt]
+#       [--model base] [--workers 4] [--window 300] [--overlap 5]
+#
+# Reports wall-clock time for each path and word error rate. WER is measured
+# against --reference when given, otherwise parallel is scored against the
+# single-pass output.
+
+import re
+import time
+import argparse
+
+import whisper
+
+from audio_processing import decode_audio, SAMPLE_RATE
+import parallel_transcribe
+
+
+def normalize_words(text: str):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Levenshtein distance over words, divided by reference length."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark single-pass vs parallel Whisper transcription.")
+    parser.add_argument("audio")
+    parser.add_argument("--reference", help="Plain-text reference transcript")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--window", type=float, default=300.0)
+    parser.add_argument("--overlap", type=float, default=5.0)
+    args = parser.parse_args()
+
+    audio = decode_audio(args.audio)
+    duration = len(audio) / SAMPLE_RATE
+    print(f"Audio: {args.audio} ({duration:.1f}s)")
+
+    model = whisper.load_model(args.model)
+    language = parallel_transcribe.detect_language(model, audio)
+
+    start = time.perf_counter()
+    single = model.transcribe(audio, language=language)
+    single_time = time.perf_counter() - start
+    del model
+
+    # Warm the pool so model loading isn't counted as transcription time.
+    workers = args.workers or parallel_transcribe.default_workers()
+    pool = parallel_transcribe.get_pool(args.model, workers)
+    list(pool.map(parallel_transcribe._transcribe_window,
+                  [(audio[:SAMPLE_RATE], 0.0, language)] * workers))
+
+    start = time.perf_counter()
+    parallel = parallel_transcribe.transcribe_parallel(
+        audio, language=language, model_size=args.model, window_seconds=args.window, overlap_seconds=args.overlap)
+    parallel_time = time.perf_counter() - start
+    parallel_transcribe.shutdown_pool()
+
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as f:
+            reference = f.read()
+        single_wer = word_error_rate(reference, single["text"])
+        label = "reference"
+    else:
+        reference = single["text"]
+        single_wer = 0.0
+        label = "single-pass"
+    parallel_wer = word_error_rate(reference, parallel["text"])
+
+    print(f"\n{'path':<10} {'wall (s)':>10} {'RTF':>8} {'WER vs ' + label:>22}")
+    print(f"{'single':<10} {single_time:>10.1f} {single_time / duration:>8.3f} {single_wer:>22.3%}")
+    print(f"{'parallel':<10} {parallel_time:>10.1f} {parallel_time / duration:>8.3f} {parallel_wer:>22.3%}")
+    print(f"\nSpeed-up: {single_time / parallel_time:.2f}x "
+          f"with {workers} workers, {len(parallel['segments'])} segments")
+
+
+if __name__ == "__main__":
+    main()
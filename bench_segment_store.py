@@ -0,0 +1,97 @@
+# bench_segment_store.py
+#
+# Compare the pretty-printed JSON segments file with the compact binary
+# segment store for "jump to a timestamp" reads.
+#
+#   python bench_segment_store.py [--segments 50000] [--queries 200] [--window 30]
+#
+# For each representation reports stored size, time to load, peak memory
+# while loading, and mean latency of a time-window lookup (load + select),
+# which is what GET /api/transcript/{f}/segments?from=&to= does per request.
+
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+from segment_store import CompactSegments
+
+WORDS = ("the quick brown fox jumps over a lazy dog while our team reviews "
+         "quarterly numbers and plans the next release").split()
+
+
+def synthetic_segments(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    t = 0.0
+    segments = []
+    for _ in range(count):
+        length = rng.uniform(1.5, 6.0)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 18)))
+        segments.append({"start": round(t, 2), "end": round(t + length, 2), "text": text})
+        t += length + rng.uniform(0.0, 0.4)
+    return segments
+
+
+def measure(label, load, select, blob, queries):
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = load(blob)
+    load_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    matched = 0
+    for t_from, t_to in queries:
+        matched += len(select(load(blob), t_from, t_to))
+    lookup_time = (time.perf_counter() - start) / len(queries)
+    del loaded
+    return label, len(blob), load_time, peak, lookup_time, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark JSON vs compact binary segment storage.")
+    parser.add_argument("--segments", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--window", type=float, default=30.0,
+                        help="Seconds of audio per lookup")
+    args = parser.parse_args()
+
+    segments = synthetic_segments(args.segments)
+    duration = segments[-1]["end"]
+    rng = random.Random(11)
+    queries = []
+    for _ in range(args.queries):
+        t_from = rng.uniform(0, max(0.0, duration - args.window))
+        queries.append((t_from, t_from + args.window))
+    print(f"{len(segments)} segments, {duration / 3600:.1f} h of audio, "
+          f"{args.queries} lookups of {args.window:.0f}s")
+
+    json_blob = json.dumps(segments, indent=2).encode("utf-8")
+    compact_blob = CompactSegments.from_segments(segments).to_bytes()
+
+    results = [
+        measure(
+            "json",
+            lambda b: json.loads(b),
+            lambda segs, a, z: [s for s in segs if s["end"] > a and s["start"] < z],
+            json_blob, queries),
+        measure(
+            "compact",
+            CompactSegments.from_bytes,
+            lambda c, a, z: c.window(a, z),
+            compact_blob, queries),
+    ]
+
+    print(f"\n{'format':<9} {'size (KB)':>10} {'load (ms)':>10} {'peak (MB)':>10} {'lookup (ms)':>12} {'matched':>8}")
+    for label, size, load_time, peak, lookup_time, matched in results:
+        print(f"{label:<9} {size / 1024:>10.0f} {load_time * 1000:>10.1f} "
+              f"{peak / 1e6:>10.1f} {lookup_time * 1000:>12.2f} {matched:>8}")
+    if results[0][5] != results[1][5]:
+        print("⚠️ Lookups returned different segment counts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# chunking.py
+
+import re
+import hashlib
+from collections import deque
+
+import tiktoken
+
+# text-embedding-3-* models use the cl100k_base tokenizer.
+_encoding = tiktoken.get_encoding("cl100k_base")
+
+CHUNK_MAX_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 30
+# Segments are chunked in fixed groups of this many, so editing one segment
+# only re-chunks its own group (about one chunk's worth of speech).
+CHUNK_GROUP_SEGMENTS = 8
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def encode(text: str):
+    return _encoding.encode(text, disallowed_special=())
+
+
+def count_tokens(text: str) -> int:
+    return len(encode(text))
+
+
+def _split_long_unit(tokens, start, end, max_tokens, overlap_tokens):
+    """Cut one oversized segment into token windows, interpolating times."""
+    pieces = []
+    total = len(tokens)
+    step = max(1, max_tokens - overlap_tokens)
+    timed = start is not None and end is not None
+    for i in range(0, total, step):
+        window = tokens[i:i + max_tokens]
+        stop = min(i + max_tokens, total)
+        pieces.append({
+            "text": _encoding.decode(window).strip(),
+            "start": round(start + (end - start) * i / total, 2) if timed else None,
+            "end": round(start + (end - start) * stop / total, 2) if timed else None,
+            "tokens": len(window),
+        })
+        if stop >= total:
+            break
+    return pieces
+
+
+def _emit(window):
+    return {
+        "text": " ".join(u["text"] for u in window),
+        "start": window[0]["start"],
+        "end": window[-1]["end"],
+        "tokens": sum(u["tokens"] for u in window),
+    }
+
+
+def _pack(units, max_tokens, overlap_tokens):
+    chunks = []
+    window = deque()
+    window_tokens = 0
+    for unit in units:
+        if window and window_tokens + unit["tokens"] > max_tokens:
+            chunks.append(_emit(window))
+            # Keep a short tail as overlap, but always leave room for `unit`.
+            while window and (window_tokens > overlap_tokens
+                              or window_tokens + unit["tokens"] > max_tokens):
+                window_tokens -= window.popleft()["tokens"]
+        window.append(unit)
+        window_tokens += unit["tokens"]
+
+    if window:
+        chunks.append(_emit(window))
+    return chunks
+
+
+def chunk_segments(segments, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                   group_segments=CHUNK_GROUP_SEGMENTS):
+    """
+    Pack Whisper segments ({start, end, text}) into chunks of at most
+    `max_tokens`, carrying up to `overlap_tokens` of trailing segments into
+    the next chunk. Each segment is tokenized once and enters/leaves the
+    sliding window once, so this runs in linear time.
+
+    Chunk boundaries are anchored every `group_segments` segments (by
+    position; None packs everything as one group) and no chunk or overlap
+    crosses an anchor, so an edit that changes one segment's length only
+    moves boundaries inside its group and the chunks elsewhere keep their
+    vector ids.
+
+    Returns dicts with `text`, `start`, `end` and `tokens`.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    groups = {}
+    for position, seg in enumerate(segments):
+        text = (seg.get("text") or "").strip()
+        if not text:
+            continue
+        units = groups.setdefault(position // group_segments if group_segments else 0, [])
+        tokens = encode(text)
+        if len(tokens) > max_tokens:
+            units.extend(_split_long_unit(
+                tokens, seg.get("start"), seg.get("end"), max_tokens, overlap_tokens))
+        else:
+            units.append({"text": text, "start": seg.get("start"),
+                          "end": seg.get("end"), "tokens": len(tokens)})
+
+    chunks = []
+    for group in sorted(groups):
+        chunks.extend(_pack(groups[group], max_tokens, overlap_tokens))
+    return chunks
+
+
+def chunk_vector_id(base_name: str, chunk) -> str:
+    """Content-addressed vector id: same file + same chunk -> same id."""
+    key = f"{chunk['start']}|{chunk['end']}|{chunk['text']}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return f"{base_name}#{digest}"
+
+
+def chunk_text(text, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Chunk plain text (no timestamps) by sentences to a token budget."""
+    sentences = [{"text": s} for s in _SENTENCE_BREAK.split(text or "") if s.strip()]
+    return [c["text"] for c in chunk_segments(sentences, max_tokens, overlap_tokens)]
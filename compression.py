@@ -0,0 +1,129 @@
+# compression.py
+
+import gzip
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+
+def parse_accept_encoding(value: str) -> dict:
+    """{coding: q} from an Accept-Encoding header."""
+    prefs = {}
+    for part in (value or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, val = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        prefs[coding] = q
+    return prefs
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """
+    The coding in `available` (server preference order) the client rates
+    highest, or None if it accepts none of them.
+    """
+    prefs = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = prefs.get(coding, prefs.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress complete responses at or above `minimum_size` bytes with zstd,
+    br or gzip, whichever the client's Accept-Encoding prefers. Compression
+    runs in the threadpool so a large transcript doesn't stall the event
+    loop. Streamed responses (ZIP export, SSE, files and media) pass through
+    untouched, as do bodies that already carry a Content-Encoding.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, zstd_level: int = 3,
+                 brotli_quality: int = 4, gzip_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.zstd_level = zstd_level
+        self.brotli_quality = brotli_quality
+        self.gzip_level = gzip_level
+        self.encodings = [name for name, module in (
+            ("zstd", zstandard), ("br", brotli), ("gzip", gzip)) if module]
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "zstd":
+            # Compressor objects aren't thread-safe; they are cheap to make.
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def _compressible(self, headers: Headers, status: int) -> bool:
+        content_type = headers.get("content-type", "")
+        return (status not in (204, 206, 304)
+                and "content-encoding" not in headers
+                and content_type.startswith(COMPRESSIBLE_TYPES))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            compressible = self._compressible(headers, start_message["status"])
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            if (message["type"] != "http.response.body" or message.get("more_body", False)
+                    or not compressible or len(body) < self.minimum_size):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await run_in_threadpool(self.compress, encoding, body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            passthrough = True
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -31,6 +31,8 @@ class Settings(BaseSettings):
     # before the default is applied.
     aws_region: Optional[str] = "us-west-1"
     s3_bucket: Optional[str] = "smartai-transcripts-pg"
+    # Point at a local S3 stand-in (moto server, MinIO) in development.
+    s3_endpoint_url: Optional[str] = None
     admin_emails: Optional[List[str]] = []
 
     # These have defaults and are less likely to be environment-specific
@@ -39,19 +41,106 @@ class Settings(BaseSettings):
     static_dir: str = "static"
     transcript_dir: str = "transcripts"
     max_file_size: int = 100_000_000
+    # Uploads are streamed to disk in chunks of this size.
+    upload_chunk_size: int = 1024 * 1024
+
+    # --- Resumable (chunked) uploads ---
+    upload_session_chunk_size: int = 8 * 1024 * 1024
+    max_resumable_upload_size: int = 2_000_000_000
+    upload_session_ttl_hours: int = 24
+
+    # --- Direct-to-S3 browser uploads ---
+    direct_upload_url_ttl: int = 3600
+    # Above this size the browser uploads with S3 multipart instead of a POST.
+    direct_upload_multipart_threshold: int = 100_000_000
+    direct_upload_part_size: int = 16 * 1024 * 1024
+    # Lifetime of presigned playback/download URLs handed out by redirects.
+    media_url_ttl: int = 300
     allowed_extensions: List[str] = [
         ".wav", ".mp3", ".m4a", ".flac", ".ogg", ".mp4", ".mov", ".mkv", ".avi"
     ]
 
-    @validator('admin_emails', pre=True)
-    def parse_admin_emails(cls, v):
+    # --- Transcription engine ---
+    # "whisper" (openai-whisper, fp32 torch) or "faster-whisper" (CTranslate2,
+    # int8-quantized on CPU). Both produce the same segment schema.
+    transcription_engine: str = "whisper"
+    faster_whisper_compute_type: str = "int8"
+    faster_whisper_cpu_threads: int = 0  # 0 = all cores
+
+    # --- Whisper model registry ---
+    # Model size used for uploads, plus the sizes loaded once at startup.
+    whisper_model: str = "base"
+    whisper_preload_models: List[str] = ["base"]
+    # Upper bound on distinct model sizes kept in memory (LRU evicted).
+    whisper_max_loaded_models: int = 2
+    # Concurrent transcribe() calls allowed per loaded model.
+    whisper_max_concurrency: int = 1
+
+    # --- Parallel (windowed) transcription ---
+    # "single" runs one Whisper pass; "parallel" splits long recordings into
+    # overlapping windows transcribed across a process pool.
+    transcribe_mode: str = "single"
+    parallel_transcribe_workers: int = 0  # 0 = half the CPU cores
+    parallel_window_seconds: float = 300.0
+    parallel_overlap_seconds: float = 5.0
+    parallel_min_duration: float = 600.0
+
+    # Store a compact .m4a rendition in S3 instead of uploaded video files.
+    store_audio_only: bool = True
+
+    # --- Background transcription jobs ---
+    transcription_workers: int = 2
+    transcription_queue_size: int = 100
+    # SSE progress streams re-check the job row this often when no event
+    # arrives (e.g. the job runs in another worker process).
+    job_events_poll_seconds: float = 15.0
+
+    # --- S3 object cache (transcripts, segments, notes, tags, quizzes) ---
+    s3_cache_memory_bytes: int = 64 * 1024 * 1024
+    # Serve cached objects without an ETag check for this long.
+    s3_cache_revalidate_seconds: float = 30.0
+    # Optional disk tier; leave unset to keep the cache in memory only.
+    s3_cache_disk_dir: Optional[str] = None
+    s3_cache_disk_max_bytes: int = 1024 * 1024 * 1024
+
+    # S3 objects fetched ahead while streaming a ZIP export.
+    zip_export_prefetch: int = 8
+
+    # Fold a transcript's pending segment patches into its snapshot (and
+    # the S3 copies) once this many have accumulated.
+    segment_patch_compact_after: int = 50
+    # Files whose last edit is this old are compacted too, so S3 readers
+    # (and the archive) catch up shortly after editing stops.
+    segment_patch_idle_seconds: float = 60.0
+    segment_patch_sweep_seconds: float = 30.0
+
+    # --- Transcript artifacts at rest ---
+    # Store transcript text, segment and quiz objects zstd-compressed (segment
+    # JSON with a dictionary trained by recompress_artifacts.py --train-dict).
+    artifact_compression: bool = True
+    artifact_zstd_level: int = 9
+    artifact_dict_size: int = 112_640
+
+    # --- Response compression (zstd, br if installed, gzip) ---
+    response_compression_min_bytes: int = 1024
+    response_zstd_level: int = 3
+    response_brotli_quality: int = 4
+    response_gzip_level: int = 6
+
+    # --- Embedding cache ---
+    embedding_cache_memory_items: int = 10_000
+    embedding_cache_persist: bool = True
+    embedding_cache_max_age_days: int = 90
+
+    @validator('admin_emails', 'whisper_preload_models', pre=True)
+    def parse_string_list(cls, v):
         if not v:
             return []
         if isinstance(v, str):
             try:
                 return json.loads(v)
             except json.JSONDecodeError:
-                return [email.strip() for email in v.split(',') if email.strip()]
+                return [item.strip() for item in v.split(',') if item.strip()]
         return v
 
 # --- Manual Settings Loading ---
@@ -73,7 +162,14 @@ try:
         # Load optionals too
         "aws_region": os.getenv("AWS_REGION"),
         "s3_bucket": os.getenv("S3_BUCKET"),
+        "s3_endpoint_url": os.getenv("S3_ENDPOINT_URL"),
+        "s3_cache_disk_dir": os.getenv("S3_CACHE_DISK_DIR"),
         "admin_emails": os.getenv("ADMIN_EMAILS"),
+        "transcription_engine": os.getenv("TRANSCRIPTION_ENGINE"),
+        "whisper_model": os.getenv("WHISPER_MODEL"),
+        "whisper_preload_models": os.getenv("WHISPER_PRELOAD_MODELS"),
+        "whisper_max_loaded_models": os.getenv("WHISPER_MAX_LOADED_MODELS"),
+        "whisper_max_concurrency": os.getenv("WHISPER_MAX_CONCURRENCY"),
     }
 
     # Filter out keys where the value is None, so Pydantic uses the defaults.
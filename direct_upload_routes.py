@@ -0,0 +1,177 @@
+# direct_upload_routes.py
+#
+# Browser -> S3 uploads that bypass the API servers:
+#   POST /api/uploads/direct           -> presigned POST (small) or multipart part URLs (large)
+#   POST /api/uploads/direct/complete  -> finish multipart, verify, queue transcription
+#   POST /api/uploads/direct/abort     -> drop an unfinished multipart upload
+#
+# The transcription worker streams the object back from S3 (see job_queue.run_job).
+
+import os
+import re
+import hmac
+import uuid
+import hashlib
+from typing import List, Optional
+
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from auth import get_current_user
+from dependencies import get_db
+from config import settings
+from models import TranscriptionJob, User
+from job_queue import enqueue_upload, QueueFullError
+from utils import validate_file_extension
+from s3_utils import s3, presign_post, presign_multipart, complete_multipart, abort_multipart
+
+router = APIRouter()
+
+# Only keys minted by this module may be completed.
+DIRECT_KEY_RE = re.compile(r"^uploads/[0-9a-f]{32}\.[A-Za-z0-9]{1,8}$")
+# uploads/<16 hex nonce><16 hex signature of (user id, nonce)><ext>
+KEY_NONCE = slice(8, 24)
+KEY_SIGNATURE = slice(24, 40)
+
+
+class DirectUploadInput(BaseModel):
+    filename: str
+    size: int
+
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+
+
+class CompleteDirectUploadInput(BaseModel):
+    key: str
+    filename: Optional[str] = None
+    upload_id: Optional[str] = None
+    parts: Optional[List[UploadedPart]] = None
+
+
+class AbortDirectUploadInput(BaseModel):
+    key: str
+    upload_id: str
+
+
+def _key_signature(user_id: int, nonce: str) -> str:
+    message = f"direct-upload:{user_id}:{nonce}".encode("utf-8")
+    return hmac.new(settings.jwt_secret_key.encode("utf-8"), message,
+                    hashlib.sha256).hexdigest()[:16]
+
+
+def _mint_key(user: User, extension: str) -> str:
+    """
+    A fresh upload key that also names its owner: S3 doesn't expose the
+    metadata of an unfinished multipart upload, so abort checks this.
+    """
+    nonce = uuid.uuid4().hex[:16]
+    return f"uploads/{nonce}{_key_signature(user.id, nonce)}{extension}"
+
+
+def _check_key(key: str, user: User):
+    if not DIRECT_KEY_RE.match(key):
+        raise HTTPException(status_code=400, detail="Invalid upload key.")
+    if not hmac.compare_digest(key[KEY_SIGNATURE], _key_signature(user.id, key[KEY_NONCE])):
+        raise HTTPException(status_code=403, detail="Upload belongs to another user.")
+
+
+@router.post("/api/uploads/direct")
+def create_direct_upload(input_data: DirectUploadInput, user: User = Depends(get_current_user)):
+    if user.role != "owner":
+        raise HTTPException(
+            status_code=403, detail="Only owners can upload files.")
+    if not validate_file_extension(input_data.filename):
+        raise HTTPException(status_code=400, detail="Unsupported file type.")
+    if input_data.size <= 0:
+        raise HTTPException(status_code=400, detail="File is empty.")
+    if input_data.size > settings.max_resumable_upload_size:
+        raise HTTPException(status_code=413, detail="File too large.")
+
+    extension = os.path.splitext(input_data.filename)[1].lower()
+    key = _mint_key(user, extension)
+    # Checked again on completion so one user can't claim another's object.
+    metadata = {"user-id": str(user.id)}
+
+    try:
+        if input_data.size < settings.direct_upload_multipart_threshold:
+            post = presign_post(key, input_data.size, metadata)
+            return {"method": "post", "key": key, "url": post["url"], "fields": post["fields"]}
+
+        multipart = presign_multipart(key, input_data.size, metadata=metadata)
+        return {"method": "multipart", "key": key, **multipart}
+    except ClientError as e:
+        print(f"❌ Could not presign upload for {key}: {e}")
+        raise HTTPException(status_code=502, detail="Could not prepare upload.")
+
+
+@router.post("/api/uploads/direct/complete")
+def complete_direct_upload(input_data: CompleteDirectUploadInput, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Register a finished browser upload and queue it for transcription."""
+    key = input_data.key
+    _check_key(key, user)
+
+    if db.query(TranscriptionJob).filter(TranscriptionJob.source_key == key).first():
+        raise HTTPException(status_code=409, detail="Upload already completed.")
+
+    try:
+        if input_data.upload_id:
+            parts = [(p.part_number, p.etag) for p in input_data.parts or []]
+            complete_multipart(key, input_data.upload_id, parts)
+        head = s3.head_object(Bucket=settings.s3_bucket, Key=key)
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code in ("404", "NoSuchKey", "NoSuchUpload"):
+            raise HTTPException(status_code=404, detail="Uploaded object not found.")
+        print(f"❌ Could not complete direct upload {key}: {e}")
+        raise HTTPException(status_code=400, detail="Could not complete upload.")
+
+    if head.get("Metadata", {}).get("user-id") != str(user.id):
+        raise HTTPException(status_code=403, detail="Upload belongs to another user.")
+
+    size = head["ContentLength"]
+    if size > settings.max_resumable_upload_size:
+        s3.delete_object(Bucket=settings.s3_bucket, Key=key)
+        raise HTTPException(status_code=413, detail="File too large.")
+
+    filename = os.path.basename(key)
+    original_filename = os.path.basename(input_data.filename or filename)
+    try:
+        # The worker computes the content hash while streaming from S3.
+        job = enqueue_upload(db, user, filename, original_filename, size,
+                             source_key=key)
+    except IntegrityError:
+        # A concurrent complete queued it first (source_key is unique).
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Upload already completed.")
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503, detail="Transcription queue is full, please retry shortly.")
+
+    return JSONResponse(status_code=202, content={
+        "message": "File uploaded and queued for transcription",
+        "filename": filename,
+        "job_id": job.id,
+        "status": job.status,
+        "file_size": size
+    })
+
+
+@router.post("/api/uploads/direct/abort")
+def abort_direct_upload(input_data: AbortDirectUploadInput, user: User = Depends(get_current_user)):
+    if user.role != "owner":
+        raise HTTPException(
+            status_code=403, detail="Only owners can upload files.")
+    _check_key(input_data.key, user)
+    try:
+        abort_multipart(input_data.key, input_data.upload_id)
+    except ClientError as e:
+        print(f"⚠️ Could not abort multipart upload {input_data.key}: {e}")
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    return {"message": "Upload aborted."}
@@ -0,0 +1,212 @@
+# embedding_cache.py
+
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from config import settings
+from database import SessionLocal
+from models import EmbeddingCacheEntry
+
+# Keep IN (...) lists a sane size for the database.
+_LOOKUP_CHUNK = 500
+# last_used_at is refreshed at most this often per entry, so hot entries
+# don't turn every lookup into a write.
+_TOUCH_INTERVAL = timedelta(days=1)
+# Dialects with INSERT ... ON CONFLICT DO NOTHING.
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(embedding) -> bytes:
+    return array("f", embedding).tobytes()
+
+
+def _unpack(blob: bytes):
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embeddings keyed by (model, sha256(text)).
+
+    An in-memory LRU sits in front of a Postgres table so identical text is
+    only ever embedded once, across uploads, re-segmentation and repeated
+    questions. Lookups are bulk so callers can send only misses upstream.
+    """
+
+    def __init__(self, max_memory_items: int = 10_000, persist: bool = True):
+        self.max_memory_items = max_memory_items
+        self.persist = persist
+        self._memory = OrderedDict()
+        # key -> when its last_used_at was last refreshed by this process
+        self._touched = {}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, embedding):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            evicted, _ = self._memory.popitem(last=False)
+            self._touched.pop(evicted, None)
+
+    def get_many(self, model: str, texts):
+        """Return {text_hash: embedding} for every text already cached."""
+        hashes = {text_hash(t) for t in texts}
+        found = {}
+        now = datetime.utcnow()
+        touch_before = now - _TOUCH_INTERVAL
+        stale = []
+
+        with self._lock:
+            for h in hashes:
+                key = (model, h)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[h] = self._memory[key]
+                    if self._touched.get(key, datetime.min) < touch_before:
+                        stale.append(h)
+            self.memory_hits += len(found)
+
+        remaining = [h for h in hashes if h not in found]
+        if (remaining or stale) and self.persist:
+            db = SessionLocal()
+            try:
+                for i in range(0, len(remaining), _LOOKUP_CHUNK):
+                    rows = db.query(
+                        EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding,
+                        EmbeddingCacheEntry.last_used_at
+                    ).filter(
+                        EmbeddingCacheEntry.model == model,
+                        EmbeddingCacheEntry.text_hash.in_(
+                            remaining[i:i + _LOOKUP_CHUNK])
+                    ).all()
+                    for row in rows:
+                        found[row.text_hash] = _unpack(row.embedding)
+                        if row.last_used_at is None or row.last_used_at < touch_before:
+                            stale.append(row.text_hash)
+                self._touch(db, model, stale, now, touch_before)
+            except Exception as e:
+                db.rollback()
+                stale = []
+                print(f"⚠️ Embedding cache lookup failed: {e}")
+            finally:
+                db.close()
+
+            with self._lock:
+                for h in remaining:
+                    if h in found:
+                        self.db_hits += 1
+                        self._remember((model, h), found[h])
+                for h in stale:
+                    self._touched[(model, h)] = now
+
+        with self._lock:
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def _touch(self, db, model: str, hashes, now: datetime, touch_before: datetime):
+        """Mark hit entries as used so eviction keeps them."""
+        for i in range(0, len(hashes), _LOOKUP_CHUNK):
+            db.query(EmbeddingCacheEntry).filter(
+                EmbeddingCacheEntry.model == model,
+                EmbeddingCacheEntry.text_hash.in_(hashes[i:i + _LOOKUP_CHUNK]),
+                or_(EmbeddingCacheEntry.last_used_at.is_(None),
+                    EmbeddingCacheEntry.last_used_at < touch_before)
+            ).update({EmbeddingCacheEntry.last_used_at: now}, synchronize_session=False)
+        if hashes:
+            db.commit()
+
+    def put_many(self, model: str, items):
+        """Store (text, embedding) pairs in both tiers."""
+        rows = {}
+        now = datetime.utcnow()
+        with self._lock:
+            for text, embedding in items:
+                h = text_hash(text)
+                self._remember((model, h), embedding)
+                self._touched[(model, h)] = now
+                rows[h] = embedding
+
+        if not rows or not self.persist:
+            return
+
+        values = [
+            {"model": model, "text_hash": h, "embedding": _pack(embedding),
+             "created_at": now, "last_used_at": now}
+            for h, embedding in rows.items()
+        ]
+        db = SessionLocal()
+        try:
+            # Insert-or-ignore per row: a text another worker stored first
+            # is skipped without losing the rest of the batch.
+            insert = _INSERTS.get(db.get_bind().dialect.name)
+            for i in range(0, len(values), _LOOKUP_CHUNK):
+                chunk = values[i:i + _LOOKUP_CHUNK]
+                if insert is not None:
+                    db.execute(insert(EmbeddingCacheEntry).values(chunk).on_conflict_do_nothing(
+                        index_elements=["model", "text_hash"]))
+                    continue
+                for value in chunk:
+                    try:
+                        with db.begin_nested():
+                            db.add(EmbeddingCacheEntry(**value))
+                    except IntegrityError:
+                        pass
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Embedding cache write failed: {e}")
+        finally:
+            db.close()
+
+    def evict(self, max_age_days: int = None):
+        """Drop persisted entries not used in the last `max_age_days`."""
+        max_age_days = max_age_days or settings.embedding_cache_max_age_days
+        cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+        db = SessionLocal()
+        try:
+            deleted = db.query(EmbeddingCacheEntry).filter(
+                EmbeddingCacheEntry.last_used_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            total = hits + self.misses
+            return {
+                "memory_items": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache(
+    max_memory_items=settings.embedding_cache_memory_items,
+    persist=settings.embedding_cache_persist,
+)
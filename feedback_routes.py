@@ -7,6 +7,7 @@ from models import User, Feedback  # Import the new Feedback model
 from dependencies import get_db     # Correctly import get_db
 from auth import get_current_user
 from config import settings
+from json_responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -50,5 +51,5 @@ def get_feedback(current_user: User = Depends(get_current_user), db: Session = D
     feedback_entries = db.query(Feedback).order_by(
         Feedback.timestamp.desc()).all()
 
-    # Pydantic will automatically serialize the SQLAlchemy objects into JSON
-    return feedback_entries
+    # ORM objects aren't JSON-serializable; FastJSONResponse renders their columns.
+    return FastJSONResponse(content=feedback_entries)
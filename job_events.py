@@ -0,0 +1,90 @@
+# job_events.py
+
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+
+# Finished jobs whose last event is kept for late subscribers.
+MAX_RETAINED_JOBS = 1000
+TERMINAL_STATUSES = ("done", "error")
+
+
+def job_snapshot(job) -> dict:
+    """Event payload for a TranscriptionJob row."""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage or job.status,
+        "progress": job.progress,
+        "timings": job.timings or {},
+        "error": job.error,
+    }
+
+
+class JobEventBroker:
+    """
+    In-process fan-out of transcription job events to SSE subscribers.
+
+    Workers publish from their own threads; every subscriber is an
+    asyncio.Queue on the app's event loop, so an idle subscriber costs one
+    parked coroutine and nothing is polled. The latest event per job is
+    kept so a client that connects (or reconnects) mid-job starts from the
+    current state.
+    """
+
+    def __init__(self, max_retained: int = MAX_RETAINED_JOBS):
+        self.max_retained = max_retained
+        self._loop = None
+        self._subscribers = {}
+        self._latest = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Deliver events on `loop` (called once at app startup)."""
+        self._loop = loop
+
+    def latest(self, job_id: str):
+        with self._lock:
+            return self._latest.get(job_id)
+
+    def publish(self, job_id: str, event: dict):
+        """Record `event` for `job_id` and wake its subscribers. Thread-safe."""
+        event = dict(event, job_id=job_id, ts=time.time())
+        with self._lock:
+            self._latest[job_id] = event
+            self._latest.move_to_end(job_id)
+            while len(self._latest) > self.max_retained:
+                self._latest.popitem(last=False)
+            queues = list(self._subscribers.get(job_id, ()))
+        if queues and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, queues, event)
+
+    @staticmethod
+    def _deliver(queues, event):
+        for q in queues:
+            if q.full():
+                # Slow reader: drop the oldest progress tick, keep the newest.
+                q.get_nowait()
+            q.put_nowait(event)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        q = asyncio.Queue(maxsize=16)
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, job_id: str, q: asyncio.Queue):
+        with self._lock:
+            subs = self._subscribers.get(job_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[job_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+job_events = JobEventBroker()
@@ -0,0 +1,261 @@
+# job_queue.py
+
+import os
+import time
+import uuid
+import queue
+import asyncio
+import threading
+from datetime import datetime
+
+from config import settings
+from database import SessionLocal
+from models import TranscriptionJob, UserFile
+from upload_processor import transcribe_audio, reuse_transcript, has_original_segments, timed_stage
+from s3_utils import s3, download_to_file
+from transcription_engines import get_engine
+from job_events import job_events, job_snapshot
+
+# Fine-grained progress is streamed to subscribers on every tick but only
+# written to the job row this often (and on every stage change).
+PROGRESS_COMMIT_INTERVAL = 2.0
+# Earlier uploads of the same content tried for reuse before transcribing.
+REUSE_MAX_CANDIDATES = 5
+
+
+class QueueFullError(Exception):
+    """Raised when no more transcription jobs can be accepted."""
+
+
+class TranscriptionJobQueue:
+    """
+    Bounded in-process worker pool that drains queued transcription jobs.
+
+    The upload route persists the file, inserts a `TranscriptionJob` row and
+    submits its id here; a worker thread then runs the Whisper, S3 and
+    Pinecone pipeline and records state, progress and stage timings on the row.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 100):
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=self._worker, name=f"transcription-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._requeue_unfinished()
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+
+    def submit(self, job_id: str):
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            raise QueueFullError("Transcription queue is full")
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _requeue_unfinished(self):
+        """Pick up jobs left queued or running by a previous process."""
+        db = SessionLocal()
+        try:
+            jobs = db.query(TranscriptionJob).filter(
+                TranscriptionJob.status.in_(["queued", "running"])
+            ).order_by(TranscriptionJob.created_at).all()
+            for job in jobs:
+                if not job.source_key and not os.path.exists(os.path.join("uploads", job.filename)):
+                    job.status = "error"
+                    job.error = "Upload was lost before transcription finished."
+                    job.finished_at = datetime.utcnow()
+                    continue
+                job.status = "queued"
+                try:
+                    self._queue.put_nowait(job.id)
+                except queue.Full:
+                    break
+                job_events.publish(job.id, job_snapshot(job))
+            db.commit()
+        finally:
+            db.close()
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            try:
+                run_job(job_id)
+            except Exception as e:
+                print(f"❌ Transcription job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+def enqueue_upload(db, user, filename: str, original_filename: str, file_size: int, content_sha256: str = None,
+                   source_key: str = None):
+    """
+    Record a TranscriptionJob for a file already stored in uploads/ (or in
+    S3 at `source_key`) and hand it to the worker pool. Raises
+    QueueFullError (after removing the row) if the queue has no room.
+    """
+    job = TranscriptionJob(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        email=user.email,
+        filename=filename,
+        original_filename=original_filename,
+        file_size=file_size,
+        content_sha256=content_sha256,
+        source_key=source_key,
+        status="queued",
+        progress=0.0,
+    )
+    db.add(job)
+    db.commit()
+
+    try:
+        transcription_jobs.submit(job.id)
+    except QueueFullError:
+        db.delete(job)
+        db.commit()
+        raise
+    job_events.publish(job.id, job_snapshot(job))
+    return job
+
+
+def find_reusable_uploads(db, content_sha256: str):
+    """
+    Earlier uploads of the same bytes transcribed by the current engine,
+    newest first, that still have their pristine segments to copy.
+    """
+    if not content_sha256:
+        return []
+    rows = db.query(UserFile).filter(
+        UserFile.content_sha256 == content_sha256,
+        UserFile.engine == get_engine().signature
+    ).order_by(UserFile.id.desc()).limit(REUSE_MAX_CANDIDATES).all()
+    return [row for row in rows if has_original_segments(row.filename)]
+
+
+def run_job(job_id: str):
+    """Run the full transcription pipeline for one job row."""
+    db = SessionLocal()
+    try:
+        job = db.get(TranscriptionJob, job_id)
+        if not job or job.status not in ("queued", "running"):
+            return
+
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        job_events.publish(job_id, job_snapshot(job))
+        last_commit = {"stage": None, "at": 0.0}
+
+        def on_progress(stage, progress, stage_timings, **extra):
+            job.stage = stage
+            job.progress = progress
+            job.timings = stage_timings
+            now = time.monotonic()
+            if stage != last_commit["stage"] or now - last_commit["at"] >= PROGRESS_COMMIT_INTERVAL:
+                db.commit()
+                last_commit.update(stage=stage, at=now)
+            job_events.publish(job_id, {
+                "status": "running", "stage": stage, "progress": progress,
+                "timings": stage_timings, "error": None, **extra})
+
+        local_path = os.path.join("uploads", job.filename)
+        timings = {}
+        media = {}
+        try:
+            if job.source_key and not os.path.exists(local_path):
+                with timed_stage(timings, "downloading", 0.01, on_progress):
+                    job.file_size, job.content_sha256 = download_to_file(
+                        job.source_key, local_path)
+                db.commit()
+
+            source = None
+            for candidate in find_reusable_uploads(db, job.content_sha256):
+                try:
+                    full_text, segments, audio_url, transcript_url, audio_s3_key = asyncio.run(
+                        reuse_transcript(candidate.filename, candidate.s3_key, job.filename,
+                                         on_progress=on_progress, timings=timings, media=media)
+                    )
+                    media.update(duration=candidate.duration, codec=candidate.media_codec,
+                                 engine=candidate.engine)
+                    source = candidate
+                    break
+                except Exception as e:
+                    print(f"⚠️ Could not reuse {candidate.filename}: {e}")
+            if not source:
+                full_text, segments, audio_url, transcript_url, audio_s3_key = asyncio.run(
+                    transcribe_audio(local_path, job.filename, on_progress=on_progress,
+                                     timings=timings, media=media, uploaded_key=job.source_key)
+                )
+
+            new_file = UserFile(
+                filename=job.filename,
+                file_size=job.file_size,
+                upload_timestamp=datetime.utcnow(),
+                user_id=job.user_id,
+                email=job.email,
+                s3_key=audio_s3_key,
+                duration=media.get("duration"),
+                media_codec=media.get("codec"),
+                content_sha256=job.content_sha256,
+                engine=media.get("engine"),
+                transcript_text=full_text,
+                transcript_segments=segments
+            )
+            db.add(new_file)
+            db.flush()
+
+            if job.source_key and job.source_key != audio_s3_key:
+                # The browser's original (e.g. a video) was replaced by a rendition.
+                s3.delete_object(Bucket=settings.s3_bucket, Key=job.source_key)
+
+            job.audio_duration = media.get("duration")
+            if job.audio_duration and "transcribing" in timings:
+                job.real_time_factor = round(
+                    timings["transcribing"] / job.audio_duration, 4)
+
+            job.user_file_id = new_file.id
+            job.status = "done"
+            job.stage = "done"
+            job.progress = 1.0
+            if media.get("index_failed_batches"):
+                # The transcript is saved; only search over it is incomplete.
+                job.error = (f"Search indexing incomplete: {media['index_failed_batches']} of "
+                             f"{media['index_batches']} Pinecone batches failed.")
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Transcription job {job_id} failed: {e}")
+            job.status = "error"
+            job.error = str(e)
+
+        job.timings = timings
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        job_events.publish(job_id, dict(
+            job_snapshot(job), filename=job.filename, user_file_id=job.user_file_id))
+
+        if os.path.exists(local_path):
+            os.remove(local_path)
+    finally:
+        db.close()
+
+
+transcription_jobs = TranscriptionJobQueue(
+    workers=settings.transcription_workers,
+    max_pending=settings.transcription_queue_size,
+)
@@ -0,0 +1,39 @@
+# json_responses.py
+
+import decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    """Called by orjson only for types it can't serialize natively."""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # SQLAlchemy model instances (e.g. Feedback): their column values.
+    mapper = getattr(type(obj), "__mapper__", None)
+    if mapper is not None:
+        return {attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    JSON rendered by orjson: several times faster than the stdlib encoder on
+    large transcript/segment payloads, and datetimes, numpy values and ORM
+    rows come out as JSON instead of raising.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
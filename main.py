@@ -3,19 +3,17 @@ import os
 if os.environ.get("RENDER") != "true":
     from dotenv import load_dotenv
     load_dotenv()
-import io
 import json
+import asyncio
 import uuid
 import logging
 import shutil
+import mimetypes
 import subprocess
-from zipfile import ZipFile
 from datetime import datetime
-from typing import Dict, List, Any
 
 # ─────────────────────────────────────────────
 # Third-party imports
-import aiofiles
 from openai import OpenAI
 from sqlalchemy.orm import Session
 from sqlalchemy import create_engine
@@ -24,7 +22,7 @@ from fastapi import (
     FastAPI, UploadFile, File, Depends,
     HTTPException, Header, Request, Body, Form
 )
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
@@ -47,8 +45,24 @@ from email_utils import send_email
 from auth_routes import router as auth_router
 from models import UserFile, User
 from qa_handler import router as qa_router
-from transcription_routes import router as transcription_router
+from transcription_routes import (
+    router as transcription_router, transcript_zip_response, get_transcript_list,
+    get_transcript_from_s3, get_shared_transcript, save_segments, patch_segments,
+    upload_file, get_job_status, stream_job_events
+)
+from upload_session_routes import router as upload_session_router, cleanup_stale_sessions
+from direct_upload_routes import router as direct_upload_router
 from upload_processor import transcribe_audio
+from transcription_engines import get_engine
+from job_queue import transcription_jobs
+from job_events import job_events
+from parallel_transcribe import shutdown_pool
+import segment_patches
+from embedding_cache import embedding_cache
+from s3_utils import presign_get
+from json_responses import FastJSONResponse
+from compression import CompressionMiddleware
+from request_limits import BodySizeLimitMiddleware
 
 if not settings.database_url:
     raise ValueError(
@@ -81,7 +95,7 @@ def create_tables():
 
 
 # initialize the app
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -93,7 +107,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "X-Next-Cursor"],
+)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.response_compression_min_bytes,
+    zstd_level=settings.response_zstd_level,
+    brotli_quality=settings.response_brotli_quality,
+    gzip_level=settings.response_gzip_level,
 )
+# Caps bodies as they arrive, before Starlette spools uploads to disk;
+# the extra megabyte leaves room for multipart framing.
+app.add_middleware(BodySizeLimitMiddleware,
+                   max_body_bytes=settings.max_file_size + 1_000_000)
 
 # ensure folders exist on startup
 os.makedirs("segments", exist_ok=True)
@@ -109,6 +135,10 @@ app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(transcription_router,
                    prefix="/transcription", tags=["transcription"])
 app.include_router(qa_router, prefix="/qa", tags=["qa"])
+app.include_router(upload_session_router,
+                   prefix="/transcription", tags=["uploads"])
+app.include_router(direct_upload_router,
+                   prefix="/transcription", tags=["uploads"])
 
 
 @app.on_event("startup")
@@ -117,6 +147,36 @@ async def startup_event():
     create_tables()
     print("Database tables check complete.")
     logging.info("Database tables created if not existing.")
+    # Load Whisper weights once per worker instead of on every upload.
+    engine = get_engine()
+    await asyncio.to_thread(engine.preload, settings.whisper_preload_models)
+    print(f"Transcription engine ready: {engine.signature}")
+    job_events.bind(asyncio.get_running_loop())
+    transcription_jobs.start()
+    evicted = await asyncio.to_thread(embedding_cache.evict)
+    print(f"Embedding cache: evicted {evicted} expired entries.")
+    await asyncio.to_thread(cleanup_stale_sessions)
+    app.state.segment_compactor = asyncio.create_task(compact_idle_segments())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.segment_compactor.cancel()
+    transcription_jobs.stop()
+    shutdown_pool()
+
+
+async def compact_idle_segments():
+    """Fold idle files' segment patches back into S3 every few seconds."""
+    while True:
+        await asyncio.sleep(settings.segment_patch_sweep_seconds)
+        try:
+            compacted = await asyncio.to_thread(
+                segment_patches.compact_idle, settings.segment_patch_idle_seconds)
+            if compacted:
+                print(f"🗜️ Compacted segment patches of {compacted} idle files")
+        except Exception as e:
+            print(f"⚠️ Idle segment compaction failed: {e}")
 
 # OpenAI client
 client = OpenAI(api_key=settings.openai_api_key)
@@ -129,112 +189,69 @@ def root():
     return FileResponse("static/index.html")
 
 
-@app.get("/audio/{filename:path}")
-async def serve_audio(filename: str):
-    filepath = os.path.join("uploads", filename)
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="Audio not found")
-    return FileResponse(filepath, media_type="audio/mpeg")
+def media_response(s3_key: str, local_path: str, download_name: str = None):
+    """
+    Serve media without streaming it through the app: a local copy goes out
+    via FileResponse (which answers Range requests with 206), anything else
+    is a 302 to a short-lived presigned S3 URL.
+    """
+    if os.path.isfile(local_path):
+        media_type = mimetypes.guess_type(local_path)[0] or "application/octet-stream"
+        return FileResponse(local_path, media_type=media_type, filename=download_name)
+    if not s3_key:
+        raise HTTPException(status_code=404, detail="File not found.")
+    url = presign_get(s3_key, download_name=download_name)
+    # Let the browser reuse the redirect briefly, never past the URL's lifetime.
+    return RedirectResponse(url, status_code=302, headers={
+        "Cache-Control": f"private, max-age={min(60, settings.media_url_ttl // 2)}"})
 
 
-@app.get("/api/transcripts", response_model=List[Dict[str, Any]])
-async def get_transcript_list(
-    user=Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    files = db.query(UserFile).filter(UserFile.email == user.email).order_by(
-        UserFile.upload_timestamp.desc()
-    ).all()
-    return [
-        {
-            "filename": f.filename,
-            "file_size": f.file_size,
-            "upload_timestamp": f.upload_timestamp,
-            "tag": f.tag or ""
-        } for f in files
-    ]
-
-
-@app.get("/api/history")
-async def api_history(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    return await get_transcript_list(user, db)
-
-
-@app.get("/api/transcript/{filename:path}")
-def get_transcript(
-    filename: str,
-    current_user: User = Depends(get_current_user)
-):
-    transcript_path = os.path.join(settings.transcript_dir, f"{filename}.txt")
-    segments_path = os.path.join(settings.transcript_dir, f"{filename}.json")
+@app.get("/audio/{filename:path}")
+def serve_audio(filename: str, db: Session = Depends(get_db)):
+    filename = os.path.basename(filename)
+    file_record = db.query(UserFile).filter(
+        UserFile.filename == filename).first()
+    if not file_record:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    return media_response(file_record.s3_key or f"uploads/{filename}",
+                          os.path.join("uploads", filename))
 
-    if not os.path.exists(transcript_path):
-        raise HTTPException(status_code=404, detail="Transcript not found.")
 
-    with open(transcript_path, "r", encoding="utf-8") as f:
-        text = f.read()
+# The frontend uploads and follows job progress at the root.
+app.add_api_route("/api/upload", upload_file, methods=["POST"])
+app.add_api_route("/api/jobs/{job_id}", get_job_status, methods=["GET"])
+app.add_api_route("/api/jobs/{job_id}/events", stream_job_events, methods=["GET"])
 
-    segments = []
-    if os.path.exists(segments_path):
-        try:
-            with open(segments_path, "r", encoding="utf-8") as sf:
-                segments = json.load(sf)
-        except Exception:
-            print(f"Warning: Failed to parse {segments_path}")
 
-    return JSONResponse(content={"transcript": text, "segments": segments})
+# Same paginated listing as /transcription/api/transcripts.
+app.add_api_route("/api/transcripts", get_transcript_list, methods=["GET"])
+app.add_api_route("/api/history", get_transcript_list, methods=["GET"])
 
 
-@app.post("/api/transcript/{filename:path}/segments")
-async def save_segments(filename: str, segments_data: dict, user=Depends(get_current_user)):
-    try:
-        segments_path = os.path.join(
-            settings.transcript_dir, f"{filename}.json")
-        with open(segments_path, "w", encoding="utf-8") as f:
-            json.dump(segments_data["segments"], f, indent=2)
-        return {"status": "success"}
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Failed to save segments: {str(e)}")
+# Reads the database copy with pending segment patches applied (S3 as a
+# fallback) and returns the version ETag the editor sends back in If-Match.
+app.add_api_route("/api/transcript/{filename:path}", get_transcript_from_s3, methods=["GET"])
 
 
-@app.get("/api/share/{filename:path}")
-async def get_shared_transcript(filename: str) -> Dict[str, str]:
-    safe_filename = os.path.basename(filename)
-    path = os.path.join(settings.transcript_dir, f"{safe_filename}.txt")
+# Segment edits go through the versioned document in the database (and S3)
+# rather than local files; PATCH takes JSON Patch operations.
+app.add_api_route("/api/transcript/{filename:path}/segments", save_segments, methods=["POST"])
+app.add_api_route("/api/transcript/{filename:path}/segments", patch_segments, methods=["PATCH"])
 
-    if not os.path.exists(path) or not os.path.isfile(path):
-        raise HTTPException(status_code=404, detail="Transcript not found")
 
-    try:
-        async with aiofiles.open(path, "r", encoding="utf-8") as f:
-            content = await f.read()
-        return {"transcript": content}
-    except Exception:
-        raise HTTPException(
-            status_code=500, detail="Failed to read transcript")
+# Share links read the indexed user_files row first, then S3.
+app.add_api_route("/api/share/{filename:path}", get_shared_transcript, methods=["GET"])
 
 
 @app.get("/api/download/all")
-async def download_all_transcripts(
+def download_all_transcripts(
+    segments: str = None,
     user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    memory_file = io.BytesIO()
-    user_files = db.query(UserFile).filter(UserFile.email == user.email).all()
-
-    with ZipFile(memory_file, 'w') as zipf:
-        for file in user_files:
-            transcript_path = os.path.join(
-                settings.transcript_dir, file.filename + ".txt")
-            if os.path.exists(transcript_path):
-                zipf.write(transcript_path, arcname=f"{file.filename}.txt")
-
-    memory_file.seek(0)
-    headers = {
-        "Content-Disposition": f"attachment; filename={user.email}_transcripts.zip"
-    }
-    return StreamingResponse(memory_file, media_type="application/zip", headers=headers)
+    filenames = [f.filename for f in db.query(UserFile.filename).filter(
+        UserFile.email == user.email).order_by(UserFile.id)]
+    return transcript_zip_response(filenames, f"{user.email}_transcripts.zip", segments)
 
 
 @app.get("/api/download/{file_id}")
@@ -248,7 +265,9 @@ def download_file(
     ).first()
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found.")
-    return FileResponse(path=os.path.join("uploads", file_record.filename), filename=file_record.filename)
+    s3_key = file_record.s3_key or f"uploads/{file_record.filename}"
+    return media_response(s3_key, os.path.join("uploads", file_record.filename),
+                          download_name=os.path.basename(s3_key))
 
 
 @app.get("/segments/{segment_name}")
@@ -338,7 +357,7 @@ def health_check():
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logging.error(f"Unhandled error: {exc}")
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={"detail": f"Server error: {str(exc)}"}
     )
@@ -358,7 +377,7 @@ async def request_password_reset(body: EmailSchema, request: Request, db: Sessio
     if not user:
         # Don't reveal if a user exists for security reasons.
         # Always return a success-like message.
-        return JSONResponse(status_code=200, content={"message": "If an account with that email exists, a password reset link has been sent."})
+        return FastJSONResponse(status_code=200, content={"message": "If an account with that email exists, a password reset link has been sent."})
 
     token = create_password_reset_token(email=user.email)
     # This creates a full, clickable URL like https://yourapp.onrender.com/reset-password/the-token
@@ -378,7 +397,7 @@ async def request_password_reset(body: EmailSchema, request: Request, db: Sessio
         body=html_body
     )
 
-    return JSONResponse(status_code=200, content={"message": "If an account with that email exists, a password reset link has been sent."})
+    return FastJSONResponse(status_code=200, content={"message": "If an account with that email exists, a password reset link has been sent."})
 
 
 @app.get("/reset-password/{token}", name="reset_password_form", response_class=HTMLResponse)
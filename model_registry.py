@@ -0,0 +1,87 @@
+# model_registry.py
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import whisper
+from config import settings
+
+
+class WhisperModelRegistry:
+    """
+    Process-wide cache of loaded Whisper models.
+
+    Each model size is loaded at most once per worker and shared by every
+    upload. When more sizes are requested than `max_models`, the least
+    recently used one is dropped. Inference on a model is bounded by a
+    per-model semaphore so concurrent uploads don't multiply memory.
+
+    `loader(size)` builds a model; it defaults to `whisper.load_model` and
+    is swapped out for other engines (e.g. faster-whisper).
+    """
+
+    def __init__(self, max_models: int = 2, max_concurrency: int = 1, loader=None, label: str = "Whisper"):
+        self.loader = loader or whisper.load_model
+        self.label = label
+        self.max_models = max(1, max_models)
+        self.max_concurrency = max(1, max_concurrency)
+        self._models = OrderedDict()
+        self._slots = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    def _load_lock_for(self, size: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(size, threading.Lock())
+
+    def get(self, size: str):
+        """Return the model for `size`, loading it on first use."""
+        with self._lock:
+            if size in self._models:
+                self._models.move_to_end(size)
+                return self._models[size]
+
+        # Load outside the registry lock so other sizes stay available,
+        # but only once per size even if several uploads race for it.
+        with self._load_lock_for(size):
+            with self._lock:
+                if size in self._models:
+                    self._models.move_to_end(size)
+                    return self._models[size]
+
+            print(f"🧠 Loading {self.label} model '{size}'")
+            model = self.loader(size)
+
+            with self._lock:
+                self._models[size] = model
+                self._slots.setdefault(
+                    size, threading.BoundedSemaphore(self.max_concurrency))
+                while len(self._models) > self.max_models:
+                    evicted, _ = self._models.popitem(last=False)
+                    print(f"♻️ Evicted {self.label} model '{evicted}'")
+            return model
+
+    def preload(self, sizes):
+        """Load the given model sizes ahead of the first request."""
+        for size in sizes:
+            self.get(size)
+
+    @contextmanager
+    def acquire(self, size: str):
+        """Yield a loaded model while holding one of its inference slots."""
+        model = self.get(size)
+        with self._lock:
+            slot = self._slots[size]
+        with slot:
+            yield model
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models.keys())
+
+
+whisper_registry = WhisperModelRegistry(
+    max_models=settings.whisper_max_loaded_models,
+    max_concurrency=settings.whisper_max_concurrency,
+)
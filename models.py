@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean, Float, LargeBinary, BigInteger, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB
 import datetime
 
 # CORRECT: Import the single, shared Base from your database.py file
@@ -54,13 +55,54 @@ class UserFile(Base):
     user_id = Column(Integer, ForeignKey('users.id'))
 
     s3_key = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)
+    media_codec = Column(String, nullable=True)
+    # SHA-256 of the uploaded bytes and the engine signature that produced
+    # the transcript; together they let identical re-uploads skip Whisper.
+    content_sha256 = Column(String(64), nullable=True, index=True)
+    engine = Column(String(64), nullable=True)
+    # Copies of the S3 transcript/segments so reads are one row lookup;
+    # Postgres TOAST-compresses large values. S3 stays the archive.
     transcript_text = Column(Text, nullable=True)
-    transcript_segments = Column(Text, nullable=True)
+    transcript_segments = Column(
+        JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    # Segment edits arrive as JSON Patches (see segment_patches.py).
+    # `segments_version` counts every edit; `transcript_segments` holds the
+    # document as of `segments_snapshot_version`, and the SegmentPatch rows
+    # in between are replayed on read until they are compacted.
+    segments_version = Column(Integer, nullable=False, default=0)
+    segments_snapshot_version = Column(Integer, nullable=False, default=0)
     # FIX: Add the missing 'tag' column that the frontend needs
     tag = Column(String, nullable=True, index=True)
+    # Bumped on every change; the transcript listing's ETag is built from it.
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow,
+                        onupdate=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="files")
 
+    __table_args__ = (
+        Index("ix_user_files_user_id_upload_timestamp_id",
+              "user_id", "upload_timestamp", "id"),
+    )
+
+
+class SegmentPatch(Base):
+    __tablename__ = "segment_patches"
+
+    id = Column(Integer, primary_key=True)
+    user_file_id = Column(Integer, ForeignKey("user_files.id", ondelete="CASCADE"), nullable=False)
+    # Version the document reaches once `ops` are applied.
+    version = Column(Integer, nullable=False)
+    # RFC 6902 operations against the segments array.
+    ops = Column(JSON, nullable=False)
+    email = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_file_id", "version",
+                         name="uq_segment_patches_user_file_id_version"),
+    )
+
 
 # NEW: Add the missing Invite model
 class Invite(Base):
@@ -75,6 +117,67 @@ class Invite(Base):
     owner = relationship("User", back_populates="invites_created")
 
 
+class TranscriptionJob(Base):
+    __tablename__ = "transcription_jobs"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    email = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    original_filename = Column(String, nullable=True)
+    file_size = Column(Integer)
+    content_sha256 = Column(String(64), nullable=True)
+    # Set for direct-to-S3 uploads; the worker streams the media from here.
+    # Unique, so an object can only ever be queued once.
+    source_key = Column(String, nullable=True, index=True, unique=True)
+    # queued -> running -> done | error
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    stage = Column(String(32), nullable=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    # {stage_name: seconds}, e.g. model_load, decoding, transcribing,
+    # upload_audio, upload_transcript, chunking, embedding, upserting
+    timings = Column(JSON, nullable=True)
+    audio_duration = Column(Float, nullable=True)
+    # Inference seconds per second of audio.
+    real_time_factor = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+    user_file_id = Column(Integer, ForeignKey("user_files.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True, index=True)
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    original_filename = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    # Optional client-supplied SHA-256, checked at finalize.
+    expected_sha256 = Column(String(64), nullable=True)
+    # Sorted list of chunk indexes written so far.
+    received_chunks = Column(JSON, nullable=False, default=list)
+    # open -> complete
+    status = Column(String(20), nullable=False, default="open")
+    job_id = Column(String(32), ForeignKey("transcription_jobs.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(64), primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    # float32 values packed with array('f')
+    embedding = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Refreshed on cache hits (at most daily); eviction goes by this.
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+
 class Feedback(Base):
     __tablename__ = "feedback"
 
@@ -0,0 +1,167 @@
+# parallel_transcribe.py
+
+import os
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import whisper
+
+from config import settings
+
+SAMPLE_RATE = 16000
+
+# Per-process model, loaded once by the pool initializer.
+_worker_model = None
+
+# One pool per model size, least recently used first.
+_pools = OrderedDict()
+_pool_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    return settings.parallel_transcribe_workers or max(1, (os.cpu_count() or 2) // 2)
+
+
+def _init_worker(model_size: str, threads: int):
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_size)
+
+
+def _transcribe_window(args):
+    samples, offset, language = args
+    result = _worker_model.transcribe(
+        samples, language=language, condition_on_previous_text=False)
+    return [
+        {"start": seg["start"] + offset, "end": seg["end"] + offset,
+         "text": seg["text"]}
+        for seg in result.get("segments", [])
+    ]
+
+
+def get_pool(model_size: str = None, workers: int = None) -> ProcessPoolExecutor:
+    """
+    Long-lived process pool for `model_size`; each worker keeps its own
+    Whisper model. At most `whisper_max_loaded_models` pools are kept: the
+    least recently used one is shut down once its queued windows finish.
+    """
+    model_size = model_size or settings.whisper_model
+    with _pool_lock:
+        pool = _pools.get(model_size)
+        if pool is not None:
+            _pools.move_to_end(model_size)
+            return pool
+        while len(_pools) >= max(1, settings.whisper_max_loaded_models):
+            evicted_size, evicted = _pools.popitem(last=False)
+            print(f"🧹 Shutting down the {evicted_size} transcription pool")
+            evicted.shutdown(wait=False)
+        workers = workers or default_workers()
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        # spawn, not fork: the API process runs threads (job workers).
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_size, threads),
+        )
+        _pools[model_size] = pool
+        return pool
+
+
+def shutdown_pool():
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+
+def split_windows(total_samples: int, window_seconds: float, overlap_seconds: float):
+    """(start, end) sample ranges of overlapping windows covering the audio."""
+    window = int(window_seconds * SAMPLE_RATE)
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    step = max(1, window - overlap)
+    windows = []
+    start = 0
+    while start < total_samples:
+        end = min(start + window, total_samples)
+        windows.append((start, end))
+        if end >= total_samples:
+            break
+        start += step
+    return windows
+
+
+def stitch_segments(window_segments, windows):
+    """
+    Merge per-window segments into one timeline.
+
+    Inside each overlap the cut is placed at the middle of the overlapping
+    region: the earlier window keeps segments that start before the cut and
+    the later one keeps segments that start at or after it. An exact repeat
+    of the previous segment's text across the seam is dropped.
+    """
+    stitched = []
+    for i, segments in enumerate(window_segments):
+        lower = 0.0
+        upper = float("inf")
+        if i > 0:
+            prev_end = windows[i - 1][1] / SAMPLE_RATE
+            lower = (windows[i][0] / SAMPLE_RATE + prev_end) / 2
+        if i + 1 < len(windows):
+            this_end = windows[i][1] / SAMPLE_RATE
+            upper = (windows[i + 1][0] / SAMPLE_RATE + this_end) / 2
+
+        for seg in segments:
+            if not (lower <= seg["start"] < upper):
+                continue
+            text = seg["text"].strip()
+            if stitched and text and text == stitched[-1]["text"].strip():
+                continue
+            if stitched and seg["start"] < stitched[-1]["end"]:
+                seg = dict(seg, start=stitched[-1]["end"])
+            stitched.append(seg)
+    return stitched
+
+
+def detect_language(model, audio: np.ndarray) -> str:
+    """Detect the spoken language once so every window uses the same one."""
+    clip = whisper.pad_or_trim(audio[:whisper.audio.N_SAMPLES])
+    mel = whisper.log_mel_spectrogram(
+        clip, model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+
+def transcribe_parallel(audio: np.ndarray, language: str = None, model_size: str = None,
+                        window_seconds: float = None, overlap_seconds: float = None,
+                        on_progress=None):
+    """
+    Transcribe 16 kHz mono PCM by splitting it into overlapping windows and
+    running them across the process pool for `model_size` (default
+    `whisper_model`). Returns a Whisper-shaped result dict with `text`,
+    `segments` and `language`. `on_progress(fraction)` is called as windows
+    complete, in order.
+    """
+    window_seconds = window_seconds or settings.parallel_window_seconds
+    overlap_seconds = overlap_seconds if overlap_seconds is not None else settings.parallel_overlap_seconds
+
+    windows = split_windows(len(audio), window_seconds, overlap_seconds)
+    jobs = [(audio[start:end], start / SAMPLE_RATE, language)
+            for start, end in windows]
+    print(f"🧵 Transcribing {len(windows)} windows across {default_workers()} processes")
+
+    window_segments = []
+    for (_, end), segments in zip(windows, get_pool(model_size).map(_transcribe_window, jobs)):
+        window_segments.append(segments)
+        if on_progress:
+            on_progress(end / len(audio))
+    segments = stitch_segments(window_segments, windows)
+    return {
+        "text": " ".join(seg["text"].strip() for seg in segments),
+        "segments": segments,
+        "language": language,
+    }
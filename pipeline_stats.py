@@ -0,0 +1,55 @@
+# pipeline_stats.py
+
+from collections import defaultdict
+
+# Stages that older jobs recorded around their sub-stages ("uploading" around
+# encoding/upload_*, "indexing" around chunking/embedding/upserting). They
+# are skipped so per-stage totals don't count the same seconds twice.
+PARENT_STAGES = ("uploading", "indexing")
+
+
+def percentile(values, q: float):
+    """Nearest-rank percentile (q in 0-100) of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def describe(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values) if values else None,
+        "mean": round(sum(values) / len(values), 3) if values else None,
+    }
+
+
+def summarize_jobs(jobs):
+    """
+    Aggregate finished TranscriptionJob rows into per-stage p50/p95, plus
+    audio duration, real-time factor and end-to-end seconds.
+    """
+    stages = defaultdict(list)
+    durations, rtfs, totals = [], [], []
+    for job in jobs:
+        for stage, seconds in (job.timings or {}).items():
+            if stage not in PARENT_STAGES and isinstance(seconds, (int, float)):
+                stages[stage].append(seconds)
+        if job.audio_duration:
+            durations.append(job.audio_duration)
+        if job.real_time_factor is not None:
+            rtfs.append(job.real_time_factor)
+        if job.started_at and job.finished_at:
+            totals.append(
+                round((job.finished_at - job.started_at).total_seconds(), 3))
+
+    return {
+        "jobs": len(jobs),
+        "stages": {stage: describe(values) for stage, values in sorted(stages.items())},
+        "audio_duration": describe(durations),
+        "real_time_factor": describe(rtfs),
+        "total_seconds": describe(totals),
+    }
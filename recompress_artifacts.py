@@ -0,0 +1,121 @@
+# recompress_artifacts.py
+#
+# Rewrite transcript artifacts already in S3 (transcripts/*.txt, segment
+# .json and _quiz.json) zstd-compressed, optionally training the segment
+# JSON dictionary first.
+#
+#   python recompress_artifacts.py [--train-dict] [--samples 2000]
+#       [--workers 16] [--force] [--dry-run]
+#
+# Safe to re-run: objects already stored with Content-Encoding: zstd are
+# skipped unless --force (e.g. to move them onto a newly trained
+# dictionary). Each rewrite is conditional on the ETag that was read, so an
+# object the app changes meanwhile is left alone rather than clobbered.
+
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from config import settings
+from s3_utils import s3
+from artifact_compression import (
+    ENCODING, DICT_METADATA_KEY, artifact_kind, compress_artifact, decompress_artifact,
+    dictionaries, read_object, train_segments_dictionary
+)
+
+
+def list_artifact_keys(prefix: str = "transcripts/"):
+    keys = []
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=settings.s3_bucket, Prefix=prefix):
+        keys += [o["Key"] for o in page.get("Contents", []) if artifact_kind(o["Key"])]
+    return keys
+
+
+def train_dictionary(keys, samples: int, workers: int, dry_run: bool):
+    segment_keys = [k for k in keys if artifact_kind(k) == "segments"]
+    sample_keys = random.sample(segment_keys, min(samples, len(segment_keys)))
+    if not sample_keys:
+        print("⚠️ No segment objects to train a dictionary on")
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        bodies = list(pool.map(read_object, sample_keys))
+    dictionary = train_segments_dictionary(bodies)
+    print(f"📚 Trained a {len(dictionary.as_bytes()) / 1024:.0f} KB dictionary "
+          f"(id {dictionary.dict_id()}) from {len(bodies)} segment files")
+    if not dry_run:
+        dictionaries.publish(dictionary)
+
+
+def recompress(key: str, force: bool = False, dry_run: bool = False):
+    """(outcome, bytes before, bytes after) for one object."""
+    try:
+        obj = s3.get_object(Bucket=settings.s3_bucket, Key=key)
+    except ClientError:
+        return "missing", 0, 0
+    stored = obj["Body"].read()
+    if (obj.get("ContentEncoding") or "").lower() == ENCODING and not force:
+        return "already", len(stored), len(stored)
+
+    raw = decompress_artifact(stored, obj.get("ContentEncoding"))
+    body, extra = compress_artifact(key, raw)
+    if not extra:
+        return "incompressible", len(stored), len(stored)
+    if dry_run:
+        return "recompressed", len(stored), len(body)
+
+    metadata = {k: v for k, v in (obj.get("Metadata") or {}).items()
+                if k != DICT_METADATA_KEY}
+    metadata.update(extra.pop("Metadata", {}))
+    try:
+        s3.put_object(Bucket=settings.s3_bucket, Key=key, Body=body,
+                      ContentType=obj.get("ContentType") or "application/octet-stream",
+                      Metadata=metadata, IfMatch=obj["ETag"], **extra)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "412"):
+            return "changed", len(stored), len(stored)
+        raise
+    return "recompressed", len(stored), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Store existing transcript artifacts in S3 zstd-compressed.")
+    parser.add_argument("--prefix", default="transcripts/")
+    parser.add_argument("--train-dict", action="store_true",
+                        help="Train and publish a segment JSON dictionary first")
+    parser.add_argument("--samples", type=int, default=2000,
+                        help="Segment files to train the dictionary on")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--force", action="store_true",
+                        help="Re-encode objects that are already compressed")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report sizes without writing anything")
+    args = parser.parse_args()
+
+    keys = list_artifact_keys(args.prefix)
+    print(f"🔎 {len(keys)} transcript artifacts under {args.prefix}")
+    if args.train_dict:
+        train_dictionary(keys, args.samples, args.workers, args.dry_run)
+
+    counts = {}
+    before = after = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(lambda k: recompress(k, args.force, args.dry_run), keys)
+        for i, (outcome, size_before, size_after) in enumerate(results, 1):
+            counts[outcome] = counts.get(outcome, 0) + 1
+            before += size_before
+            after += size_after
+            if i % 500 == 0:
+                print(f"… {i}/{len(keys)} checked")
+
+    ratio = before / after if after else 1.0
+    print(f"✅ {'Checked' if args.dry_run else 'Done'}: "
+          + ", ".join(f"{n} {outcome}" for outcome, n in sorted(counts.items()))
+          + f"; {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({ratio:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
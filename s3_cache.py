@@ -0,0 +1,300 @@
+# s3_cache.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+from config import settings
+from s3_utils import s3
+from artifact_compression import put_object, decompress_artifact
+
+NOT_MODIFIED_CODES = ("304", "NotModified")
+MISSING_CODES = ("404", "NoSuchKey")
+CONFLICT_CODES = ("412", "PreconditionFailed", "ConditionalRequestConflict")
+
+
+class UpdateConflict(Exception):
+    """A read-modify-write kept losing to concurrent writers."""
+
+
+def _missing_error(key: str) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": f"{key} does not exist"}}, "GetObject")
+
+
+class _Entry:
+    __slots__ = ("body", "etag", "content_type", "checked_at")
+
+    def __init__(self, body, etag, content_type, checked_at):
+        self.body = body  # None marks an object known not to exist
+        self.etag = etag
+        self.content_type = content_type
+        self.checked_at = checked_at
+
+    @property
+    def size(self) -> int:
+        return len(self.body) if self.body else 0
+
+
+class S3ObjectCache:
+    """
+    Read-through cache for small S3 objects (transcripts, segments, notes,
+    tags, quizzes).
+
+    Bodies live in a memory LRU bounded by total bytes, optionally backed by
+    a disk tier that survives restarts. An entry younger than
+    `revalidate_seconds` is served without touching S3; an older one is
+    revalidated with a conditional GET on its ETag, which costs a round trip
+    but no transfer when unchanged. Writes made through `put()` and
+    `invalidate()` keep this process's view current immediately; other
+    processes see them once their copy is revalidated, so read-modify-write
+    callers use `update_json()`, which always revalidates and writes
+    conditionally on the ETag it read.
+
+    Missing objects are cached too and raise the same ClientError
+    (NoSuchKey) that `s3.get_object` would, so existing handlers still work.
+    Transcript artifacts are stored zstd-compressed (artifact_compression.py)
+    and cached decompressed.
+    """
+
+    def __init__(self, client, bucket: str, max_bytes: int, revalidate_seconds: float = 30.0,
+                 disk_dir: str = None, disk_max_bytes: int = 0):
+        self.client = client
+        self.bucket = bucket
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0,
+                       "disk_hits": 0, "evictions": 0, "invalidations": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # --- memory tier ---
+
+    def _remember(self, key: str, entry: _Entry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= old.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+
+    def _lookup(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    # --- disk tier ---
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _disk_load(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # Loaded from disk: always revalidate before trusting it.
+        return _Entry(body, meta["etag"], meta.get("content_type"), 0.0)
+
+    def _disk_store(self, key: str, entry: _Entry):
+        if not self.disk_dir or entry.body is None:
+            return
+        path = self._disk_path(key)
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(entry.body)
+            os.replace(path + ".tmp", path)
+            with open(path + ".json", "w", encoding="utf-8") as f:
+                json.dump({"key": key, "etag": entry.etag,
+                          "content_type": entry.content_type}, f)
+        except OSError as e:
+            print(f"⚠️ Could not write S3 cache entry for {key}: {e}")
+            return
+        self._disk_prune()
+
+    def _disk_remove(self, key: str):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        for p in (path, path + ".json"):
+            if os.path.exists(p):
+                os.remove(p)
+
+    def _disk_prune(self):
+        """Drop least recently written files once the tier is over budget."""
+        if not self.disk_max_bytes:
+            return
+        files = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json") or name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        if total <= self.disk_max_bytes:
+            return
+        for _, size, name in sorted(files):
+            for p in (os.path.join(self.disk_dir, name), os.path.join(self.disk_dir, name + ".json")):
+                if os.path.exists(p):
+                    os.remove(p)
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
+
+    # --- public API ---
+
+    def get(self, key: str) -> bytes:
+        """Object body for `key`; raises ClientError if it doesn't exist."""
+        return self._fetch(key).body
+
+    def _fetch(self, key: str, revalidate: bool = False) -> _Entry:
+        now = time.monotonic()
+        entry = self._lookup(key)
+        if entry and not revalidate and now - entry.checked_at < self.revalidate_seconds:
+            self._count("hits")
+            if entry.body is None:
+                raise _missing_error(key)
+            return entry
+
+        if entry is None:
+            entry = self._disk_load(key)
+            if entry:
+                self._count("disk_hits")
+
+        params = {"Bucket": self.bucket, "Key": key}
+        if entry and entry.etag:
+            params["IfNoneMatch"] = entry.etag
+        try:
+            obj = self.client.get_object(**params)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in NOT_MODIFIED_CODES and entry:
+                self._count("revalidated")
+                entry.checked_at = now
+                self._remember(key, entry)
+                return entry
+            if code in MISSING_CODES:
+                self._count("misses")
+                self._disk_remove(key)
+                self._remember(key, _Entry(None, None, None, now))
+            raise
+
+        self._count("misses")
+        body = decompress_artifact(obj["Body"].read(), obj.get("ContentEncoding"))
+        fresh = _Entry(body, obj.get("ETag"), obj.get("ContentType"), now)
+        self._remember(key, fresh)
+        self._disk_store(key, fresh)
+        return fresh
+
+    def get_json(self, key: str):
+        return json.loads(self.get(key).decode("utf-8"))
+
+    def update_json(self, key: str, update, attempts: int = 5):
+        """
+        Read-modify-write a JSON object safely across processes.
+        `update(data)` gets the current document (None if it doesn't exist)
+        and returns the new one; it may raise to abort. The read always
+        revalidates with S3 and the write is conditional on the ETag read,
+        so a concurrent edit from another process is retried rather than
+        overwritten. Returns the document written.
+        """
+        for _ in range(attempts):
+            try:
+                entry = self._fetch(key, revalidate=True)
+                data, condition = json.loads(entry.body.decode("utf-8")), {"IfMatch": entry.etag}
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in MISSING_CODES:
+                    raise
+                data, condition = None, {"IfNoneMatch": "*"}
+            data = update(data)
+            try:
+                self.put(key, json.dumps(data, indent=2), **condition)
+                return data
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in CONFLICT_CODES:
+                    raise
+                self.invalidate(key)
+        raise UpdateConflict(f"{key} kept changing while being updated")
+
+    def put(self, key: str, body, content_type: str = "application/json", **params):
+        """Write through to S3 and keep the new body cached."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        response = put_object(key, body, content_type,
+                              client=self.client, bucket=self.bucket, **params)
+        entry = _Entry(body, response.get("ETag"),
+                       content_type, time.monotonic())
+        self._remember(key, entry)
+        self._disk_store(key, entry)
+        return response
+
+    def invalidate(self, *keys: str):
+        """Forget `keys` after they were changed or deleted elsewhere."""
+        with self._lock:
+            for key in keys:
+                old = self._entries.pop(key, None)
+                if old:
+                    self._bytes -= old.size
+            self._stats["invalidations"] += len(keys)
+        for key in keys:
+            self._disk_remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(items=len(self._entries), bytes=self._bytes,
+                         max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        # Revalidated reads still avoid transferring the body.
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["hit_or_revalidated_rate"] = round(
+            (stats["hits"] + stats["revalidated"]) / lookups, 4) if lookups else None
+        return stats
+
+
+object_cache = S3ObjectCache(
+    s3,
+    settings.s3_bucket,
+    max_bytes=settings.s3_cache_memory_bytes,
+    revalidate_seconds=settings.s3_cache_revalidate_seconds,
+    disk_dir=settings.s3_cache_disk_dir,
+    disk_max_bytes=settings.s3_cache_disk_max_bytes,
+)
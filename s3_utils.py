@@ -1,16 +1,116 @@
 # s3_utils.py
+import hashlib
+
 import boto3
+from botocore.config import Config
 from config import settings
 
 s3 = boto3.client(
     "s3",
     aws_access_key_id=settings.aws_access_key_id,
     aws_secret_access_key=settings.aws_secret_access_key,
-    region_name=settings.aws_region
+    region_name=settings.aws_region,
+    endpoint_url=settings.s3_endpoint_url,
+    # SigV4 is required for presigned POSTs/part URLs in newer regions.
+    config=Config(signature_version="s3v4"),
 )
 
+# S3 allows at most 10,000 parts per multipart upload.
+MAX_MULTIPART_PARTS = 10_000
+
 
 def upload_to_s3(local_path: str, s3_key: str) -> str:
     s3.upload_file(local_path, settings.s3_bucket, s3_key)
     url = f"https://{settings.s3_bucket}.s3.{settings.aws_region}.amazonaws.com/{s3_key}"
     return url
+
+
+def presign_get(s3_key: str, download_name: str = None, expires_in: int = None) -> str:
+    """Short-lived GET URL; S3 itself then serves Range requests."""
+    params = {"Bucket": settings.s3_bucket, "Key": s3_key}
+    if download_name:
+        params["ResponseContentDisposition"] = f'attachment; filename="{download_name}"'
+    return s3.generate_presigned_url(
+        "get_object", Params=params, ExpiresIn=expires_in or settings.media_url_ttl)
+
+
+def presign_post(s3_key: str, max_bytes: int, metadata: dict = None, expires_in: int = None) -> dict:
+    """
+    Presigned POST form (url + fields) that only accepts an object at exactly
+    `s3_key`, no larger than `max_bytes`, carrying the given metadata.
+    """
+    fields = {f"x-amz-meta-{k}": v for k, v in (metadata or {}).items()}
+    conditions = [{k: v} for k, v in fields.items()]
+    conditions.append(["content-length-range", 1, max_bytes])
+    return s3.generate_presigned_post(
+        Bucket=settings.s3_bucket,
+        Key=s3_key,
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=expires_in or settings.direct_upload_url_ttl,
+    )
+
+
+def presign_multipart(s3_key: str, size: int, part_size: int = None, metadata: dict = None, expires_in: int = None) -> dict:
+    """Start a multipart upload and presign a PUT URL for every part."""
+    part_size = part_size or settings.direct_upload_part_size
+    part_size = max(part_size, -(-size // MAX_MULTIPART_PARTS))
+    part_count = -(-size // part_size)
+
+    upload = s3.create_multipart_upload(
+        Bucket=settings.s3_bucket, Key=s3_key, Metadata=metadata or {})
+    parts = [
+        {
+            "part_number": n,
+            "url": s3.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": settings.s3_bucket, "Key": s3_key,
+                        "UploadId": upload["UploadId"], "PartNumber": n},
+                ExpiresIn=expires_in or settings.direct_upload_url_ttl,
+            ),
+        }
+        for n in range(1, part_count + 1)
+    ]
+    return {"upload_id": upload["UploadId"], "part_size": part_size, "parts": parts}
+
+
+def complete_multipart(s3_key: str, upload_id: str, parts=None):
+    """
+    Finish a multipart upload. `parts` is [(part_number, etag), ...] as
+    reported by the browser; when omitted the parts are listed from S3.
+    """
+    if not parts:
+        parts = []
+        paginator = s3.get_paginator("list_parts")
+        for page in paginator.paginate(Bucket=settings.s3_bucket, Key=s3_key, UploadId=upload_id):
+            parts.extend((p["PartNumber"], p["ETag"])
+                         for p in page.get("Parts", []))
+    s3.complete_multipart_upload(
+        Bucket=settings.s3_bucket,
+        Key=s3_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": n, "ETag": etag}
+                                   for n, etag in sorted(parts)]},
+    )
+
+
+def abort_multipart(s3_key: str, upload_id: str):
+    s3.abort_multipart_upload(
+        Bucket=settings.s3_bucket, Key=s3_key, UploadId=upload_id)
+
+
+def download_to_file(s3_key: str, dest_path: str, chunk_size: int = None):
+    """
+    Stream an object to disk without holding it in memory.
+    Returns (size_in_bytes, sha256_hex).
+    """
+    chunk_size = chunk_size or settings.upload_chunk_size
+    digest = hashlib.sha256()
+    size = 0
+    body = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)["Body"]
+    with open(dest_path, "wb") as f:
+        for chunk in body.iter_chunks(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+            f.write(chunk)
+    return size, digest.hexdigest()
@@ -0,0 +1,261 @@
+# segment_patches.py
+
+import os
+import json
+from datetime import datetime, timedelta
+
+import jsonpatch
+from botocore.exceptions import ClientError
+from sqlalchemy import or_, func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import UserFile, SegmentPatch
+from s3_cache import object_cache
+from segment_store import CompactSegments, segment_index_key, CONTENT_TYPE as SEGMENTS_CONTENT_TYPE
+
+# Segment edits are stored as a log of RFC 6902 patches on top of a snapshot:
+# an edit inserts one small segment_patches row and bumps the version
+# instead of rewriting the whole document in S3 and the database. Reads
+# replay the pending patches; `compact()` folds them back into the snapshot
+# (and the S3 .json/.seg copies) once enough have piled up, and
+# `compact_idle()` does the same once a file has stopped being edited.
+
+
+class PatchConflict(Exception):
+    """The segments changed since the version the editor started from."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Segments are at version {current_version}")
+        self.current_version = current_version
+
+
+class InvalidPatch(ValueError):
+    """The operations don't apply, or leave malformed segments behind."""
+
+
+def version_etag(version: int) -> str:
+    return f'"v{version}"'
+
+
+def parse_version_etag(value: str):
+    """Version number from an If-Match header, or None if it isn't ours."""
+    value = (value or "").strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+    if value[:1] == "v" and value[1:].isdigit():
+        return int(value[1:])
+    return None
+
+
+def validate_segments(segments):
+    if not isinstance(segments, list):
+        raise InvalidPatch("Segments must be a list.")
+    for i, seg in enumerate(segments):
+        if not isinstance(seg, dict) or not isinstance(seg.get("text", ""), str):
+            raise InvalidPatch(f"Segment {i} must be an object with a text string.")
+        start, end = seg.get("start"), seg.get("end")
+        if not all(isinstance(t, (int, float)) and not isinstance(t, bool) for t in (start, end)):
+            raise InvalidPatch(f"Segment {i} needs numeric start and end.")
+        if end < start:
+            raise InvalidPatch(f"Segment {i} ends before it starts.")
+
+
+def _base_name(filename: str) -> str:
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def _document_row(db: Session, filename: str, lock: bool = False):
+    # Column query: the segments come back as fresh objects, so patches can
+    # be applied in place without touching anything in the session.
+    query = db.query(
+        UserFile.id, UserFile.transcript_text, UserFile.transcript_segments,
+        UserFile.segments_version, UserFile.segments_snapshot_version
+    ).filter(UserFile.filename == os.path.basename(filename))
+    if lock:
+        query = query.with_for_update()
+    return query.first()
+
+
+def _replay(db: Session, row, segments):
+    if row.segments_version == row.segments_snapshot_version:
+        return segments
+    patches = db.query(SegmentPatch.ops).filter(
+        SegmentPatch.user_file_id == row.id,
+        SegmentPatch.version > row.segments_snapshot_version,
+        SegmentPatch.version <= row.segments_version
+    ).order_by(SegmentPatch.version)
+    for patch in patches:
+        segments = jsonpatch.apply_patch(segments, patch.ops, in_place=True)
+    return segments
+
+
+def load_document(db: Session, filename: str):
+    """
+    (text, segments, version) from the database with pending patches
+    applied, or None if the transcript isn't stored there.
+    """
+    row = _document_row(db, filename)
+    if not row or row.transcript_text is None:
+        return None
+    return row.transcript_text, _replay(db, row, row.transcript_segments or []), row.segments_version
+
+
+def current_version(db: Session, filename: str):
+    row = db.query(UserFile.segments_version).filter(
+        UserFile.filename == os.path.basename(filename)).first()
+    return row.segments_version if row else None
+
+
+def has_pending_patches(db: Session, filename: str) -> bool:
+    row = db.query(UserFile.segments_version, UserFile.segments_snapshot_version).filter(
+        UserFile.filename == os.path.basename(filename)).first()
+    return bool(row) and row.segments_version != row.segments_snapshot_version
+
+
+def apply_patch(db: Session, filename: str, base_version: int, ops, email: str = None):
+    """
+    Apply RFC 6902 `ops` to the segments at `base_version`. Returns
+    (new_version, segments, pending_patches), or None if there is no such
+    file. Raises PatchConflict if another edit got there first and
+    InvalidPatch if the operations fail or produce malformed segments.
+    """
+    if not isinstance(ops, list) or not ops:
+        raise InvalidPatch("Expected a non-empty JSON Patch array.")
+    row = _document_row(db, filename, lock=True)
+    if not row:
+        return None
+    if row.segments_version != base_version:
+        db.rollback()
+        raise PatchConflict(row.segments_version)
+
+    seed = {}
+    if row.transcript_text is None:
+        # Transcript only in S3 so far: it becomes the snapshot the patch
+        # log builds on.
+        base_name = _base_name(filename)
+        try:
+            seed[UserFile.transcript_text] = object_cache.get(
+                f"transcripts/{base_name}.txt").decode("utf-8")
+        except ClientError:
+            db.rollback()
+            return None
+        try:
+            seed[UserFile.transcript_segments] = object_cache.get_json(
+                f"transcripts/{base_name}.json")
+        except ClientError:
+            seed[UserFile.transcript_segments] = []
+        segments = json.loads(json.dumps(seed[UserFile.transcript_segments]))
+    else:
+        segments = _replay(db, row, row.transcript_segments or [])
+
+    try:
+        segments = jsonpatch.apply_patch(segments, ops, in_place=True)
+    except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException) as e:
+        db.rollback()
+        raise InvalidPatch(str(e))
+    except (TypeError, KeyError, ValueError) as e:
+        db.rollback()
+        raise InvalidPatch(f"Malformed patch: {e}")
+    try:
+        validate_segments(segments)
+    except InvalidPatch:
+        db.rollback()
+        raise
+
+    version = row.segments_version + 1
+    db.add(SegmentPatch(user_file_id=row.id, version=version, ops=ops, email=email))
+    # Only the version changes; Postgres keeps the TOASTed snapshot as is.
+    db.query(UserFile).filter(UserFile.id == row.id).update(
+        {UserFile.segments_version: version, **seed}, synchronize_session=False)
+    db.commit()
+    return version, segments, version - row.segments_snapshot_version
+
+
+def replace_segments(db: Session, filename: str, segments) -> int:
+    """
+    Store a whole new segments list in the database (for full saves and
+    AI re-segmentation), dropping any pending patches. Returns the new version.
+    """
+    base_name = _base_name(filename)
+    rows = or_(UserFile.filename == os.path.basename(filename),
+               UserFile.filename.like(f"{base_name}.%"))
+    ids = [r.id for r in db.query(UserFile.id).filter(rows)]
+    db.query(UserFile).filter(rows).update({
+        UserFile.transcript_segments: segments,
+        UserFile.segments_version: UserFile.segments_version + 1,
+        UserFile.segments_snapshot_version: UserFile.segments_version + 1,
+    }, synchronize_session=False)
+    if ids:
+        db.query(SegmentPatch).filter(SegmentPatch.user_file_id.in_(ids)).delete(
+            synchronize_session=False)
+    db.commit()
+    return current_version(db, filename) or 0
+
+
+def put_segment_objects(base_name: str, segments) -> CompactSegments:
+    """Write the S3 .json and compact .seg copies of a segments list."""
+    object_cache.put(f"transcripts/{base_name}.json", json.dumps(segments, indent=2))
+    compact = CompactSegments.from_segments(segments)
+    object_cache.put(segment_index_key(base_name), compact.to_bytes(),
+                     content_type=SEGMENTS_CONTENT_TYPE)
+    return compact
+
+
+def compact(filename: str, db: Session = None) -> bool:
+    """
+    Fold pending patches into the snapshot, refresh the S3 copies and drop
+    the folded log entries. Returns False if there was nothing to do.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        row = _document_row(db, filename, lock=True)
+        if not row or row.segments_version == row.segments_snapshot_version:
+            db.rollback()
+            return False
+        segments = _replay(db, row, row.transcript_segments or [])
+        base_name = _base_name(filename)
+        put_segment_objects(base_name, segments)
+
+        db.query(UserFile).filter(or_(
+            UserFile.filename == os.path.basename(filename),
+            UserFile.filename.like(f"{base_name}.%"))).update(
+            {UserFile.transcript_segments: segments}, synchronize_session=False)
+        db.query(UserFile).filter(UserFile.id == row.id).update(
+            {UserFile.segments_snapshot_version: row.segments_version}, synchronize_session=False)
+        db.query(SegmentPatch).filter(
+            SegmentPatch.user_file_id == row.id,
+            SegmentPatch.version <= row.segments_version).delete(synchronize_session=False)
+        db.commit()
+        print(f"🗜️ Compacted {row.segments_version - row.segments_snapshot_version} "
+              f"segment patches for {filename}")
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Segment patch compaction failed for {filename}: {e}")
+        return False
+    finally:
+        if own_session:
+            db.close()
+
+
+def compact_idle(idle_seconds: float) -> int:
+    """
+    Compact every file with pending patches whose newest edit is at least
+    `idle_seconds` old. Returns how many files were compacted.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=idle_seconds)
+    db = SessionLocal()
+    try:
+        rows = db.query(UserFile.filename).join(
+            SegmentPatch, SegmentPatch.user_file_id == UserFile.id
+        ).filter(
+            UserFile.segments_version != UserFile.segments_snapshot_version
+        ).group_by(UserFile.id, UserFile.filename).having(
+            func.max(SegmentPatch.created_at) < cutoff
+        ).all()
+    finally:
+        db.close()
+    return sum(1 for row in rows if compact(row.filename))
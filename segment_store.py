@@ -0,0 +1,146 @@
+# segment_store.py
+
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# SEG1 files lacked `positions`; readers rebuild them from the JSON.
+MAGIC = b"SEG2"
+# magic, segment count, text blob length
+HEADER = struct.Struct("<4sII")
+CONTENT_TYPE = "application/x-segments"
+
+
+def segment_index_key(base_name: str) -> str:
+    """S3 key of a transcript's compact segments, next to its .json."""
+    return f"transcripts/{base_name}.seg"
+
+
+def _float_array(values=()):
+    return array("d", values)
+
+
+def _offset_array(values=()):
+    return array("I", values)
+
+
+def _time(seg, field: str) -> float:
+    return float(seg.get(field) or 0)
+
+
+class CompactSegments:
+    """
+    Column-oriented transcript segments: parallel start/end float64 arrays,
+    a running maximum of end times for window searches, and one UTF-8 text
+    blob addressed by offsets. Serializes to a flat little-endian binary
+    layout, so loading is a handful of memory copies instead of parsing
+    one JSON object per segment.
+
+    Rows are kept sorted by time for bisection; `positions` maps each row
+    back to the segment's index in the stored JSON array, which is what
+    JSON Patch paths address.
+
+    Layout: header | starts[n] | ends[n] | max_ends[n] | positions[n] | offsets[n+1] | text
+    """
+
+    def __init__(self, starts, ends, offsets, text: bytes, positions, max_ends=None):
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.text = text
+        self.positions = positions
+        # Segments can overlap, so search on the running max of `ends`.
+        self.max_ends = max_ends if max_ends is not None else _float_array(accumulate(ends, max))
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_segments(cls, segments):
+        # sorted() is stable and linear on the usual already-ordered input.
+        ordered = sorted(range(len(segments)), key=lambda i: (
+            _time(segments[i], "start"), _time(segments[i], "end")))
+        starts, ends, offsets = _float_array(), _float_array(), _offset_array([0])
+        blob = bytearray()
+        for i in ordered:
+            seg = segments[i]
+            start = _time(seg, "start")
+            starts.append(start)
+            ends.append(max(start, _time(seg, "end")))
+            blob += (seg.get("text") or "").encode("utf-8")
+            offsets.append(len(blob))
+        return cls(starts, ends, offsets, bytes(blob), _offset_array(ordered))
+
+    def to_bytes(self) -> bytes:
+        return b"".join([
+            HEADER.pack(MAGIC, len(self), len(self.text)),
+            self.starts.tobytes(),
+            self.ends.tobytes(),
+            self.max_ends.tobytes(),
+            self.positions.tobytes(),
+            self.offsets.tobytes(),
+            self.text,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        magic, count, text_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compact segment file")
+        view = memoryview(data)
+        pos = HEADER.size
+        starts = _float_array()
+        starts.frombytes(view[pos:pos + 8 * count])
+        pos += 8 * count
+        ends = _float_array()
+        ends.frombytes(view[pos:pos + 8 * count])
+        pos += 8 * count
+        max_ends = _float_array()
+        max_ends.frombytes(view[pos:pos + 8 * count])
+        pos += 8 * count
+        positions = _offset_array()
+        positions.frombytes(view[pos:pos + 4 * count])
+        pos += 4 * count
+        offsets = _offset_array()
+        offsets.frombytes(view[pos:pos + 4 * (count + 1)])
+        pos += 4 * (count + 1)
+        return cls(starts, ends, offsets, bytes(view[pos:pos + text_len]), positions, max_ends)
+
+    def segment(self, i: int) -> dict:
+        """Row `i` in time order; `index` is its position in the stored array."""
+        return {
+            "index": self.positions[i],
+            "start": self.starts[i],
+            "end": self.ends[i],
+            "text": self.text[self.offsets[i]:self.offsets[i + 1]].decode("utf-8"),
+        }
+
+    def window_indexes(self, t_from: float = None, t_to: float = None):
+        """
+        range() of segments overlapping [t_from, t_to), found by bisection.
+        With t_from == t_to it selects the segments playing at that instant.
+        """
+        lo = 0 if t_from is None else bisect_right(self.max_ends, t_from)
+        if t_to is None:
+            hi = len(self)
+        elif t_to == t_from:
+            hi = bisect_right(self.starts, t_to)
+        else:
+            hi = bisect_left(self.starts, t_to)
+        return range(lo, max(lo, hi))
+
+    def window(self, t_from: float = None, t_to: float = None):
+        """Segments overlapping [t_from, t_to) as dicts, in time order."""
+        return [
+            self.segment(i) for i in self.window_indexes(t_from, t_to)
+            if t_from is None or self.ends[i] > t_from
+        ]
+
+    def to_segments(self):
+        """The segments in their stored order."""
+        segments = [None] * len(self)
+        for i in range(len(self)):
+            seg = self.segment(i)
+            segments[seg.pop("index")] = seg
+        return segments
@@ -3,6 +3,8 @@ let allTranscripts = [];
 let editMode = false;
 let audioHighlightInterval = null;
 let pendingDeleteFilename = null;
+// Segments as loaded into the detail view, with their version ETag, so saves send only the edits.
+let loadedSegments = { filename: null, etag: null, segments: [] };
 
 // --- AUTH & FETCH WRAPPER ---
 async function fetchWithRefresh(url, options = {}, attempt = 0) {
@@ -152,7 +154,12 @@ async function uploadFile() {
         const res = await fetchWithRefresh("/api/upload", { method: "POST", body: formData });
         if (!res.ok) throw new Error((await res.json()).detail || "Upload failed");
         const result = await res.json();
-        showToast("Upload successful: " + result.filename, "success");
+        showToast("Upload received, transcribing: " + result.filename, "info");
+        uploadBtn.textContent = "Queued...";
+        const job = await watchJob(result.job_id, event => { uploadBtn.textContent = describeJobEvent(event); });
+        if (job.status === "error") throw new Error(job.error || "Transcription failed");
+        showToast("Transcription complete: " + result.filename, "success");
+        if (job.error) showToast(job.error, "error");
         loadHistory();
     } catch (err) {
         showToast("Error: " + err.message, "error");
@@ -160,13 +167,59 @@ async function uploadFile() {
         uploadBtn.disabled = false; uploadBtn.textContent = "Upload & Transcribe"; document.getElementById("spinner").style.display = "none"; fileInput.value = "";
     }
 }
+function describeJobEvent(event) {
+    const stage = event.stage || event.status;
+    const label = stage.charAt(0).toUpperCase() + stage.slice(1);
+    if (stage === "transcribing" && event.percent != null) return `${label} ${Math.round(event.percent)}%...`;
+    return `${label}...`;
+}
+// Follow a job over server-sent events; falls back to polling if the stream drops.
+async function watchJob(jobId, onEvent = () => { }) {
+    try {
+        const res = await fetchWithRefresh(`/api/jobs/${jobId}/events`, { headers: { Accept: "text/event-stream" } });
+        if (!res.ok || !res.body) throw new Error("Event stream unavailable");
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += value.replace(/\r\n/g, "\n");
+            let sep;
+            while ((sep = buffer.indexOf("\n\n")) !== -1) {
+                const block = buffer.slice(0, sep); buffer = buffer.slice(sep + 2);
+                const data = block.split("\n").filter(l => l.startsWith("data:")).map(l => l.slice(5).trim()).join("\n");
+                if (!data) continue;
+                const event = JSON.parse(data);
+                onEvent(event);
+                if (event.status === "done" || event.status === "error") { reader.cancel(); return event; }
+            }
+        }
+    } catch (err) {
+        console.warn("Job event stream failed, polling instead:", err);
+    }
+    return waitForJob(jobId);
+}
+async function waitForJob(jobId, intervalMs = 2000) {
+    while (true) {
+        const res = await fetchWithRefresh(`/api/jobs/${jobId}`);
+        if (!res.ok) throw new Error("Failed to check transcription status");
+        const job = await res.json();
+        if (job.status === "done" || job.status === "error") return job;
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
 async function loadHistory() {
     try {
-        const res = await fetchWithRefresh("/api/transcripts");
-        if (!res.ok) throw new Error("Failed to load history");
-
-        // FIX: The backend returns an array directly, not an object with a .files property.
-        allTranscripts = await res.json();
+        // Pages are cursor-linked; unchanged pages come back as 304 and are served from the browser cache.
+        const items = [];
+        let cursor = null;
+        do {
+            const res = await fetchWithRefresh("/api/transcripts?limit=500" + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""));
+            if (!res.ok) throw new Error("Failed to load history");
+            items.push(...await res.json());
+            cursor = res.headers.get("X-Next-Cursor");
+        } while (cursor);
+        allTranscripts = items;
 
         filterTranscripts();
     } catch (err) { showToast(err.message, "error"); }
@@ -243,14 +296,18 @@ async function loadTranscriptForDetailView(filename) {
     panel.style.display = "block"; document.getElementById("transcriptDetailFilename").innerText = filename;
     previewBox.innerHTML = "<em>Loading...</em>"; noteTextarea.value = ""; noteTextarea.dataset.filename = filename; audioPlayer.style.display = 'none'; document.getElementById("lastSavedTime").innerText = "";
     try {
-        const [transcriptRes, noteRes, audioRes] = await Promise.all([fetchWithRefresh(`/api/transcript/${filename}`), fetchWithRefresh(`/api/transcript/${filename}/note`), fetchWithRefresh(`/audio/${filename}`)]);
+        // The player requests /audio directly: it redirects to S3 (or serves ranges), so seeking doesn't download the whole file.
+        audioPlayer.onloadedmetadata = () => { audioPlayer.style.display = 'block'; };
+        audioPlayer.onerror = () => { audioPlayer.style.display = 'none'; };
+        audioPlayer.preload = "metadata"; audioPlayer.src = `/audio/${filename}`;
+        const [transcriptRes, noteRes] = await Promise.all([fetchWithRefresh(`/api/transcript/${filename}`), fetchWithRefresh(`/api/transcript/${filename}/note`)]);
         if (!transcriptRes.ok) throw new Error("Transcript load failed");
         const transcriptData = await transcriptRes.json();
+        loadedSegments = { filename, etag: transcriptRes.headers.get("ETag"), segments: transcriptData.segments || [] };
         previewBox.innerHTML = "";
         if (transcriptData.segments && transcriptData.segments.length) {
             transcriptData.segments.forEach(seg => { const div = document.createElement("div"); div.className = "transcript-segment"; div.textContent = seg.text; div.dataset.start = seg.start; div.dataset.end = seg.end; div.onclick = () => playSegmentFrom(seg.start); previewBox.appendChild(div); });
         } else { previewBox.innerText = transcriptData.transcript || "[Empty]"; }
-        if (audioRes.ok) { const audioBlob = await audioRes.blob(); audioPlayer.src = URL.createObjectURL(audioBlob); audioPlayer.style.display = 'block'; }
         const noteData = noteRes.ok ? await noteRes.json() : { note: "" }; noteTextarea.value = noteData.note || "";
     } catch (err) { showToast("Error loading details: " + err.message, "error"); previewBox.innerHTML = `<p style="color:red;">Failed to load details.</p>`; }
 }
@@ -288,25 +345,33 @@ function toggleEditSegments(button) {
 async function saveEditedSegments() {
     const filename = document.getElementById("noteInput").dataset.filename;
     const textareas = document.querySelectorAll('#transcriptPreviewBox .segment-editor');
-    // We need to re-fetch original segments to get timestamps as they are lost in edit mode
-    const transcriptRes = await fetchWithRefresh(`/api/transcript/${filename}`);
-    const originalData = await transcriptRes.json();
-    const originalSegments = originalData.segments || [];
+    // Timestamps are lost in edit mode; they come from the segments the view was loaded with.
+    const originalSegments = loadedSegments.filename === filename ? loadedSegments.segments : [];
 
     if (textareas.length !== originalSegments.length) {
         showToast("Segment mismatch error. Cannot save.", "error");
         return;
     }
 
-    const updatedSegments = Array.from(textareas).map((textarea, index) => ({
-        text: textarea.value,
-        start: originalSegments[index].start,
-        end: originalSegments[index].end
-    }));
+    // One JSON Patch "replace" per edited segment, so a one-word fix uploads one small op.
+    const ops = [];
+    Array.from(textareas).forEach((textarea, index) => {
+        if (textarea.value !== originalSegments[index].text) ops.push({ op: "replace", path: `/${index}/text`, value: textarea.value });
+    });
+    if (!ops.length) return;
 
     try {
-        const res = await fetchWithRefresh(`/api/transcript/${filename}/segments`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ segments: updatedSegments }) });
+        let res;
+        if (loadedSegments.etag) {
+            res = await fetchWithRefresh(`/api/transcript/${filename}/segments`, { method: "PATCH", headers: { "Content-Type": "application/json-patch+json", "If-Match": loadedSegments.etag }, body: JSON.stringify(ops) });
+        } else {
+            const updatedSegments = Array.from(textareas).map((textarea, index) => ({ ...originalSegments[index], text: textarea.value }));
+            res = await fetchWithRefresh(`/api/transcript/${filename}/segments`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ segments: updatedSegments }) });
+        }
+        if (res.status === 412) throw new Error("Someone else edited this transcript. Reload it to see their changes before saving.");
         if (!res.ok) throw new Error("Failed to save segments");
+        ops.forEach(op => { originalSegments[parseInt(op.path.split("/")[1], 10)].text = op.value; });
+        loadedSegments.etag = res.headers.get("ETag") || loadedSegments.etag;
         document.getElementById("lastSavedTime").innerText = `Last saved: ${new Date().toLocaleTimeString()}`;
     } catch (err) { showToast("Error saving segments: " + err.message, "error"); throw err; }
 }
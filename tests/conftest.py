@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py requires these; tests never talk to the real services.
+for name, value in {
+    "DATABASE_URL": "sqlite://",
+    "OPENAI_API_KEY": "test",
+    "PINECONE_API_KEY": "test",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_REGION": "us-east-1",
+    "JWT_SECRET_KEY": "test",
+    "SMARTAI_SMTP_HOST": "localhost",
+    "SMARTAI_SMTP_PORT": "25",
+    "SMARTAI_SMTP_USER": "test",
+    "SMARTAI_SMTP_PASS": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database, also behind SessionLocal."""
+    pytest.importorskip("sqlalchemy")
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    import models
+    from database import Base, SessionLocal
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+    session = SessionLocal()
+    session.add(models.User(id=1, email="owner@example.com", hashed_password="x",
+                            name="Owner", role="owner"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+
+from chunking import chunk_segments, chunk_vector_id, count_tokens, encode, _split_long_unit
+
+
+def lecture(count=80):
+    return [
+        {"start": i * 4.0, "end": i * 4.0 + 4.0,
+         "text": f"Segment {i} talks about topic {i % 7} and how it relates to the last one."}
+        for i in range(count)
+    ]
+
+
+def vector_ids(segments):
+    return [chunk_vector_id("lecture", c) for c in chunk_segments(segments)]
+
+
+def test_editing_one_segment_changes_one_chunk_id():
+    segments = lecture()
+    before = vector_ids(segments)
+
+    edited = [dict(s) for s in segments]
+    # Much longer than before, so greedy packing from the start would move
+    # every later boundary.
+    edited[21]["text"] = "Corrected: " + "a considerably longer sentence " * 6
+    after = vector_ids(edited)
+
+    assert len(set(before) - set(after)) == 1
+    assert len(set(after) - set(before)) == 1
+
+
+def test_chunks_stay_in_segment_order():
+    chunks = chunk_segments(lecture())
+    starts = [c["start"] for c in chunks]
+    assert starts == sorted(starts)
+    assert chunks[0]["start"] == 0.0
+    assert chunks[-1]["end"] == 80 * 4.0
+
+
+def test_chunks_respect_max_tokens():
+    for chunk in chunk_segments(lecture(), max_tokens=60, overlap_tokens=10, group_segments=None):
+        assert chunk["tokens"] <= 60
+        assert count_tokens(chunk["text"]) <= 60
+
+
+def test_overlap_carries_trailing_segments_into_next_chunk():
+    segments = lecture(30)
+    chunks = chunk_segments(segments, max_tokens=80, overlap_tokens=30, group_segments=None)
+    assert len(chunks) > 2
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # The next chunk starts inside the previous one, with the same text.
+        assert previous["start"] < chunk["start"] < previous["end"]
+        carried = [s["text"] for s in segments if chunk["start"] <= s["start"] < previous["end"]]
+        assert carried and previous["text"].endswith(" ".join(carried))
+        assert chunk["text"].startswith(" ".join(carried))
+        assert count_tokens(" ".join(carried)) <= 30
+
+
+def test_without_overlap_every_segment_lands_in_one_chunk():
+    segments = lecture(30)
+    chunks = chunk_segments(segments, max_tokens=80, overlap_tokens=0, group_segments=None)
+    assert " ".join(c["text"] for c in chunks) == " ".join(s["text"] for s in segments)
+
+
+def test_long_segment_is_split_with_interpolated_times():
+    words = " ".join(f"word{i}" for i in range(300))
+    segments = [{"start": 10.0, "end": 70.0, "text": words}]
+    chunks = chunk_segments(segments, max_tokens=50, overlap_tokens=10)
+
+    assert len(chunks) > 1
+    assert all(c["tokens"] <= 50 for c in chunks)
+    assert chunks[0]["start"] == 10.0
+    assert chunks[-1]["end"] == 70.0
+    starts = [c["start"] for c in chunks]
+    assert starts == sorted(starts)
+    assert all(10.0 <= c["start"] < c["end"] <= 70.0 for c in chunks)
+    # Pieces overlap, so no words are lost at the cuts.
+    assert "word0" in chunks[0]["text"] and "word299" in chunks[-1]["text"]
+    tokens = encode(words)
+    assert chunks[1]["text"] == _split_long_unit(tokens, 10.0, 70.0, 50, 10)[1]["text"]
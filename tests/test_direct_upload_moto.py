@@ -0,0 +1,157 @@
+import os
+import uuid
+import types
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+requests = pytest.importorskip("requests")
+boto3 = pytest.importorskip("boto3")
+pytest.importorskip("fastapi")
+
+BUCKET = "direct-upload-test"
+OWNER = types.SimpleNamespace(id=1, email="owner@example.com", role="owner")
+OTHER_OWNER = types.SimpleNamespace(id=2, email="other@example.com", role="owner")
+
+
+@pytest.fixture(scope="module")
+def s3_client():
+    """A bucket on moto's S3 run as a real HTTP server: presigned URLs need one."""
+    server = moto_server.ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    client = boto3.client("s3", region_name="us-east-1", endpoint_url=f"http://{host}:{port}",
+                          aws_access_key_id="testing", aws_secret_access_key="testing")
+    client.create_bucket(Bucket=BUCKET)
+    yield client
+    server.stop()
+
+
+@pytest.fixture
+def routes(s3_client, monkeypatch):
+    """direct_upload_routes with its S3 client pointed at the moto server."""
+    import s3_utils
+    import direct_upload_routes
+
+    monkeypatch.setattr(s3_utils, "s3", s3_client)
+    monkeypatch.setattr(direct_upload_routes, "s3", s3_client)
+    monkeypatch.setattr(direct_upload_routes.settings, "s3_bucket", BUCKET)
+    return direct_upload_routes
+
+
+@pytest.fixture
+def enqueued(routes, monkeypatch):
+    """Records queued jobs instead of handing them to the transcription workers."""
+    from models import TranscriptionJob
+
+    calls = []
+
+    def enqueue_upload(db, user, filename, original_filename, size, source_key=None):
+        job = TranscriptionJob(id=uuid.uuid4().hex, user_id=user.id, email=user.email,
+                               filename=filename, original_filename=original_filename,
+                               file_size=size, source_key=source_key, status="queued")
+        db.add(job)
+        db.commit()
+        calls.append({"filename": filename, "original_filename": original_filename,
+                      "size": size, "source_key": source_key})
+        return job
+
+    monkeypatch.setattr(routes, "enqueue_upload", enqueue_upload)
+    return calls
+
+
+def expect_error(status, fn, *args, **kwargs):
+    from fastapi import HTTPException
+    with pytest.raises(HTTPException) as exc:
+        fn(*args, **kwargs)
+    assert exc.value.status_code == status
+
+
+def post_upload(routes, body, filename="talk.wav", user=OWNER):
+    grant = routes.create_direct_upload(
+        routes.DirectUploadInput(filename=filename, size=len(body)), user=user)
+    assert grant["method"] == "post"
+    response = requests.post(grant["url"], data=grant["fields"],
+                             files={"file": (filename, body)})
+    assert response.status_code in (200, 204), response.text
+    return grant
+
+
+def test_presigned_post_upload_is_queued(routes, db, enqueued, monkeypatch):
+    monkeypatch.setattr(routes.settings, "direct_upload_multipart_threshold", 10_000_000)
+    body = b"RIFF" + os.urandom(4096)
+    grant = post_upload(routes, body)
+
+    result = routes.complete_direct_upload(
+        routes.CompleteDirectUploadInput(key=grant["key"], filename="talk.wav"),
+        user=OWNER, db=db)
+    assert result.status_code == 202
+    assert enqueued == [{"filename": os.path.basename(grant["key"]), "original_filename": "talk.wav",
+                         "size": len(body), "source_key": grant["key"]}]
+    stored = routes.s3.get_object(Bucket=BUCKET, Key=grant["key"])["Body"].read()
+    assert stored == body
+
+    # A second complete for the same object is refused, not queued again.
+    expect_error(409, routes.complete_direct_upload,
+                 routes.CompleteDirectUploadInput(key=grant["key"]), user=OWNER, db=db)
+    assert len(enqueued) == 1
+
+
+def test_multipart_upload_is_completed_and_queued(routes, db, enqueued, monkeypatch):
+    part_size = 5 * 1024 * 1024
+    monkeypatch.setattr(routes.settings, "direct_upload_multipart_threshold", 1)
+    monkeypatch.setattr(routes.settings, "direct_upload_part_size", part_size)
+    body = os.urandom(part_size + 1024)
+
+    grant = routes.create_direct_upload(
+        routes.DirectUploadInput(filename="lecture.mp3", size=len(body)), user=OWNER)
+    assert grant["method"] == "multipart"
+    assert len(grant["parts"]) == 2
+
+    parts = []
+    for part in grant["parts"]:
+        start = (part["part_number"] - 1) * grant["part_size"]
+        response = requests.put(part["url"], data=body[start:start + grant["part_size"]])
+        assert response.status_code == 200, response.text
+        parts.append(routes.UploadedPart(part_number=part["part_number"],
+                                         etag=response.headers["ETag"]))
+
+    result = routes.complete_direct_upload(
+        routes.CompleteDirectUploadInput(key=grant["key"], filename="lecture.mp3",
+                                         upload_id=grant["upload_id"], parts=parts),
+        user=OWNER, db=db)
+    assert result.status_code == 202
+    assert enqueued[0]["size"] == len(body)
+    assert enqueued[0]["source_key"] == grant["key"]
+
+
+def test_complete_rejects_another_users_upload(routes, db, enqueued, monkeypatch):
+    monkeypatch.setattr(routes.settings, "direct_upload_multipart_threshold", 10_000_000)
+    grant = post_upload(routes, os.urandom(1024))
+
+    expect_error(403, routes.complete_direct_upload,
+                 routes.CompleteDirectUploadInput(key=grant["key"]), user=OTHER_OWNER, db=db)
+    assert enqueued == []
+
+
+def test_complete_without_upload_is_not_found(routes, db, enqueued):
+    key = routes._mint_key(OWNER, ".wav")
+    expect_error(404, routes.complete_direct_upload,
+                 routes.CompleteDirectUploadInput(key=key), user=OWNER, db=db)
+
+
+def test_only_the_uploader_can_abort(routes, monkeypatch):
+    monkeypatch.setattr(routes.settings, "direct_upload_multipart_threshold", 1)
+    grant = routes.create_direct_upload(
+        routes.DirectUploadInput(filename="lecture.mp3", size=6 * 1024 * 1024), user=OWNER)
+    abort = routes.AbortDirectUploadInput(key=grant["key"], upload_id=grant["upload_id"])
+
+    expect_error(403, routes.abort_direct_upload, abort, user=OTHER_OWNER)
+    viewer = types.SimpleNamespace(id=OWNER.id, email=OWNER.email, role="viewer")
+    expect_error(403, routes.abort_direct_upload, abort, user=viewer)
+    uploads = routes.s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+    assert grant["upload_id"] in [u["UploadId"] for u in uploads]
+
+    assert routes.abort_direct_upload(abort, user=OWNER) == {"message": "Upload aborted."}
+    uploads = routes.s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", [])
+    assert grant["upload_id"] not in [u["UploadId"] for u in uploads]
@@ -0,0 +1,25 @@
+import types
+from datetime import datetime, timedelta
+
+from pipeline_stats import summarize_jobs
+
+
+def job(timings):
+    started = datetime(2026, 10, 16, 12, 0, 0)
+    return types.SimpleNamespace(timings=timings, audio_duration=60.0, real_time_factor=0.5,
+                                 started_at=started, finished_at=started + timedelta(seconds=40))
+
+
+def test_stage_totals_do_not_double_count_parent_stages():
+    legacy = job({"transcribing": 30.0, "uploading": 5.0, "upload_audio": 3.0,
+                  "upload_transcript": 2.0, "indexing": 4.0, "chunking": 1.0,
+                  "embedding": 2.0, "upserting": 1.0})
+    current = job({"transcribing": 30.0, "upload_audio": 3.0, "upload_transcript": 2.0,
+                   "chunking": 1.0, "embedding": 2.0, "upserting": 1.0})
+
+    summary = summarize_jobs([legacy, current])
+    assert "uploading" not in summary["stages"]
+    assert "indexing" not in summary["stages"]
+    assert summary["stages"]["upload_audio"]["count"] == 2
+    total = sum(s["mean"] for s in summary["stages"].values())
+    assert total == 39.0
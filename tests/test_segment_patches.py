@@ -0,0 +1,118 @@
+import json
+import types
+
+import pytest
+
+pytest.importorskip("jsonpatch")
+pytest.importorskip("fastapi")
+
+from segment_patches import parse_version_etag, version_etag
+
+OWNER = types.SimpleNamespace(id=1, email="owner@example.com", role="owner")
+SEGMENTS = [
+    {"start": 0.0, "end": 2.0, "text": "Hello there."},
+    {"start": 2.0, "end": 5.0, "text": "General Kenobi."},
+]
+
+
+@pytest.fixture
+def routes():
+    import transcription_routes
+    return transcription_routes
+
+
+@pytest.fixture
+def transcript(db):
+    from models import UserFile
+
+    db.add(UserFile(filename="talk.mp3", email=OWNER.email, user_id=OWNER.id,
+                    transcript_text="Hello there. General Kenobi.",
+                    transcript_segments=SEGMENTS))
+    db.commit()
+    return "talk.mp3"
+
+
+def patch(routes, db, filename, ops, if_match, user=OWNER):
+    from fastapi import BackgroundTasks
+    return routes.patch_segments(filename, BackgroundTasks(), ops=ops,
+                                 if_match=if_match, user=user, db=db)
+
+
+def expect_error(status, fn, *args, **kwargs):
+    from fastapi import HTTPException
+    with pytest.raises(HTTPException) as exc:
+        fn(*args, **kwargs)
+    assert exc.value.status_code == status
+    return exc.value
+
+
+def test_version_etags_round_trip():
+    assert version_etag(7) == '"v7"'
+    assert parse_version_etag('"v7"') == 7
+    assert parse_version_etag('W/"v7"') == 7
+    assert parse_version_etag('"abc123"') is None
+    assert parse_version_etag(None) is None
+
+
+def test_patch_is_applied_and_versioned(routes, db, transcript):
+    import segment_patches
+
+    response = patch(routes, db, transcript,
+                     [{"op": "replace", "path": "/1/text", "value": "General Grievous."}], '"v0"')
+    assert response.headers["etag"] == '"v1"'
+    assert json.loads(response.body) == {"version": 1, "pending_patches": 1}
+
+    text, segments, version = segment_patches.load_document(db, transcript)
+    assert version == 1
+    assert segments[0] == SEGMENTS[0]
+    assert segments[1]["text"] == "General Grievous."
+
+    patch(routes, db, transcript, [{"op": "remove", "path": "/0"}], '"v1"')
+    _, segments, version = segment_patches.load_document(db, transcript)
+    assert version == 2
+    assert [s["text"] for s in segments] == ["General Grievous."]
+
+
+def test_missing_if_match_is_428(routes, db, transcript):
+    expect_error(428, patch, routes, db, transcript,
+                 [{"op": "remove", "path": "/0"}], None)
+
+
+def test_stale_if_match_is_412_with_current_etag(routes, db, transcript):
+    patch(routes, db, transcript, [{"op": "remove", "path": "/0"}], '"v0"')
+    error = expect_error(412, patch, routes, db, transcript,
+                         [{"op": "remove", "path": "/0"}], '"v0"')
+    assert error.headers["ETag"] == '"v1"'
+
+
+def test_foreign_if_match_is_412(routes, db, transcript):
+    error = expect_error(412, patch, routes, db, transcript,
+                         [{"op": "remove", "path": "/0"}], '"d41d8cd98f00b204"')
+    assert error.headers["ETag"] == '"v0"'
+
+
+def test_unknown_file_is_404(routes, db):
+    expect_error(404, patch, routes, db, "missing.mp3",
+                 [{"op": "remove", "path": "/0"}], '"d41d8cd98f00b204"')
+    expect_error(404, patch, routes, db, "missing.mp3",
+                 [{"op": "remove", "path": "/0"}], '"v0"')
+
+
+@pytest.mark.parametrize("ops", [
+    [{"op": "remove", "path": "/5"}],
+    [{"op": "test", "path": "/0/text", "value": "Goodbye."}],
+    [{"op": "replace", "path": "/0/end", "value": -1}],
+    [{"op": "add", "path": "/-", "value": {"text": "no times"}}],
+    [],
+])
+def test_invalid_patches_are_422_and_not_stored(routes, db, transcript, ops):
+    import segment_patches
+
+    expect_error(422, patch, routes, db, transcript, ops, '"v0"')
+    assert segment_patches.load_document(db, transcript)[1:] == (SEGMENTS, 0)
+
+
+def test_only_owners_may_patch(routes, db, transcript):
+    viewer = types.SimpleNamespace(id=2, email="viewer@example.com", role="viewer")
+    expect_error(403, patch, routes, db, transcript,
+                 [{"op": "remove", "path": "/0"}], '"v0"', user=viewer)
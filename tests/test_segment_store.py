@@ -0,0 +1,53 @@
+import pytest
+
+from segment_store import CompactSegments
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.5, "text": "Welcome back."},
+    {"start": 2.5, "end": 6.0, "text": "Today: naïve Bayes — with émoji 🎧."},
+    {"start": 6.0, "end": 9.0, "text": ""},
+    {"start": 9.0, "end": 12.0, "text": "Let's begin."},
+]
+
+
+def test_bytes_round_trip_keeps_order_and_unicode():
+    compact = CompactSegments.from_segments(SEGMENTS)
+    loaded = CompactSegments.from_bytes(compact.to_bytes())
+    assert len(loaded) == len(SEGMENTS)
+    assert loaded.to_segments() == SEGMENTS
+
+
+def test_older_layout_is_rejected():
+    data = bytearray(CompactSegments.from_segments(SEGMENTS).to_bytes())
+    data[:4] = b"SEG1"
+    with pytest.raises(ValueError):
+        CompactSegments.from_bytes(bytes(data))
+
+
+@pytest.mark.parametrize("t_from, t_to, expected", [
+    (None, None, [0, 1, 2, 3]),
+    (0.0, 2.5, [0]),
+    (2.0, 7.0, [0, 1, 2]),
+    (6.0, 6.0, [2]),
+    (11.9, None, [3]),
+    (12.0, 20.0, []),
+])
+def test_window_lookup(t_from, t_to, expected):
+    compact = CompactSegments.from_bytes(CompactSegments.from_segments(SEGMENTS).to_bytes())
+    window = compact.window(t_from, t_to)
+    assert [s["index"] for s in window] == expected
+    for seg in window:
+        assert seg["text"] == SEGMENTS[seg["index"]]["text"]
+
+
+def test_window_indexes_point_into_the_stored_array_when_unsorted():
+    # An edit moved a segment's times without reordering the array.
+    segments = [dict(s) for s in SEGMENTS]
+    segments[0] = {"start": 10.0, "end": 11.0, "text": "Moved."}
+    compact = CompactSegments.from_segments(segments)
+
+    window = compact.window(9.5, 11.5)
+    assert [s["index"] for s in window] == [3, 0]
+    assert [s["text"] for s in window] == ["Let's begin.", "Moved."]
+    assert [s["start"] for s in window] == [9.0, 10.0]
+    assert compact.to_segments() == segments
@@ -0,0 +1,134 @@
+import json
+import types
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+OWNER = types.SimpleNamespace(id=1, email="owner@example.com", role="owner")
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def routes():
+    import transcription_routes
+    return transcription_routes
+
+
+@pytest.fixture
+def files(db):
+    """Seven files; the last three share one upload time so the id breaks ties."""
+    from models import User, UserFile
+
+    db.add(User(id=2, email="other@example.com", hashed_password="x", name="Other",
+                role="owner"))
+    stamps = [START + timedelta(minutes=i) for i in range(4)] + [START + timedelta(minutes=9)] * 3
+    rows = [UserFile(filename=f"talk-{i}.mp3", email=OWNER.email, user_id=OWNER.id,
+                     file_size=100 + i, upload_timestamp=stamp, tag="a" if i % 2 else None)
+            for i, stamp in enumerate(stamps)]
+    rows.append(UserFile(filename="theirs.mp3", email="other@example.com", user_id=2,
+                         upload_timestamp=START))
+    db.add_all(rows)
+    db.commit()
+    return rows[:-1]
+
+
+def make_request(params=None, headers=None):
+    from starlette.requests import Request
+
+    return Request({
+        "type": "http", "method": "GET", "scheme": "http", "server": ("testserver", 80),
+        "path": "/transcription/api/transcripts", "root_path": "",
+        "query_string": urlencode(params or {}).encode("ascii"),
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1"))
+                    for k, v in (headers or {}).items()],
+    })
+
+
+def list_page(routes, db, headers=None, **params):
+    return routes.get_transcript_list(make_request(params, headers), user=OWNER, db=db, **params)
+
+
+def walk(routes, db, **params):
+    """Every item across all pages, following X-Next-Cursor."""
+    items, cursor = [], None
+    while True:
+        page_params = dict(params, cursor=cursor) if cursor else params
+        response = list_page(routes, db, **page_params)
+        items.extend(json.loads(response.body))
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return items
+        assert response.headers["link"].endswith('>; rel="next"')
+        assert f"cursor={cursor}" in response.headers["link"]
+
+
+def expect_error(status, fn, *args, **kwargs):
+    from fastapi import HTTPException
+    with pytest.raises(HTTPException) as exc:
+        fn(*args, **kwargs)
+    assert exc.value.status_code == status
+
+
+def expected_ids(files, reverse):
+    keyed = sorted(files, key=lambda f: (f.upload_timestamp, f.id), reverse=reverse)
+    return [f.id for f in keyed]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 100])
+def test_cursor_walks_every_file_once_newest_first(routes, db, files, limit):
+    items = walk(routes, db, limit=limit)
+    assert [item["id"] for item in items] == expected_ids(files, reverse=True)
+
+
+def test_cursor_walks_oldest_first(routes, db, files):
+    items = walk(routes, db, limit=2, order="asc")
+    assert [item["id"] for item in items] == expected_ids(files, reverse=False)
+
+
+def test_last_page_has_no_cursor(routes, db, files):
+    response = list_page(routes, db, limit=len(files))
+    assert len(json.loads(response.body)) == len(files)
+    assert "x-next-cursor" not in response.headers
+    assert "link" not in response.headers
+
+
+def test_cursor_combines_with_filters(routes, db, files):
+    items = walk(routes, db, limit=1, tag="a", fields="id,tag")
+    tagged = [f for f in files if f.tag == "a"]
+    assert [item["id"] for item in items] == expected_ids(tagged, reverse=True)
+    assert all(set(item) == {"id", "tag"} for item in items)
+
+
+def test_invalid_cursor_order_and_fields_are_400(routes, db, files):
+    expect_error(400, list_page, routes, db, cursor="not a cursor!")
+    expect_error(400, list_page, routes, db, order="sideways")
+    expect_error(400, list_page, routes, db, fields="id,password")
+
+
+def test_matching_if_none_match_is_304(routes, db, files):
+    first = list_page(routes, db, limit=3)
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    again = list_page(routes, db, headers={"If-None-Match": etag}, limit=3)
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.body == b""
+
+
+def test_etag_differs_per_query_and_changes_with_the_files(routes, db, files):
+    from models import UserFile
+
+    etag = list_page(routes, db, limit=3).headers["etag"]
+    assert list_page(routes, db, limit=4).headers["etag"] != etag
+
+    db.add(UserFile(filename="new.mp3", email=OWNER.email, user_id=OWNER.id,
+                    upload_timestamp=START + timedelta(hours=1)))
+    db.commit()
+    response = list_page(routes, db, headers={"If-None-Match": etag}, limit=3)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert json.loads(response.body)[0]["filename"] == "new.mp3"
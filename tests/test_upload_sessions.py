@@ -0,0 +1,142 @@
+import os
+import json
+import uuid
+import types
+import asyncio
+import hashlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiofiles")
+
+OWNER = types.SimpleNamespace(id=1, email="owner@example.com", role="owner")
+CHUNK_SIZE = 8
+DATA = b"0123456789abcdefghijklmnopq"  # 27 bytes: 4 chunks, the last one 3 bytes
+
+
+class ChunkRequest:
+    """Just enough of starlette's Request for put_upload_chunk."""
+
+    def __init__(self, body: bytes, piece: int = 3):
+        self.body = body
+        self.piece = piece
+
+    async def stream(self):
+        for i in range(0, len(self.body), self.piece):
+            yield self.body[i:i + self.piece]
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk(index: int) -> bytes:
+    return DATA[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+@pytest.fixture
+def routes(tmp_path, monkeypatch):
+    import upload_session_routes
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(upload_session_routes.settings, "upload_session_chunk_size", CHUNK_SIZE)
+    return upload_session_routes
+
+
+@pytest.fixture
+def enqueued(routes, monkeypatch):
+    from models import TranscriptionJob
+
+    jobs = []
+
+    def enqueue_upload(db, user, filename, original_filename, file_size, content_sha256=None):
+        job = TranscriptionJob(id=uuid.uuid4().hex, user_id=user.id, email=user.email,
+                               filename=filename, original_filename=original_filename,
+                               file_size=file_size, content_sha256=content_sha256,
+                               status="queued")
+        db.add(job)
+        db.commit()
+        jobs.append(job.id)
+        return job
+
+    monkeypatch.setattr(routes, "enqueue_upload", enqueue_upload)
+    return jobs
+
+
+@pytest.fixture
+def session_id(routes, db):
+    response = routes.create_upload_session(
+        routes.CreateUploadSessionInput(filename="talk.wav", size=len(DATA), sha256=sha256(DATA)),
+        user=OWNER, db=db)
+    assert response.status_code == 201
+    return json.loads(response.body)["session_id"]
+
+
+def put_chunk(routes, db, session_id, index, body, digest="auto"):
+    if digest == "auto":
+        digest = sha256(body)
+    return asyncio.run(routes.put_upload_chunk(
+        session_id, index, ChunkRequest(body), x_chunk_sha256=digest, user=OWNER, db=db))
+
+
+def expect_error(status, fn, *args, **kwargs):
+    from fastapi import HTTPException
+    with pytest.raises(HTTPException) as exc:
+        fn(*args, **kwargs)
+    assert exc.value.status_code == status
+
+
+def received(routes, db, session_id):
+    db.expire_all()
+    return routes.get_upload_session(session_id, user=OWNER, db=db)["received_chunks"]
+
+
+def test_chunk_requires_a_hash(routes, db, session_id):
+    expect_error(428, put_chunk, routes, db, session_id, 0, chunk(0), digest=None)
+    assert received(routes, db, session_id) == []
+
+
+def test_chunk_with_wrong_hash_is_not_received(routes, db, session_id):
+    expect_error(422, put_chunk, routes, db, session_id, 0, chunk(0), digest=sha256(b"other"))
+    assert received(routes, db, session_id) == []
+
+    result = put_chunk(routes, db, session_id, 0, chunk(0), digest=sha256(chunk(0)).upper())
+    assert result["received"] == 1
+    assert received(routes, db, session_id) == [0]
+
+
+@pytest.mark.parametrize("index", [-1, 4, 100])
+def test_out_of_range_chunk_is_416(routes, db, session_id, index):
+    expect_error(416, put_chunk, routes, db, session_id, index, b"x")
+
+
+def test_oversize_and_short_chunks_are_rejected(routes, db, session_id):
+    expect_error(413, put_chunk, routes, db, session_id, 0, chunk(0) + b"!")
+    # The last chunk is only 3 bytes long.
+    expect_error(413, put_chunk, routes, db, session_id, 3, chunk(3) + b"!")
+    expect_error(400, put_chunk, routes, db, session_id, 1, chunk(1)[:-1])
+    assert received(routes, db, session_id) == []
+
+
+def test_complete_is_idempotent(routes, db, session_id, enqueued):
+    expect_error(409, asyncio.run, routes.complete_upload_session(session_id, user=OWNER, db=db))
+    for index in (3, 1, 0, 2):
+        put_chunk(routes, db, session_id, index, chunk(index))
+
+    first = asyncio.run(routes.complete_upload_session(session_id, user=OWNER, db=db))
+    second = asyncio.run(routes.complete_upload_session(session_id, user=OWNER, db=db))
+    assert first.status_code == second.status_code == 202
+    first, second = json.loads(first.body), json.loads(second.body)
+    assert first["job_id"] == second["job_id"] == enqueued[0]
+    assert first["sha256"] == second["sha256"] == sha256(DATA)
+    assert len(enqueued) == 1
+
+    with open(f"uploads/{first['filename']}", "rb") as f:
+        assert f.read() == DATA
+
+
+def test_missing_partial_file_is_409(routes, db, session_id, enqueued):
+    os.remove(routes._part_path(session_id))
+    expect_error(409, put_chunk, routes, db, session_id, 0, chunk(0))
+    assert enqueued == []
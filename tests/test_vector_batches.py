@@ -0,0 +1,45 @@
+import json
+import random
+import struct
+
+from vector_batches import batch_for_upsert, UPSERT_BATCH_MAX_BYTES
+
+PINECONE_MAX_REQUEST_BYTES = 2 * 1024 * 1024
+
+
+def float32_values(rng, dims):
+    # What the OpenAI client hands back: float32 values widened to Python
+    # floats, e.g. 0.02354288473725319.
+    return [struct.unpack("f", struct.pack("f", rng.gauss(0, 0.03)))[0] for _ in range(dims)]
+
+
+def make_vectors(count, dims=1536, seed=3):
+    rng = random.Random(seed)
+    return [
+        (f"lecture-{i:05d}-{rng.getrandbits(64):016x}", float32_values(rng, dims),
+         {"filename": "lecture.mp3", "start": i * 30.0, "end": i * 30.0 + 30.0,
+          "text": "word " * rng.randint(50, 400)})
+        for i in range(count)
+    ]
+
+
+def request_bytes(batch):
+    return len(json.dumps({"vectors": [
+        {"id": vid, "values": values, "metadata": metadata} for vid, values, metadata in batch
+    ]}).encode("utf-8"))
+
+
+def test_batches_stay_under_pinecone_request_limit():
+    vectors = make_vectors(300)
+    batches = batch_for_upsert(vectors)
+    assert sum(len(b) for b in batches) == len(vectors)
+    for batch in batches:
+        size = request_bytes(batch)
+        assert size <= UPSERT_BATCH_MAX_BYTES
+        assert size < PINECONE_MAX_REQUEST_BYTES
+
+
+def test_batches_respect_vector_count():
+    vectors = make_vectors(30, dims=8)
+    batches = batch_for_upsert(vectors, max_vectors=7)
+    assert [len(b) for b in batches] == [7, 7, 7, 7, 2]
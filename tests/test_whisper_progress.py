@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+pytest.importorskip("whisper")
+
+import whisper.transcribe as whisper_transcribe
+
+from transcription_engines import whisper_progress
+
+
+def test_patch_is_scoped_to_the_call():
+    original = whisper_transcribe.tqdm
+    seen = []
+    with whisper_progress(seen.append):
+        assert whisper_transcribe.tqdm is not original
+        bar = whisper_transcribe.tqdm.tqdm(total=200, disable=True)
+        bar.update(50)
+        bar.update(100)
+    assert whisper_transcribe.tqdm is original
+    assert seen == [0.25, 0.75]
+
+
+def test_nested_calls_restore_only_after_the_last():
+    original = whisper_transcribe.tqdm
+    with whisper_progress(lambda f: None):
+        with whisper_progress(lambda f: None):
+            pass
+        assert whisper_transcribe.tqdm is not original
+    assert whisper_transcribe.tqdm is original
+
+
+def test_progress_does_not_cross_threads():
+    mine, theirs = [], []
+    started, done = threading.Event(), threading.Event()
+
+    def other_job():
+        with whisper_progress(theirs.append):
+            started.set()
+            done.wait(5)
+            whisper_transcribe.tqdm.tqdm(total=10, disable=True).update(10)
+
+    worker = threading.Thread(target=other_job)
+    worker.start()
+    started.wait(5)
+    with whisper_progress(mine.append):
+        whisper_transcribe.tqdm.tqdm(total=10, disable=True).update(5)
+        # A caller outside whisper_progress gets a bar with no callback.
+        unrelated = []
+        t = threading.Thread(target=lambda: unrelated.append(
+            whisper_transcribe.tqdm.tqdm(total=10, disable=True).update(10)))
+        t.start()
+        t.join()
+    done.set()
+    worker.join()
+
+    assert mine == [0.5]
+    assert theirs == [1.0]
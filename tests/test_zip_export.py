@@ -0,0 +1,73 @@
+import io
+import time
+import random
+import threading
+import zipfile
+
+from zip_export import prefetch_ordered, stream_zip, segments_to_srt
+
+
+def test_prefetch_yields_in_input_order():
+    rng = random.Random(5)
+    delays = {i: rng.uniform(0, 0.01) for i in range(40)}
+
+    def fetch(i):
+        time.sleep(delays[i])
+        return i * i
+
+    assert list(prefetch_ordered(range(40), fetch, window=6)) == [(i, i * i) for i in range(40)]
+
+
+def test_prefetch_keeps_at_most_window_fetches_in_flight():
+    lock = threading.Lock()
+    in_flight = peak = 0
+
+    def fetch(i):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.005)
+        with lock:
+            in_flight -= 1
+        return i
+
+    consumed = []
+    for item, _ in prefetch_ordered(range(30), fetch, window=4):
+        consumed.append(item)
+        time.sleep(0.001)
+    assert consumed == list(range(30))
+    assert peak <= 4
+
+
+def test_prefetch_handles_fewer_items_than_window():
+    assert list(prefetch_ordered(["a"], str.upper, window=8)) == [("a", "A")]
+    assert list(prefetch_ordered([], str.upper)) == []
+
+
+def test_stream_zip_produces_a_valid_archive_incrementally():
+    entries = [(f"talk-{i}.txt", (f"transcript {i} " * 2000).encode("utf-8")) for i in range(5)]
+    entries.append(("talk-0.json", b"[]"))
+
+    chunks = list(stream_zip(iter(entries)))
+    assert len(chunks) > 1
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [name for name, _ in entries]
+        for name, data in entries:
+            assert zf.read(name) == data
+
+
+def test_stream_zip_of_nothing_is_an_empty_archive():
+    with zipfile.ZipFile(io.BytesIO(b"".join(stream_zip([])))) as zf:
+        assert zf.namelist() == []
+
+
+def test_segments_to_srt():
+    srt = segments_to_srt([
+        {"start": 0, "end": 2.5, "text": " Hello. "},
+        {"start": 3661.042, "end": 3662.0, "text": "An hour in."},
+    ])
+    assert srt == ("1\n00:00:00,000 --> 00:00:02,500\nHello.\n\n"
+                   "2\n01:01:01,042 --> 01:01:02,000\nAn hour in.\n")
@@ -0,0 +1,197 @@
+# transcription_engines.py
+
+import os
+import types
+import threading
+from contextlib import contextmanager
+
+import tqdm
+import whisper.transcribe as whisper_transcribe
+
+from config import settings
+from model_registry import WhisperModelRegistry, whisper_registry
+from parallel_transcribe import transcribe_parallel, detect_language
+from audio_processing import SAMPLE_RATE
+
+
+class TranscriptionEngine:
+    """
+    Common interface for speech-to-text backends.
+
+    `transcribe(audio)` takes a file path or 16 kHz mono float32 PCM and
+    returns a list of segments shaped {"start": float, "end": float,
+    "text": str}, whichever backend produced them. If given,
+    `on_progress(fraction)` is called with the share of audio covered so far.
+    """
+
+    name = "base"
+
+    def __init__(self, model_size: str = None):
+        self.model_size = model_size or settings.whisper_model
+
+    @property
+    def signature(self) -> str:
+        """Identifies engine + model, e.g. for reusing earlier results."""
+        return f"{self.name}:{self.model_size}"
+
+    def preload(self, sizes=None):
+        pass
+
+    def transcribe(self, audio, on_progress=None):
+        raise NotImplementedError
+
+
+# openai-whisper has no progress callback, but model.transcribe() advances
+# a tqdm bar by the audio frames it has decoded after every 30 s window.
+# While a caller is inside `whisper_progress()`, whisper's tqdm is swapped
+# for one that reports those frames to the callback registered by the
+# thread that created the bar, so concurrent transcriptions each see only
+# their own progress. The swap is reference-counted and the original is
+# put back when the last such call returns; a bar created by any other
+# caller meanwhile has no callback and behaves like plain tqdm. Parallel
+# mode runs whisper in pool processes, which this never touches.
+_whisper_progress = threading.local()
+_patch_lock = threading.Lock()
+_patch_users = 0
+_original_tqdm = None
+
+
+class _FrameProgress(tqdm.tqdm):
+    def __init__(self, *args, **kwargs):
+        self._on_progress = getattr(_whisper_progress, "callback", None)
+        self._frames = 0
+        super().__init__(*args, **kwargs)
+
+    def update(self, n=1):
+        self._frames += n or 0
+        if self._on_progress and self.total:
+            self._on_progress(min(1.0, self._frames / self.total))
+        return super().update(n)
+
+
+@contextmanager
+def whisper_progress(on_progress):
+    """Route single-pass whisper progress on this thread to `on_progress`."""
+    global _patch_users, _original_tqdm
+    if on_progress is None:
+        yield
+        return
+    with _patch_lock:
+        if _patch_users == 0:
+            _original_tqdm = whisper_transcribe.tqdm
+            whisper_transcribe.tqdm = types.SimpleNamespace(tqdm=_FrameProgress)
+        _patch_users += 1
+    _whisper_progress.callback = on_progress
+    try:
+        yield
+    finally:
+        _whisper_progress.callback = None
+        with _patch_lock:
+            _patch_users -= 1
+            if _patch_users == 0:
+                whisper_transcribe.tqdm = _original_tqdm
+                _original_tqdm = None
+
+
+class WhisperEngine(TranscriptionEngine):
+    """Reference openai-whisper backend (fp32 PyTorch)."""
+
+    name = "whisper"
+
+    def preload(self, sizes=None):
+        whisper_registry.preload(sizes or [self.model_size])
+
+    def transcribe(self, audio, on_progress=None):
+        use_parallel = (
+            settings.transcribe_mode == "parallel"
+            and not isinstance(audio, str)
+            and len(audio) / SAMPLE_RATE >= settings.parallel_min_duration
+        )
+        with whisper_registry.acquire(self.model_size) as model:
+            if not use_parallel:
+                with whisper_progress(on_progress):
+                    result = model.transcribe(audio)
+                if on_progress:
+                    on_progress(1.0)
+                return [
+                    {"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+                    for seg in result.get("segments", [])
+                ]
+            language = detect_language(model, audio)
+        return transcribe_parallel(audio, language=language, model_size=self.model_size,
+                                   on_progress=on_progress)["segments"]
+
+
+def _load_faster_whisper(size: str):
+    try:
+        from faster_whisper import WhisperModel
+    except ImportError as e:
+        raise RuntimeError(
+            "transcription_engine='faster-whisper' requires the faster-whisper package."
+        ) from e
+    return WhisperModel(
+        size,
+        device="cpu",
+        compute_type=settings.faster_whisper_compute_type,
+        cpu_threads=settings.faster_whisper_cpu_threads or (os.cpu_count() or 0),
+    )
+
+
+_faster_registry = WhisperModelRegistry(
+    max_models=settings.whisper_max_loaded_models,
+    max_concurrency=settings.whisper_max_concurrency,
+    loader=_load_faster_whisper,
+    label="faster-whisper",
+)
+
+
+class FasterWhisperEngine(TranscriptionEngine):
+    """
+    CTranslate2 backend with int8-quantized weights, tuned for CPU-only
+    hosts. Loaded through the same registry as the default engine.
+    """
+
+    name = "faster-whisper"
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}:{self.model_size}:{settings.faster_whisper_compute_type}"
+
+    def preload(self, sizes=None):
+        _faster_registry.preload(sizes or [self.model_size])
+
+    def transcribe(self, audio, on_progress=None):
+        with _faster_registry.acquire(self.model_size) as model:
+            segments, info = model.transcribe(audio, beam_size=5)
+            duration = info.duration or 0
+            # `segments` is a lazy generator; decode while holding the slot.
+            results = []
+            for seg in segments:
+                results.append(
+                    {"start": seg.start, "end": seg.end, "text": seg.text})
+                if on_progress and duration:
+                    on_progress(min(1.0, seg.end / duration))
+            return results
+
+
+ENGINES = {
+    WhisperEngine.name: WhisperEngine,
+    FasterWhisperEngine.name: FasterWhisperEngine,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: str = None, model_size: str = None) -> TranscriptionEngine:
+    """Return the (shared) engine selected in settings or by name."""
+    name = name or settings.transcription_engine
+    model_size = model_size or settings.whisper_model
+    if name not in ENGINES:
+        raise ValueError(
+            f"Unknown transcription engine '{name}'. Choose from: {', '.join(ENGINES)}")
+    with _engines_lock:
+        key = (name, model_size)
+        if key not in _engines:
+            _engines[key] = ENGINES[name](model_size)
+        return _engines[key]
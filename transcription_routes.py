@@ -1,34 +1,50 @@
 # Standard Library
 import os
-import io
 import json
 import uuid
-from datetime import datetime
-from zipfile import ZipFile
+import base64
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
 
 # Third-Party
 import boto3
-import aiofiles
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Request, BackgroundTasks, Query, Body, Header
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
+from sqlalchemy import or_, func, tuple_
 from sqlalchemy.orm import Session
 from openai import OpenAI
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from botocore.exceptions import ClientError
+from sse_starlette.sse import EventSourceResponse
 
 # Local
-from upload_processor import transcribe_audio
+from job_queue import enqueue_upload, QueueFullError
 from auth import get_current_user
 # This is the only import line that needs to change.
 from dependencies import get_db
 from config import settings
-from models import UserFile, User
+from database import SessionLocal
+from models import UserFile, User, TranscriptionJob, SegmentPatch
+from job_events import job_events, job_snapshot, TERMINAL_STATUSES
+from utils import save_upload_stream, is_admin_user
+from pipeline_stats import summarize_jobs
+from s3_cache import object_cache, UpdateConflict
+from json_responses import FastJSONResponse
+from artifact_compression import read_object
+from zip_export import stream_zip, prefetch_ordered, segments_to_srt
+from segment_store import CompactSegments, segment_index_key, CONTENT_TYPE as SEGMENTS_CONTENT_TYPE
+import segment_patches
+from segment_patches import PatchConflict, InvalidPatch, version_etag, parse_version_etag
+from embedding_cache import embedding_cache
+from upload_processor import reindex_transcript, delete_transcript_vectors
 
 router = APIRouter()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 # --- Reusable S3 client for all routes ---
-s3 = boto3.client("s3", region_name=settings.aws_region)
+s3 = boto3.client("s3", region_name=settings.aws_region,
+                  endpoint_url=settings.s3_endpoint_url)
 
 
 # --- Pydantic Models ---
@@ -54,88 +70,407 @@ class EditQuizInput(BaseModel):
 # --- Core File Handling & Management Routes ---
 
 @router.post("/api/upload")
-async def upload_file(file: UploadFile = File(...), user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def upload_file(request: Request, file: UploadFile = File(...), user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Persists the upload and queues it for transcription, returning a job id."""
     if user.role != "owner":
         raise HTTPException(
             status_code=403, detail="Only owners can upload files.")
 
+    # BodySizeLimitMiddleware (main.py) caps the raw body while Starlette
+    # spools it; this rejects declared oversizes early and the exact file
+    # limit is enforced again while copying.
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.max_file_size + 1_000_000:
+        raise HTTPException(status_code=413, detail="File too large.")
+
     try:
         extension = os.path.splitext(file.filename)[1]
         unique_name = f"{uuid.uuid4().hex}{extension}"
         local_temp_path = os.path.join("uploads", unique_name)
         os.makedirs("uploads", exist_ok=True)
 
-        async with aiofiles.open(local_temp_path, "wb") as out_file:
-            content = await file.read()
-            await out_file.write(content)
-
-        # upload_processor handles S3 uploads and returns URLs/keys
-        full_text, segments, audio_url, transcript_url, audio_s3_key = await transcribe_audio(
-            local_temp_path, unique_name
-        )
-        os.remove(local_temp_path)
-
-        # Save metadata to the database
-        new_file = UserFile(
-            filename=unique_name,
-            file_size=len(content),
-            upload_timestamp=datetime.utcnow(),
-            user_id=user.id,
-            email=user.email,
-            s3_key=audio_s3_key
-        )
-        db.add(new_file)
-        db.commit()
-
-        return JSONResponse(status_code=200, content={"message": "File uploaded and transcribed", "filename": unique_name})
+        file_size, content_sha256 = await save_upload_stream(file, local_temp_path)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Upload failed: {e}")
         raise HTTPException(status_code=500, detail="Upload failed.")
 
+    try:
+        job = enqueue_upload(db, user, unique_name, file.filename,
+                             file_size, content_sha256)
+    except QueueFullError:
+        os.remove(local_temp_path)
+        raise HTTPException(
+            status_code=503, detail="Transcription queue is full, please retry shortly.")
+
+    return FastJSONResponse(status_code=202, content={
+        "message": "File uploaded and queued for transcription",
+        "filename": unique_name,
+        "job_id": job.id,
+        "status": job.status,
+        "file_size": file_size,
+        "sha256": content_sha256
+    })
+
+
+@router.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """Reports state, progress and per-stage timings for a transcription job."""
+    job = db.query(TranscriptionJob).filter(
+        TranscriptionJob.id == job_id, TranscriptionJob.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "original_filename": job.original_filename,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress,
+        "timings": job.timings or {},
+        "audio_duration": job.audio_duration,
+        "real_time_factor": job.real_time_factor,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@router.get("/api/admin/pipeline-timings")
+def pipeline_timings(hours: float = 24, engine: str = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """p50/p95 seconds per pipeline stage for jobs finished in the last `hours`."""
+    if not is_admin_user(user.email):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    since = datetime.utcnow() - timedelta(hours=hours)
+    query = db.query(TranscriptionJob).filter(
+        TranscriptionJob.status == "done", TranscriptionJob.finished_at >= since)
+    if engine:
+        query = query.join(UserFile, UserFile.id == TranscriptionJob.user_file_id).filter(
+            UserFile.engine == engine)
+
+    return {"since": since.isoformat(), "hours": hours, "engine": engine,
+            **summarize_jobs(query.all())}
+
+
+@router.get("/api/admin/cache-stats")
+def cache_stats(user=Depends(get_current_user)):
+    """Hit rates and sizes for the S3 object cache and the embedding cache."""
+    if not is_admin_user(user.email):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"s3_objects": object_cache.stats(), "embeddings": embedding_cache.stats()}
+
+
+def _load_job_event(job_id: str):
+    db = SessionLocal()
+    try:
+        job = db.get(TranscriptionJob, job_id)
+        return job_snapshot(job) if job else None
+    finally:
+        db.close()
+
+
+def _event_name(event: dict) -> str:
+    if event["status"] in ("queued",) + TERMINAL_STATUSES:
+        return event["status"]
+    return event["stage"]
+
+
+@router.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Server-sent events for a job: queued, decoding, transcribing (with
+    `percent` of audio done), uploading, chunking, embedding, upserting,
+    then done or error.
+    Every event carries the job's stage timings so far.
+    """
+    job = db.query(TranscriptionJob).filter(
+        TranscriptionJob.id == job_id, TranscriptionJob.user_id == user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    initial = job_snapshot(job)
+
+    async def event_stream():
+        q = job_events.subscribe(job_id)
+        try:
+            event, last = job_events.latest(job_id) or initial, None
+            while True:
+                state = {k: v for k, v in event.items() if k != "ts"}
+                if state != last:
+                    last = state
+                    yield {"event": _event_name(event), "data": json.dumps(event)}
+                if event["status"] in TERMINAL_STATUSES:
+                    return
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=settings.job_events_poll_seconds)
+                except asyncio.TimeoutError:
+                    # Not running in this process: fall back to the job row.
+                    if job_events.latest(job_id) is None:
+                        event = await asyncio.to_thread(_load_job_event, job_id) or event
+        finally:
+            job_events.unsubscribe(job_id, q)
+
+    return EventSourceResponse(event_stream(), ping=15)
+
+
+# Columns clients may ask for with ?fields=; id and upload_timestamp are
+# always read because they form the pagination cursor.
+LISTING_FIELDS = {
+    "id": UserFile.id,
+    "filename": UserFile.filename,
+    "file_size": UserFile.file_size,
+    "upload_timestamp": UserFile.upload_timestamp,
+    "tag": UserFile.tag,
+    "duration": UserFile.duration,
+    "media_codec": UserFile.media_codec,
+    "engine": UserFile.engine,
+}
+DEFAULT_LISTING_FIELDS = ["id", "filename", "file_size", "upload_timestamp", "tag"]
+MAX_LISTING_LIMIT = 500
+
+
+def _encode_cursor(timestamp: datetime, file_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{file_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp, file_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(file_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _listing_etag(db: Session, user_id: int, request: Request) -> str:
+    """Changes whenever any of the user's files is added, edited or removed."""
+    count, latest, max_id = db.query(
+        func.count(UserFile.id), func.max(UserFile.updated_at), func.max(UserFile.id)
+    ).filter(UserFile.user_id == user_id).one()
+    state = f"{user_id}|{count}|{latest}|{max_id}|{request.url.query}"
+    return 'W/"' + hashlib.sha1(state.encode("utf-8")).hexdigest() + '"'
+
 
 @router.get("/api/transcripts", response_model=List[Dict[str, Any]])
-async def get_transcript_list(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    files = db.query(UserFile).filter(UserFile.user_id == user.id).order_by(
-        UserFile.upload_timestamp.desc()).all()
-
-    return [
-        {
-            "filename": f.filename,
-            "file_size": f.file_size,
-            "upload_timestamp": f.upload_timestamp.isoformat(),
-            "audio_url": f.audio_url,
-            "transcript_url": f.transcript_url
-        }
-        for f in files
-    ]
+def get_transcript_list(
+    request: Request,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order: str = "desc",
+    tag: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    One page of the user's files, newest first by default. The next page's
+    cursor is sent in the X-Next-Cursor (and Link) header. Responses carry
+    an ETag; a matching If-None-Match gets 304 without querying the page.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'.")
+    limit = max(1, min(limit, MAX_LISTING_LIMIT))
+    wanted = [f.strip() for f in fields.split(",")] if fields else DEFAULT_LISTING_FIELDS
+    unknown = [f for f in wanted if f not in LISTING_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    etag = _listing_etag(db, user.id, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    columns = list(dict.fromkeys(["id", "upload_timestamp", *wanted]))
+    query = db.query(*[LISTING_FIELDS[c] for c in columns]).filter(
+        UserFile.user_id == user.id)
+    if tag:
+        query = query.filter(UserFile.tag == tag)
+    if since:
+        query = query.filter(UserFile.upload_timestamp >= since)
+    if until:
+        query = query.filter(UserFile.upload_timestamp < until)
+
+    # Keyset pagination on (upload_timestamp, id), served by
+    # ix_user_files_user_id_upload_timestamp_id.
+    key = tuple_(UserFile.upload_timestamp, UserFile.id)
+    if cursor:
+        after = tuple_(*_decode_cursor(cursor))
+        query = query.filter(key < after if order == "desc" else key > after)
+    if order == "desc":
+        query = query.order_by(UserFile.upload_timestamp.desc(), UserFile.id.desc())
+    else:
+        query = query.order_by(UserFile.upload_timestamp.asc(), UserFile.id.asc())
+    rows = query.limit(limit + 1).all()
+
+    page = rows[:limit]
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = _encode_cursor(last.upload_timestamp, last.id)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+    items = []
+    for row in page:
+        item = {c: getattr(row, c) for c in wanted}
+        if "upload_timestamp" in item and item["upload_timestamp"]:
+            item["upload_timestamp"] = item["upload_timestamp"].isoformat()
+        if "tag" in item:
+            item["tag"] = item["tag"] or ""
+        items.append(item)
+    return FastJSONResponse(content=items, headers=headers)
+
+
+def _stored_transcript(db: Session, filename: str):
+    """(text, segments) from the user_files row, or None if not stored there."""
+    document = segment_patches.load_document(db, filename)
+    return document[:2] if document else None
+
+
+def _put_segment_index(base_name: str, segments) -> CompactSegments:
+    compact = CompactSegments.from_segments(segments)
+    object_cache.put(segment_index_key(base_name), compact.to_bytes(),
+                     content_type=SEGMENTS_CONTENT_TYPE)
+    return compact
+
+
+def _load_segment_index(db: Session, filename: str) -> CompactSegments:
+    """Compact segments for a file, built from the JSON copy on first use."""
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    if segment_patches.has_pending_patches(db, filename):
+        # The .seg in S3 predates the latest edits until they are compacted.
+        return CompactSegments.from_segments(_stored_transcript(db, filename)[1])
+    try:
+        return CompactSegments.from_bytes(object_cache.get(segment_index_key(base_name)))
+    except (ClientError, ValueError):
+        # Missing, or written in an older layout: rebuild it below.
+        pass
+
+    stored = _stored_transcript(db, filename)
+    if stored:
+        segments = stored[1]
+    else:
+        try:
+            segments = object_cache.get_json(f"transcripts/{base_name}.json")
+        except ClientError:
+            raise HTTPException(status_code=404, detail="Segments not found.")
+    return _put_segment_index(base_name, segments)
+
+
+# Registered before /api/transcript/{filename:path}, whose path parameter
+# would otherwise swallow the "/segments" suffix.
+@router.get("/api/transcript/{filename:path}/segments")
+def get_segment_window(
+    filename: str,
+    t_from: Optional[float] = Query(None, alias="from"),
+    t_to: Optional[float] = Query(None, alias="to"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Segments overlapping [from, to) seconds, located by binary search over
+    the compact segment index instead of loading the whole JSON array.
+    from == to returns the segment(s) playing at that instant. Each
+    segment's `index` is its position in the stored array (the one JSON
+    Patch paths use); segments are returned in time order.
+    """
+    if t_from is not None and t_to is not None and t_to < t_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'.")
+    compact = _load_segment_index(db, filename)
+    segments = compact.window(t_from, t_to)
+    return FastJSONResponse(content={
+        "from": t_from,
+        "to": t_to,
+        "total": len(compact),
+        "first_index": segments[0]["index"] if segments else None,
+        "segments": segments,
+    })
+
+
+@router.patch("/api/transcript/{filename:path}/segments")
+def patch_segments(
+    filename: str,
+    background_tasks: BackgroundTasks,
+    ops: List[Dict[str, Any]] = Body(...),
+    if_match: Optional[str] = Header(None),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Applies RFC 6902 operations (application/json-patch+json) to a file's
+    segments. If-Match must carry the ETag the editor loaded; a stale one
+    gets 412 with the current ETag so the client can reload and retry.
+    """
+    if user.role != "owner":
+        raise HTTPException(
+            status_code=403, detail="Only owners can edit transcript segments.")
+    if not if_match:
+        raise HTTPException(
+            status_code=428, detail="If-Match with the segments ETag is required.")
+
+    current = segment_patches.current_version(db, filename)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Transcript not found.")
+    base_version = parse_version_etag(if_match)
+    try:
+        if base_version is None:
+            raise PatchConflict(current)
+        result = segment_patches.apply_patch(db, filename, base_version, ops, user.email)
+    except PatchConflict as e:
+        raise HTTPException(
+            status_code=412, detail="Segments were changed by another editor.",
+            headers={"ETag": version_etag(e.current_version)})
+    except InvalidPatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Transcript not found.")
+
+    version, _, pending = result
+    # Reindexing reloads the stored document, so overlapping edits can't
+    # leave an older version's vectors behind.
+    background_tasks.add_task(reindex_transcript, filename)
+    if pending >= settings.segment_patch_compact_after:
+        background_tasks.add_task(segment_patches.compact, filename)
+    return FastJSONResponse(
+        content={"version": version, "pending_patches": pending},
+        headers={"ETag": version_etag(version)})
 
 
 @router.get("/api/transcript/{filename:path}")
-def get_transcript_from_s3(filename: str, user=Depends(get_current_user)):
-    """Gets the main transcript text and its segments JSON from S3."""
-    # We don't need the `user` or `db` here if the files are public, but it's good for auth.
+def get_transcript_from_s3(filename: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """Gets the transcript text and segments, from the database when stored there, else S3."""
     # A proper implementation would check if the user owns the file first.
+    document = segment_patches.load_document(db, filename)
+    if document:
+        text, segments, version = document
+        return FastJSONResponse(content={"transcript": text, "segments": segments},
+                            headers={"ETag": version_etag(version)})
+
     base_name = os.path.splitext(filename)[0]
     try:
-        txt_obj = s3.get_object(Bucket=settings.s3_bucket,
-                                Key=f"transcripts/{base_name}.txt")
-        text = txt_obj["Body"].read().decode("utf-8")
+        text = object_cache.get(
+            f"transcripts/{base_name}.txt").decode("utf-8")
     except ClientError:
         raise HTTPException(
             status_code=404, detail="Transcript text file not found.")
 
     try:
-        seg_obj = s3.get_object(Bucket=settings.s3_bucket,
-                                Key=f"transcripts/{base_name}.json")
-        segments = json.loads(seg_obj["Body"].read().decode("utf-8"))
+        segments = object_cache.get_json(f"transcripts/{base_name}.json")
     except ClientError:
         segments = []
 
-    return JSONResponse(content={"transcript": text, "segments": segments})
+    version = segment_patches.current_version(db, filename)
+    headers = {"ETag": version_etag(version)} if version is not None else None
+    return FastJSONResponse(content={"transcript": text, "segments": segments}, headers=headers)
 
 
 @router.delete("/api/delete/{filename:path}")
-async def delete_transcript(filename: str, user=Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_transcript(filename: str, background_tasks: BackgroundTasks, user=Depends(get_current_user), db: Session = Depends(get_db)):
     """Deletes a file record from DB and all associated files from S3."""
     db_obj = db.query(UserFile).filter(UserFile.filename ==
                                        filename, UserFile.email == user.email).first()
@@ -143,19 +478,26 @@ async def delete_transcript(filename: str, user=Depends(get_current_user), db: S
         raise HTTPException(
             status_code=404, detail="File record not found in database.")
 
+    db.query(SegmentPatch).filter(SegmentPatch.user_file_id == db_obj.id).delete(
+        synchronize_session=False)
     db.delete(db_obj)
     db.commit()
 
     base = os.path.splitext(filename)[0]
     keys_to_delete = [
         f"uploads/{filename}", f"transcripts/{base}.txt", f"transcripts/{base}.json",
+        segment_index_key(base), f"transcripts/{base}.orig.json",
         f"transcripts/{base}_note.json", f"transcripts/{base}_quiz.json", f"transcripts/{base}_tag.json"
     ]
+    if db_obj.s3_key and db_obj.s3_key not in keys_to_delete:
+        keys_to_delete.append(db_obj.s3_key)
     objects_to_delete = [{'Key': key} for key in keys_to_delete]
+    background_tasks.add_task(delete_transcript_vectors, base)
 
     try:
         s3.delete_objects(Bucket=settings.s3_bucket, Delete={
                           'Objects': objects_to_delete, 'Quiet': True})
+        object_cache.invalidate(*keys_to_delete)
         return {"message": f"Successfully deleted {filename} and all associated data."}
     except Exception as e:
         print(f"Error deleting files from S3 for {filename}: {e}")
@@ -179,15 +521,9 @@ def generate_question(input_data: SegmentInput, user=Depends(get_current_user)):
         quiz_entry = {"segment": input_data.segment_text.strip(
         ), "question": question, "timestamp": input_data.timestamp}
 
-        try:
-            quiz_obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-            existing_quiz = json.load(quiz_obj["Body"])
-        except ClientError:
-            existing_quiz = []
-
-        existing_quiz.append(quiz_entry)
-        s3.put_object(Bucket=settings.s3_bucket, Key=s3_key, Body=json.dumps(
-            existing_quiz, indent=2), ContentType="application/json")
+        # Conditional on the copy read, so questions added concurrently by
+        # another worker aren't overwritten.
+        object_cache.update_json(s3_key, lambda quiz: (quiz or []) + [quiz_entry])
         return {"question": question}
     except Exception as e:
         raise HTTPException(
@@ -200,8 +536,7 @@ def get_saved_quiz(filename: str, user=Depends(get_current_user)):
     base_name = os.path.splitext(filename)[0]
     s3_key = f"transcripts/{base_name}_quiz.json"
     try:
-        quiz_obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-        return {"quiz": json.load(quiz_obj["Body"])}
+        return {"quiz": object_cache.get_json(s3_key)}
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             return {"quiz": []}
@@ -214,25 +549,22 @@ def update_quiz_question(filename: str, update: EditQuizInput, user=Depends(get_
     """Updates a specific quiz question in S3."""
     base_name = os.path.splitext(filename)[0]
     s3_key = f"transcripts/{base_name}_quiz.json"
-    try:
-        quiz_obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-        quiz_data = json.load(quiz_obj["Body"])
-    except ClientError:
-        raise HTTPException(status_code=404, detail="Quiz file not found")
-
-    updated = False
-    for q in quiz_data:
-        if abs(q.get("timestamp", -1) - update.timestamp) < 0.01:
-            q["question"] = update.new_question
-            updated = True
-            break
 
-    if not updated:
+    def edit(quiz_data):
+        if quiz_data is None:
+            raise HTTPException(status_code=404, detail="Quiz file not found")
+        for q in quiz_data:
+            if abs(q.get("timestamp", -1) - update.timestamp) < 0.01:
+                q["question"] = update.new_question
+                return quiz_data
         raise HTTPException(
             status_code=404, detail="Quiz question with that timestamp not found")
 
-    s3.put_object(Bucket=settings.s3_bucket, Key=s3_key, Body=json.dumps(
-        quiz_data, indent=2), ContentType="application/json")
+    try:
+        object_cache.update_json(s3_key, edit)
+    except UpdateConflict:
+        raise HTTPException(
+            status_code=409, detail="The quiz is being edited elsewhere, please retry.")
     return {"message": "Quiz updated"}
 
 
@@ -241,22 +573,22 @@ def delete_quiz_question(filename: str, timestamp: float, user=Depends(get_curre
     """Deletes a specific quiz question from the file in S3."""
     base_name = os.path.splitext(filename)[0]
     s3_key = f"transcripts/{base_name}_quiz.json"
-    try:
-        quiz_obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-        quiz_data = json.load(quiz_obj["Body"])
-    except ClientError:
-        raise HTTPException(status_code=404, detail="Quiz file not found")
 
-    initial_length = len(quiz_data)
-    new_data = [q for q in quiz_data if abs(
-        q.get("timestamp", -1) - timestamp) > 0.01]
+    def remove(quiz_data):
+        if quiz_data is None:
+            raise HTTPException(status_code=404, detail="Quiz file not found")
+        new_data = [q for q in quiz_data if abs(
+            q.get("timestamp", -1) - timestamp) > 0.01]
+        if len(new_data) == len(quiz_data):
+            raise HTTPException(
+                status_code=404, detail="Quiz question with that timestamp not found")
+        return new_data
 
-    if len(new_data) == initial_length:
+    try:
+        object_cache.update_json(s3_key, remove)
+    except UpdateConflict:
         raise HTTPException(
-            status_code=404, detail="Quiz question with that timestamp not found")
-
-    s3.put_object(Bucket=settings.s3_bucket, Key=s3_key, Body=json.dumps(
-        new_data, indent=2), ContentType="application/json")
+            status_code=409, detail="The quiz is being edited elsewhere, please retry.")
     return {"message": "Question deleted"}
 
 
@@ -272,8 +604,7 @@ def save_note(filename: str, input_data: NoteInput, user=Depends(get_current_use
     base_name = os.path.splitext(os.path.basename(filename))[0]
     s3_key = f"transcripts/{base_name}_note.json"
     payload = {"email": user.email, "note": input_data.note}
-    s3.put_object(Bucket=settings.s3_bucket, Key=s3_key,
-                  Body=json.dumps(payload), ContentType="application/json")
+    object_cache.put(s3_key, json.dumps(payload))
     return {"message": "Note saved successfully"}
 
 
@@ -283,8 +614,7 @@ def get_note(filename: str, user=Depends(get_current_user)):
     base_name = os.path.splitext(os.path.basename(filename))[0]
     s3_key = f"transcripts/{base_name}_note.json"
     try:
-        note_obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-        data = json.load(note_obj["Body"])
+        data = object_cache.get_json(s3_key)
         if data.get("email") != user.email:
             raise HTTPException(403, "Unauthorized")
         return {"note": data.get("note", "")}
@@ -293,7 +623,7 @@ def get_note(filename: str, user=Depends(get_current_user)):
 
 
 @router.post("/api/transcript/{filename:path}/tag")
-def save_tag(filename: str, input_data: TagInput, user=Depends(get_current_user)):
+def save_tag(filename: str, input_data: TagInput, user=Depends(get_current_user), db: Session = Depends(get_db)):
     if user.role != "owner":
         raise HTTPException(
             status_code=403, detail="Only owners can edit notes/tags.")
@@ -302,8 +632,14 @@ def save_tag(filename: str, input_data: TagInput, user=Depends(get_current_user)
     base_name = os.path.splitext(os.path.basename(filename))[0]
     s3_key = f"transcripts/{base_name}_tag.json"
     payload = {"email": user.email, "tag": input_data.tag}
-    s3.put_object(Bucket=settings.s3_bucket, Key=s3_key,
-                  Body=json.dumps(payload), ContentType="application/json")
+    object_cache.put(s3_key, json.dumps(payload))
+    # The listing filters and returns tags from the row.
+    db.query(UserFile).filter(
+        UserFile.user_id == user.id,
+        or_(UserFile.filename == os.path.basename(filename),
+            UserFile.filename.like(f"{base_name}.%"))
+    ).update({UserFile.tag: input_data.tag or None}, synchronize_session=False)
+    db.commit()
     return {"message": "Tag saved successfully"}
 
 
@@ -313,8 +649,7 @@ def get_tag(filename: str, user=Depends(get_current_user)):
     base_name = os.path.splitext(os.path.basename(filename))[0]
     s3_key = f"transcripts/{base_name}_tag.json"
     try:
-        tag_obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-        data = json.load(tag_obj["Body"])
+        data = object_cache.get_json(s3_key)
         if data.get("email") != user.email:
             raise HTTPException(403, "Unauthorized")
         return {"tag": data.get("tag", "")}
@@ -325,22 +660,26 @@ def get_tag(filename: str, user=Depends(get_current_user)):
 
 
 @router.post("/api/transcript/{filename:path}/segments")
-async def save_segments(filename: str, data: dict, user=Depends(get_current_user)):
+def save_segments(filename: str, data: dict, background_tasks: BackgroundTasks, user=Depends(get_current_user), db: Session = Depends(get_db)):
     if user.role != "owner":
         raise HTTPException(
             status_code=403, detail="Only owners can edit transcript segments.")
 
-    """Updates the segments JSON file in S3."""
+    """Replaces the whole segments document; PATCH sends just the edits."""
     base_name = os.path.splitext(os.path.basename(filename))[0]
-    s3_key = f"transcripts/{base_name}.json"
-    segments_content = json.dumps(data.get("segments", []), indent=2)
+    segments = data.get("segments", [])
+    try:
+        segment_patches.validate_segments(segments)
+    except InvalidPatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
     try:
-        s3.put_object(
-            Bucket=settings.s3_bucket, Key=s3_key,
-            Body=segments_content.encode("utf-8"), ContentType="application/json"
-        )
-        return {"message": "Segments updated successfully"}
+        segment_patches.put_segment_objects(base_name, segments)
+        version = segment_patches.replace_segments(db, filename, segments)
+        # Only the chunks touched by the edit are re-embedded.
+        background_tasks.add_task(reindex_transcript, filename)
+        return FastJSONResponse(content={"message": "Segments updated successfully", "version": version},
+                            headers={"ETag": version_etag(version)})
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to save segments to S3: {str(e)}")
@@ -361,18 +700,20 @@ def suggest_text(data: dict, user=Depends(get_current_user)):
 
 
 @router.post("/api/transcript/{filename:path}/auto-segment")
-def auto_segment_transcript(filename: str, user=Depends(get_current_user)):
-    """Fetches a transcript from S3, uses OpenAI to segment it, and saves the new segments file to S3."""
+def auto_segment_transcript(filename: str, background_tasks: BackgroundTasks, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """Uses OpenAI to segment a transcript and saves the new segments to S3 and the database."""
     base_name = os.path.splitext(filename)[0]
     transcript_key = f"transcripts/{base_name}.txt"
-    segment_key = f"transcripts/{base_name}.json"
 
-    try:
-        txt_obj = s3.get_object(Bucket=settings.s3_bucket, Key=transcript_key)
-        text = txt_obj["Body"].read().decode("utf-8")
-    except ClientError:
-        raise HTTPException(
-            status_code=404, detail="Transcript file not found in S3.")
+    stored = _stored_transcript(db, filename)
+    if stored:
+        text = stored[0]
+    else:
+        try:
+            text = object_cache.get(transcript_key).decode("utf-8")
+        except ClientError:
+            raise HTTPException(
+                status_code=404, detail="Transcript file not found in S3.")
 
     prompt = f"Break this transcript into segments...Transcript:\n{text[:4000]}"
     try:
@@ -380,8 +721,9 @@ def auto_segment_transcript(filename: str, user=Depends(get_current_user)):
             model="gpt-4", messages=[{"role": "user", "content": prompt}])
         segments = json.loads(completion.choices[0].message.content.strip())
 
-        s3.put_object(Bucket=settings.s3_bucket, Key=segment_key, Body=json.dumps(
-            segments, indent=2), ContentType="application/json")
+        segment_patches.put_segment_objects(base_name, segments)
+        segment_patches.replace_segments(db, filename, segments)
+        background_tasks.add_task(reindex_transcript, filename)
         return {"message": "Segments generated and saved", "count": len(segments)}
     except Exception as e:
         raise HTTPException(
@@ -389,43 +731,87 @@ def auto_segment_transcript(filename: str, user=Depends(get_current_user)):
 
 
 @router.get("/api/share/{filename:path}", response_model=None)
-async def get_shared_transcript(filename: str) -> Dict[str, str]:
-    """Gets a transcript from S3, intended for a public-facing share link."""
+def get_shared_transcript(filename: str, db: Session = Depends(get_db)) -> Dict[str, str]:
+    """Gets a transcript for a public-facing share link (database first, then S3)."""
+    stored = _stored_transcript(db, filename)
+    if stored:
+        return {"transcript": stored[0]}
     base_name = os.path.splitext(os.path.basename(filename))[0]
     s3_key = f"transcripts/{base_name}.txt"
     try:
-        obj = s3.get_object(Bucket=settings.s3_bucket, Key=s3_key)
-        content = obj["Body"].read().decode("utf-8")
+        content = object_cache.get(s3_key).decode("utf-8")
         return {"transcript": content}
     except ClientError:
         raise HTTPException(
             status_code=404, detail="Shared transcript not found.")
 
 
-@router.get("/api/download/all")
-async def download_all_transcripts(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    """Downloads all of a user's transcripts from S3 into a single ZIP file."""
-    memory_file = io.BytesIO()
-    user_files = db.query(UserFile).filter(UserFile.email == user.email).all()
-
-    with ZipFile(memory_file, 'w') as zipf:
-        for file in user_files:
-            base_name = os.path.splitext(file.filename)[0]
-            transcript_s3_key = f"transcripts/{base_name}.txt"
-            arcname = f"{base_name}.txt"
-            try:
-                obj = s3.get_object(
-                    Bucket=settings.s3_bucket, Key=transcript_s3_key)
-                zipf.writestr(arcname, obj['Body'].read())
-            except ClientError:
-                print(
-                    f"Skipping {transcript_s3_key}, not found in S3 during ZIP creation.")
+def _fetch_export_objects(item):
+    """
+    One file's transcript and, if requested, segments. Segments come from
+    the database with pending patches folded in, so edits not yet compacted
+    to S3 are exported; S3 is the fallback for files not stored there.
+    """
+    filename, with_segments = item
+    base_name = os.path.splitext(filename)[0]
+    if with_segments:
+        db = SessionLocal()
+        try:
+            document = segment_patches.load_document(db, filename)
+        finally:
+            db.close()
+        if document:
+            return document[0].encode("utf-8"), document[1]
+    try:
+        text = read_object(f"transcripts/{base_name}.txt")
+    except ClientError:
+        print(f"Skipping transcripts/{base_name}.txt, not found in S3 during ZIP creation.")
+        return None, None
+    segments = None
+    if with_segments:
+        try:
+            segments = json.loads(read_object(f"transcripts/{base_name}.json"))
+        except ClientError:
+            segments = None
+    return text, segments
+
+
+def transcript_zip_response(filenames, archive_name: str, segments: str = None):
+    """
+    Stream a ZIP of transcripts as it is built. Objects are prefetched from
+    S3 a few at a time, so memory stays bounded and bytes start flowing
+    immediately. `segments` may be "json", "srt" or "json,srt".
+    """
+    formats = {f.strip().lower() for f in (segments or "").split(",") if f.strip()}
+    if formats - {"json", "srt"}:
+        raise HTTPException(
+            status_code=400, detail="segments must be 'json', 'srt' or 'json,srt'.")
+
+    items = [(name, bool(formats)) for name in filenames]
+
+    def entries():
+        for (filename, _), (text, segs) in prefetch_ordered(
+                items, _fetch_export_objects, window=settings.zip_export_prefetch):
+            base_name = os.path.splitext(filename)[0]
+            if text is None:
                 continue
+            yield f"{base_name}.txt", text
+            if segs is not None:
+                if "json" in formats:
+                    yield f"{base_name}.json", json.dumps(segs, indent=2).encode("utf-8")
+                if "srt" in formats:
+                    yield f"{base_name}.srt", segments_to_srt(segs).encode("utf-8")
 
-    memory_file.seek(0)
     return StreamingResponse(
-        memory_file,
+        stream_zip(entries()),
         media_type="application/zip",
-        headers={
-            "Content-Disposition": f"attachment; filename={user.email}_transcripts.zip"}
+        headers={"Content-Disposition": f"attachment; filename={archive_name}"}
     )
+
+
+@router.get("/api/download/all")
+def download_all_transcripts(segments: str = None, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    """Streams all of a user's transcripts from S3 as a single ZIP file."""
+    filenames = [f.filename for f in db.query(UserFile.filename).filter(
+        UserFile.email == user.email).order_by(UserFile.id)]
+    return transcript_zip_response(filenames, f"{user.email}_transcripts.zip", segments)
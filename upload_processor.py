@@ -1,15 +1,28 @@
 import os
 import json
-import subprocess
-from uuid import uuid4
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from openai import OpenAI
-import whisper
+from openai import OpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 import boto3
 from botocore.exceptions import ClientError
 from pinecone import Pinecone
 from config import settings
+from embedding_cache import embedding_cache, text_hash
+from s3_cache import object_cache
+from database import SessionLocal
+import segment_patches
+from artifact_compression import read_object, put_object
+from segment_store import CompactSegments, segment_index_key, CONTENT_TYPE as SEGMENTS_CONTENT_TYPE
+from chunking import chunk_segments, chunk_text, chunk_vector_id, count_tokens
+from vector_batches import batch_for_upsert
+from audio_processing import probe_media, decode_audio, encode_playback_audio, SAMPLE_RATE
+from transcription_engines import get_engine
 
 # --- Load .env first ---
 load_dotenv()
@@ -22,87 +35,360 @@ pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
 index = pc.Index("smartai-transcripts")
 
 # S3 client
-s3 = boto3.client("s3", region_name=settings.aws_region)
+s3 = boto3.client("s3", region_name=settings.aws_region,
+                  endpoint_url=settings.s3_endpoint_url)
 
 # --- Constants ---
 EMBED_MODEL = "text-embedding-3-small"
-CHUNK_SIZE = 500
+# The embeddings endpoint accepts up to 2048 inputs and 300k tokens per
+# request; stay comfortably under both.
+EMBED_BATCH_MAX_ITEMS = 1000
+EMBED_BATCH_MAX_TOKENS = 250_000
+EMBED_MAX_CONCURRENCY = 4
+# Pinecone caps upsert requests at 1000 vectors / 2 MB; batch well inside that.
+UPSERT_MAX_CONCURRENCY = 4
+# Reindexes of the same file are serialized on one of these.
+REINDEX_LOCKS = [threading.Lock() for _ in range(64)]
+REINDEX_MAX_PASSES = 3
+PINECONE_DELETE_BATCH = 1000
 
 # --- Pinecone and Embedding Functions (Refactored for S3) ---
 
 
-def chunk_text(text, chunk_size=CHUNK_SIZE):
-    """Break text into smaller chunks."""
-    chunks = []
-    current = ""
-    for line in text.splitlines():
-        if len(current) + len(line) < chunk_size:
-            current += line + "\n"
-        else:
-            chunks.append(current.strip())
-            current = line + "\n"
-    if current:
-        chunks.append(current.strip())
-    return chunks
-
-
 def embed_text(text):
     """Generate OpenAI embeddings for a text."""
-    response = client.embeddings.create(input=text, model=EMBED_MODEL)
-    return response.data[0].embedding
+    return embed_texts([text])[0]
+
+
+def batch_for_embedding(texts, max_items=EMBED_BATCH_MAX_ITEMS, max_tokens=EMBED_BATCH_MAX_TOKENS):
+    """Group texts into (offset, batch) pairs that respect the API limits."""
+    batches = []
+    start, tokens = 0, 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text)
+        if i > start and (i - start >= max_items or tokens + n > max_tokens):
+            batches.append((start, texts[start:i]))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        batches.append((start, texts[start:]))
+    return batches
+
+
+@retry(
+    retry=retry_if_exception_type(
+        (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)),
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+def _embed_batch(batch):
+    response = client.embeddings.create(input=batch, model=EMBED_MODEL)
+    return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+def _embed_uncached(texts):
+    """Send texts to the embeddings API in bounded, concurrent batches."""
+    batches = batch_for_embedding(list(texts))
+    embeddings = [None] * len(texts)
+
+    with ThreadPoolExecutor(max_workers=min(EMBED_MAX_CONCURRENCY, len(batches))) as pool:
+        results = pool.map(lambda b: (b[0], _embed_batch(b[1])), batches)
+        for offset, vectors in results:
+            embeddings[offset:offset + len(vectors)] = vectors
+
+    return embeddings
+
+
+def embed_texts(texts):
+    """
+    Embed many texts with as few API calls as possible.
+
+    Cached embeddings are reused; only distinct misses go upstream, split
+    into token/item-bounded batches sent with bounded concurrency. Rate
+    limits and transient errors back off and retry. Embeddings are returned
+    in input order.
+    """
+    if not texts:
+        return []
+
+    hashes = [text_hash(t) for t in texts]
+    found = embedding_cache.get_many(EMBED_MODEL, texts)
+
+    misses = list(dict.fromkeys(
+        t for t, h in zip(texts, hashes) if h not in found))
+    if misses:
+        fresh = _embed_uncached(misses)
+        embedding_cache.put_many(EMBED_MODEL, zip(misses, fresh))
+        found.update((text_hash(t), e) for t, e in zip(misses, fresh))
+
+    return [found[h] for h in hashes]
+
+
+@retry(wait=wait_random_exponential(min=1, max=20), stop=stop_after_attempt(4), reraise=True)
+def _upsert_batch(batch):
+    index.upsert(vectors=batch)
+
+
+def upsert_vectors(vectors):
+    """
+    Upsert vectors to Pinecone in size-bounded batches sent concurrently.
+
+    Each batch is retried on its own, so one bad request doesn't sink the
+    rest. Returns a summary with per-batch latency and any failures.
+    """
+    batches = batch_for_upsert(vectors)
+    summary = {"upserted": 0, "batches": len(batches), "failed": [], "latencies": []}
+    if not batches:
+        return summary
+
+    def send(numbered):
+        n, batch = numbered
+        start = time.perf_counter()
+        try:
+            _upsert_batch(batch)
+            return n, len(batch), time.perf_counter() - start, None
+        except Exception as e:
+            return n, len(batch), time.perf_counter() - start, e
 
+    with ThreadPoolExecutor(max_workers=min(UPSERT_MAX_CONCURRENCY, len(batches))) as pool:
+        for n, count, elapsed, error in pool.map(send, enumerate(batches)):
+            summary["latencies"].append(round(elapsed, 3))
+            if error:
+                print(f"❌ Pinecone batch {n + 1}/{len(batches)} failed after {elapsed:.2f}s: {error}")
+                summary["failed"].append(n)
+            else:
+                print(f"📦 Pinecone batch {n + 1}/{len(batches)}: {count} vectors in {elapsed:.2f}s")
+                summary["upserted"] += count
 
-def process_transcript_for_pinecone(s3_bucket: str, s3_key: str):
-    """Embed and upsert transcript data from S3 into Pinecone."""
+    return summary
+
+
+def list_vector_ids(base_name: str):
+    """All vector ids currently stored for a transcript."""
+    ids = set()
+    for page in index.list(prefix=f"{base_name}#"):
+        ids.update(page)
+    return ids
+
+
+def delete_vectors(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), PINECONE_DELETE_BATCH):
+        index.delete(ids=ids[i:i + PINECONE_DELETE_BATCH])
+
+
+def delete_transcript_vectors(base_name: str):
+    """Remove every vector belonging to a transcript."""
     try:
-        obj = s3.get_object(Bucket=s3_bucket, Key=s3_key)
-        full_text = obj['Body'].read().decode('utf-8')
-    except ClientError as e:
-        print(f"❌ Could not retrieve {s3_key} from S3: {e}")
-        return
+        delete_vectors(list_vector_ids(base_name))
+    except Exception as e:
+        print(f"❌ Could not delete vectors for {base_name}: {e}")
 
-    chunks = chunk_text(full_text)
-    print(f"📄 Found {len(chunks)} chunks in {s3_key}")
 
-    to_upsert = []
-    for chunk in chunks:
-        embedding = embed_text(chunk)
-        metadata = {"text": chunk, "source": s3_key}
-        to_upsert.append((str(uuid4()), embedding, metadata))
+def process_transcript_for_pinecone(s3_bucket: str, s3_key: str, segments=None, timings: dict = None, on_progress=None):
+    """
+    Bring a transcript's vectors in Pinecone up to date.
+
+    Chunks are built from Whisper `segments` when given, so each vector
+    carries the start/end time of the audio it covers; otherwise the plain
+    transcript text is fetched from S3 and chunked by sentence. Vector ids
+    are derived from (file, chunk hash), so only chunks that are new are
+    embedded and upserted, and chunks that disappeared are deleted.
+    Chunking, embedding and upsert seconds are added to `timings` if given.
+    """
+    timings = {} if timings is None else timings
+    if not segments:
+        try:
+            full_text = read_object(s3_key, bucket=s3_bucket).decode('utf-8')
+        except ClientError as e:
+            print(f"❌ Could not retrieve {s3_key} from S3: {e}")
+            return
+    with timed_stage(timings, "chunking", 0.85, on_progress):
+        if segments:
+            chunks = chunk_segments(segments)
+        else:
+            chunks = [{"text": c, "start": None, "end": None}
+                      for c in chunk_text(full_text)]
+
+    base_name = os.path.splitext(os.path.basename(s3_key))[0]
+    wanted = {chunk_vector_id(base_name, c): c for c in chunks if c["text"]}
 
-    if to_upsert:
+    try:
+        existing = list_vector_ids(base_name)
+    except Exception as e:
+        print(f"⚠️ Could not list existing vectors for {base_name}: {e}")
+        existing = set()
+
+    new_ids = [vector_id for vector_id in wanted if vector_id not in existing]
+    stale_ids = existing - wanted.keys()
+    print(f"📄 {len(wanted)} chunks in {s3_key}: "
+          f"{len(new_ids)} new, {len(stale_ids)} removed")
+
+    with timed_stage(timings, "embedding", 0.87, on_progress):
+        embeddings = embed_texts([wanted[i]["text"] for i in new_ids])
+    to_upsert = []
+    for vector_id, embedding in zip(new_ids, embeddings):
+        chunk = wanted[vector_id]
+        metadata = {"text": chunk["text"], "source": s3_key}
+        if chunk["start"] is not None:
+            metadata["start"] = chunk["start"]
+            metadata["end"] = chunk["end"]
+        to_upsert.append((vector_id, embedding, metadata))
+
+    with timed_stage(timings, "upserting", 0.95, on_progress):
+        summary = upsert_vectors(to_upsert)
+    summary["deleted"] = 0
+    if summary["failed"]:
+        # Keep the old vectors so search still has something to match.
+        print(f"❌ Pinecone upsert incomplete for {s3_key}: "
+              f"{len(summary['failed'])}/{summary['batches']} batches failed.")
+        return summary
+
+    if stale_ids:
         try:
-            index.upsert(vectors=to_upsert)
-            print(f"✅ Uploaded {len(to_upsert)} vectors to Pinecone.")
+            delete_vectors(stale_ids)
+            summary["deleted"] = len(stale_ids)
         except Exception as e:
-            print(f"❌ Pinecone upsert failed: {e}")
+            print(f"❌ Could not delete stale vectors for {s3_key}: {e}")
+    print(f"✅ Pinecone up to date for {s3_key}: "
+          f"{summary['upserted']} upserted, {summary['deleted']} deleted.")
+    return summary
+
+
+def _current_segments(filename: str):
+    """(version, segments) as stored now: database first, then S3."""
+    db = SessionLocal()
+    try:
+        document = segment_patches.load_document(db, filename)
+    finally:
+        db.close()
+    if document:
+        return document[2], document[1]
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    try:
+        return None, object_cache.get_json(f"transcripts/{base_name}.json")
+    except ClientError:
+        return None, None
+
+
+def original_segments_key(base_name: str) -> str:
+    """
+    Machine output as transcribed, never edited: what content-hash reuse
+    copies, so one owner's manual edits don't leak into another's copy.
+    """
+    return f"transcripts/{base_name}.orig.json"
+
+
+def has_original_segments(filename: str) -> bool:
+    """Whether an upload's pristine segments were kept, i.e. it can be reused."""
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    try:
+        s3.head_object(Bucket=settings.s3_bucket, Key=original_segments_key(base_name))
+        return True
+    except ClientError:
+        return False
+
+
+def reindex_transcript(filename: str):
+    """
+    Re-sync a transcript's vectors after its segments were edited.
+
+    Edits can schedule overlapping reindexes, so they run one at a time per
+    file and each indexes the segments stored when it starts, not the ones
+    its request saw; if another process saves a newer version meanwhile,
+    the pass is repeated so the newest edit's vectors win.
+    """
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    lock = REINDEX_LOCKS[hash(base_name) % len(REINDEX_LOCKS)]
+    with lock:
+        for _ in range(REINDEX_MAX_PASSES):
+            version, segments = _current_segments(filename)
+            summary = process_transcript_for_pinecone(
+                settings.s3_bucket, f"transcripts/{base_name}.txt", segments)
+            if version is None or _current_segments(filename)[0] == version:
+                break
+        return summary
 
 # --- Main Audio Transcription Function (Optimized for S3) ---
 
 
-async def transcribe_audio(file_path: str, filename: str):
+def _note_index_failures(summary, media: dict):
+    """Record failed upsert batches so the job reports incomplete indexing."""
+    if summary and summary["failed"]:
+        media["index_failed_batches"] = len(summary["failed"])
+        media["index_batches"] = summary["batches"]
+
+
+@contextmanager
+def timed_stage(timings: dict, stage: str, progress: float, on_progress=None):
+    """Record how long `stage` takes in `timings`, announcing it first."""
+    if on_progress:
+        on_progress(stage, progress, dict(timings))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
+
+
+async def transcribe_audio(file_path: str, filename: str, on_progress=None, timings: dict = None, media: dict = None,
+                           uploaded_key: str = None):
     """
     Transcribe an audio file and upload its assets to S3,
     then optionally process for semantic search.
+
+    `on_progress(stage, progress, timings, **extra)` is called as each stage
+    starts (and as transcription advances, with `percent` of audio done);
+    per-stage seconds are collected into `timings` and ffprobe details
+    (duration, codec, ...) into `media` if they are passed in.
+    `uploaded_key` names an S3 object that already holds the original
+    media (direct browser uploads), so it isn't uploaded again. Pinecone
+    batches that failed are counted in `media["index_failed_batches"]`.
     """
     print(f"🎧 Transcribing: {file_path}")
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Audio file not found: {file_path}")
 
-    # 1. Transcribe audio using Whisper
-    model = whisper.load_model("base")
-    result = model.transcribe(file_path)
-    print(f"✅ Transcription complete for {filename}")
-
-    full_text = result.get("text", "")
-    segments = result.get("segments", [])
+    timings = {} if timings is None else timings
+    media = {} if media is None else media
+
+    # 1. Decode to 16 kHz mono PCM once, then run the configured engine
+    with timed_stage(timings, "decoding", 0.02, on_progress):
+        media.update(await asyncio.to_thread(probe_media, file_path))
+        audio = await asyncio.to_thread(decode_audio, file_path)
+
+    engine = get_engine()
+    media["engine"] = engine.signature
+    # Near zero once the model is warm; shows cold starts in the timings.
+    with timed_stage(timings, "model_load", 0.04, on_progress):
+        await asyncio.to_thread(engine.preload)
+    audio_duration = len(audio) / SAMPLE_RATE
+
+    def on_audio_progress(fraction):
+        # Transcription spans 5%-70% of the job; report audio covered too.
+        if on_progress:
+            on_progress("transcribing", round(0.05 + 0.65 * fraction, 3), dict(timings),
+                        percent=round(100 * fraction, 1), audio_duration=round(audio_duration, 2))
+
+    with timed_stage(timings, "transcribing", 0.05, on_progress):
+        segments = await asyncio.to_thread(engine.transcribe, audio, on_audio_progress)
+    del audio
+    print(f"✅ Transcription complete for {filename} ({engine.signature})")
+
+    full_text = "".join(seg["text"] for seg in segments).strip()
     base_name = os.path.splitext(filename)[0]
 
     # 2. Prepare content and S3 keys
     transcript_key = f"transcripts/{base_name}.txt"
     segments_key = f"transcripts/{base_name}.json"
     audio_key = f"uploads/{filename}"
+    audio_path = file_path
+    if media.get("has_video") and settings.store_audio_only:
+        # Keep a compact audio rendition for playback instead of the video.
+        audio_key = f"uploads/{base_name}.m4a"
+        audio_path = os.path.join(os.path.dirname(file_path), f"{base_name}.m4a")
 
     formatted_segments = [
         {"start": round(seg["start"], 2), "end": round(
@@ -110,59 +396,106 @@ async def transcribe_audio(file_path: str, filename: str):
         for seg in segments
     ]
 
-    # 3. Upload all assets directly to S3
+    # 3. Upload all assets directly to S3. Stages recorded in `timings` are
+    # disjoint (no parent stage around sub-stages), so they can be summed.
     try:
-        s3.upload_file(file_path, settings.s3_bucket, audio_key)
-
-        s3.put_object(
-            Bucket=settings.s3_bucket,
-            Key=transcript_key,
-            Body=full_text.encode('utf-8'),
-            ContentType="text/plain",
-        )
-
-        s3.put_object(
-            Bucket=settings.s3_bucket,
-            Key=segments_key,
-            Body=json.dumps(formatted_segments, indent=2).encode('utf-8'),
-            ContentType="application/json",
-        )
+        if audio_path != file_path:
+            with timed_stage(timings, "encoding", 0.7, on_progress):
+                await asyncio.to_thread(encode_playback_audio, file_path, audio_path)
+        with timed_stage(timings, "upload_audio", 0.72, on_progress):
+            if audio_key != uploaded_key:
+                s3.upload_file(audio_path, settings.s3_bucket, audio_key)
+        media["stored_bytes"] = os.path.getsize(audio_path)
+
+        with timed_stage(timings, "upload_transcript", 0.8, on_progress):
+            # Written through the object cache so the first view is warm.
+            object_cache.put(transcript_key, full_text.encode('utf-8'),
+                             content_type="text/plain")
+            segments_body = json.dumps(formatted_segments, indent=2).encode('utf-8')
+            object_cache.put(segments_key, segments_body)
+            put_object(original_segments_key(base_name), segments_body,
+                       "application/json", client=s3)
+            object_cache.put(segment_index_key(base_name),
+                             CompactSegments.from_segments(formatted_segments).to_bytes(),
+                             content_type=SEGMENTS_CONTENT_TYPE)
 
         print(f"✅ Uploaded audio, transcript, segments to S3 for {filename}")
 
     except ClientError as e:
         print(f"❌ S3 upload failed: {e}")
         raise
+    finally:
+        if audio_path != file_path and os.path.exists(audio_path):
+            os.remove(audio_path)
 
-    # Push to Pinecone
-    process_transcript_for_pinecone(settings.s3_bucket, transcript_key)
+    # Push to Pinecone (records its own chunking/embedding/upserting stages)
+    summary = await asyncio.to_thread(
+        process_transcript_for_pinecone, settings.s3_bucket, transcript_key, formatted_segments,
+        timings, on_progress)
+    _note_index_failures(summary, media)
 
     # Compose S3 URLs for return
     audio_s3_url = f"https://{settings.s3_bucket}.s3.{settings.aws_region}.amazonaws.com/{audio_key}"
     transcript_s3_url = f"https://{settings.s3_bucket}.s3.{settings.aws_region}.amazonaws.com/{transcript_key}"
 
-    return full_text, formatted_segments, audio_s3_url, transcript_s3_url, ""
+    return full_text, formatted_segments, audio_s3_url, transcript_s3_url, audio_key
+
+
+async def reuse_transcript(source_filename: str, source_audio_key: str, filename: str,
+                           on_progress=None, timings: dict = None, media: dict = None):
+    """
+    Give `filename` its own copy of an already-transcribed upload with the
+    same audio content. Objects are copied server-side in S3 and vectors are
+    rebuilt from the embedding cache, so neither Whisper nor the embeddings
+    API is called. Returns the same tuple as `transcribe_audio`.
+
+    Segments come from the source's pristine machine output, not its
+    (possibly edited) current copy; sources transcribed before that was
+    kept raise NoSuchKey here (see `has_original_segments`).
+    """
+    timings = {} if timings is None else timings
+    media = {} if media is None else media
+    source_base = os.path.splitext(source_filename)[0]
+    base_name = os.path.splitext(filename)[0]
+    transcript_key = f"transcripts/{base_name}.txt"
+    segments_key = f"transcripts/{base_name}.json"
+    audio_key = None
+
+    def copy(source_key, dest_key):
+        s3.copy_object(Bucket=settings.s3_bucket, Key=dest_key,
+                       CopySource={"Bucket": settings.s3_bucket, "Key": source_key})
+
+    with timed_stage(timings, "copying", 0.3, on_progress):
+        copy(original_segments_key(source_base), original_segments_key(base_name))
+        copy(original_segments_key(source_base), segments_key)
+        # Segment edits never rewrite the .txt, so it is still machine output.
+        copy(f"transcripts/{source_base}.txt", transcript_key)
+        if source_audio_key:
+            audio_key = f"uploads/{base_name}{os.path.splitext(source_audio_key)[1]}"
+            copy(source_audio_key, audio_key)
+
+        object_cache.invalidate(transcript_key, segments_key)
+        full_text = object_cache.get(transcript_key).decode("utf-8")
+        segments = object_cache.get_json(segments_key)
+        object_cache.put(segment_index_key(base_name),
+                         CompactSegments.from_segments(segments).to_bytes(),
+                         content_type=SEGMENTS_CONTENT_TYPE)
+    print(f"♻️ Reused transcript of {source_filename} for {filename}")
+
+    summary = await asyncio.to_thread(
+        process_transcript_for_pinecone, settings.s3_bucket, transcript_key, segments,
+        timings, on_progress)
+    _note_index_failures(summary, media)
+
+    audio_s3_url = f"https://{settings.s3_bucket}.s3.{settings.aws_region}.amazonaws.com/{audio_key}" if audio_key else ""
+    transcript_s3_url = f"https://{settings.s3_bucket}.s3.{settings.aws_region}.amazonaws.com/{transcript_key}"
+
+    return full_text, segments, audio_s3_url, transcript_s3_url, audio_key
 
 
 def get_embedding_model():
     """Embedding helper (compatibility with legacy code)"""
     class Embedder:
         def embed_query(self, text: str):
-            response = client.embeddings.create(
-                input=[text], model=EMBED_MODEL)
-            return response.data[0].embedding
+            return embed_text(text)
     return Embedder()
-
-
-def extract_audio(input_path, output_path):
-    """Extract audio using ffmpeg."""
-    print(f"🎷 Extracting audio from {input_path} to {output_path}")
-    command = [
-        "ffmpeg", "-y", "-i", input_path,
-        "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", output_path
-    ]
-    try:
-        subprocess.run(command, check=True, capture_output=True, text=True)
-    except subprocess.CalledProcessError as e:
-        print(f"❌ FFmpeg error: {e.stderr}")
-        raise
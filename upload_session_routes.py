@@ -0,0 +1,319 @@
+# upload_session_routes.py
+#
+# Resumable uploads for large media:
+#   POST   /api/uploads                         -> create a session
+#   PUT    /api/uploads/{id}/chunks/{index}     -> send one numbered chunk
+#                                                  (X-Chunk-SHA256: hex digest)
+#   GET    /api/uploads/{id}                    -> which chunks/ranges arrived
+#   POST   /api/uploads/{id}/complete           -> verify hash, queue transcription
+#                                                  (idempotent once complete)
+#   DELETE /api/uploads/{id}                    -> abort
+
+import os
+import uuid
+import asyncio
+import hashlib
+import weakref
+from datetime import datetime, timedelta
+from typing import Optional
+
+import aiofiles
+from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from auth import get_current_user
+from dependencies import get_db
+from config import settings
+from database import SessionLocal
+from models import UploadSession, User, TranscriptionJob
+from json_responses import FastJSONResponse
+from job_queue import enqueue_upload, QueueFullError
+from utils import hash_file
+
+router = APIRouter()
+
+SESSION_DIR = os.path.join("uploads", "sessions")
+# One /complete at a time per session in this process; the row lock covers
+# other workers.
+_complete_locks = weakref.WeakValueDictionary()
+
+
+class CreateUploadSessionInput(BaseModel):
+    filename: str
+    size: int
+    sha256: Optional[str] = None
+
+
+def _part_path(session_id: str) -> str:
+    return os.path.join(SESSION_DIR, f"{session_id}.part")
+
+
+def _chunk_count(session: UploadSession) -> int:
+    return -(-session.total_size // session.chunk_size)
+
+
+def _received_ranges(session: UploadSession):
+    """Collapse received chunk indexes into [start, end) byte ranges."""
+    ranges = []
+    for index in sorted(session.received_chunks or []):
+        start = index * session.chunk_size
+        end = min(start + session.chunk_size, session.total_size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def _session_status(session: UploadSession):
+    received = session.received_chunks or []
+    return {
+        "session_id": session.id,
+        "filename": session.original_filename,
+        "size": session.total_size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": _chunk_count(session),
+        "received_chunks": received,
+        "received_ranges": _received_ranges(session),
+        "bytes_received": sum(end - start for start, end in _received_ranges(session)),
+        "status": session.status,
+        "job_id": session.job_id,
+    }
+
+
+def _get_session(db: Session, session_id: str, user: User) -> UploadSession:
+    session = db.query(UploadSession).filter(
+        UploadSession.id == session_id, UploadSession.user_id == user.id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    return session
+
+
+def _missing_part():
+    return HTTPException(
+        status_code=409, detail="Partial upload is missing on the server; start a new upload session.")
+
+
+def _completed_response(db: Session, session: UploadSession):
+    """The /complete response for a session that was already finalized."""
+    job = db.query(TranscriptionJob).filter(TranscriptionJob.id == session.job_id).first()
+    if not job:
+        raise HTTPException(status_code=409, detail="Upload session is closed.")
+    return FastJSONResponse(status_code=202, content={
+        "message": "File uploaded and queued for transcription",
+        "filename": job.filename,
+        "job_id": job.id,
+        "status": job.status,
+        "file_size": job.file_size,
+        "sha256": job.content_sha256
+    })
+
+
+def cleanup_stale_sessions(db: Session = None) -> int:
+    """Delete sessions (and their partial files) idle for longer than the TTL."""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - \
+            timedelta(hours=settings.upload_session_ttl_hours)
+        stale = db.query(UploadSession).filter(
+            UploadSession.updated_at < cutoff).all()
+        for session in stale:
+            path = _part_path(session.id)
+            if os.path.exists(path):
+                os.remove(path)
+            db.delete(session)
+        db.commit()
+        if stale:
+            print(f"🧹 Removed {len(stale)} stale upload sessions")
+        return len(stale)
+    finally:
+        if own_session:
+            db.close()
+
+
+@router.post("/api/uploads")
+def create_upload_session(input_data: CreateUploadSessionInput, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if user.role != "owner":
+        raise HTTPException(
+            status_code=403, detail="Only owners can upload files.")
+    if input_data.size <= 0:
+        raise HTTPException(status_code=400, detail="File is empty.")
+    if input_data.size > settings.max_resumable_upload_size:
+        raise HTTPException(status_code=413, detail="File too large.")
+
+    cleanup_stale_sessions(db)
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        original_filename=os.path.basename(input_data.filename),
+        total_size=input_data.size,
+        chunk_size=settings.upload_session_chunk_size,
+        expected_sha256=(input_data.sha256 or "").lower() or None,
+        received_chunks=[],
+        status="open",
+    )
+
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    with open(_part_path(session.id), "wb") as f:
+        f.truncate(session.total_size)
+
+    db.add(session)
+    db.commit()
+    return FastJSONResponse(status_code=201, content=_session_status(session))
+
+
+@router.get("/api/uploads/{session_id}")
+def get_upload_session(session_id: str, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    return _session_status(_get_session(db, session_id, user))
+
+
+@router.put("/api/uploads/{session_id}/chunks/{index}")
+async def put_upload_chunk(session_id: str, index: int, request: Request,
+                           x_chunk_sha256: Optional[str] = Header(None),
+                           user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Write one chunk at offset index * chunk_size. Re-sending a chunk is safe.
+    X-Chunk-SHA256 is required; a chunk whose bytes don't match it is not
+    marked received, so the client resends it.
+    """
+    if not x_chunk_sha256:
+        raise HTTPException(
+            status_code=428, detail="X-Chunk-SHA256 with the chunk's SHA-256 is required.")
+    session = _get_session(db, session_id, user)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail="Upload session is closed.")
+    if index < 0 or index >= _chunk_count(session):
+        raise HTTPException(status_code=416, detail="Chunk index out of range.")
+
+    offset = index * session.chunk_size
+    expected = min(session.chunk_size, session.total_size - offset)
+    path = _part_path(session.id)
+    # Don't hold a transaction open while the body streams in.
+    db.commit()
+
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(path, "r+b") as f:
+            await f.seek(offset)
+            async for data in request.stream():
+                written += len(data)
+                if written > expected:
+                    raise HTTPException(
+                        status_code=413, detail=f"Chunk {index} is larger than {expected} bytes.")
+                digest.update(data)
+                await f.write(data)
+    except FileNotFoundError:
+        raise _missing_part()
+
+    if written != expected:
+        raise HTTPException(
+            status_code=400, detail=f"Chunk {index} incomplete: got {written} of {expected} bytes.")
+    if digest.hexdigest() != x_chunk_sha256.strip().lower():
+        raise HTTPException(
+            status_code=422, detail=f"Chunk {index} checksum mismatch, please resend it.")
+
+    # Row lock so concurrent chunk PUTs don't lose each other's updates.
+    locked = db.query(UploadSession).filter(
+        UploadSession.id == session_id).with_for_update().first()
+    if not locked:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    received = set(locked.received_chunks or [])
+    received.add(index)
+    locked.received_chunks = sorted(received)
+    locked.updated_at = datetime.utcnow()
+    db.commit()
+
+    return {"session_id": session_id, "index": index, "offset": offset, "size": written,
+            "received": len(received), "chunk_count": _chunk_count(locked)}
+
+
+@router.post("/api/uploads/{session_id}/complete")
+async def complete_upload_session(session_id: str, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    """
+    Verify the assembled file and queue it for transcription. Calls are
+    serialized per session; once one succeeds, repeats return its job.
+    """
+    lock = _complete_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        return await _complete_upload_session(session_id, user, db)
+
+
+async def _complete_upload_session(session_id: str, user: User, db: Session):
+    _get_session(db, session_id, user)
+    session = db.query(UploadSession).filter(
+        UploadSession.id == session_id).with_for_update().first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    if session.status == "complete":
+        db.commit()
+        return _completed_response(db, session)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail="Upload session is closed.")
+
+    missing = sorted(set(range(_chunk_count(session))) -
+                     set(session.received_chunks or []))
+    if missing:
+        raise HTTPException(status_code=409, detail={
+                            "message": "Upload incomplete.", "missing_chunks": missing[:100]})
+
+    path = _part_path(session.id)
+    if not os.path.exists(path) or os.path.getsize(path) != session.total_size:
+        raise _missing_part()
+
+    try:
+        content_sha256 = await asyncio.to_thread(hash_file, path)
+    except FileNotFoundError:
+        raise _missing_part()
+    if session.expected_sha256 and content_sha256 != session.expected_sha256:
+        # Something arrived corrupted; make the client resend everything.
+        session.received_chunks = []
+        session.updated_at = datetime.utcnow()
+        db.commit()
+        raise HTTPException(
+            status_code=422, detail="Checksum mismatch, please upload the file again.")
+
+    extension = os.path.splitext(session.original_filename)[1]
+    unique_name = f"{uuid.uuid4().hex}{extension}"
+    final_path = os.path.join("uploads", unique_name)
+    try:
+        os.replace(path, final_path)
+    except FileNotFoundError:
+        raise _missing_part()
+
+    try:
+        job = enqueue_upload(db, user, unique_name, session.original_filename,
+                             session.total_size, content_sha256)
+    except QueueFullError:
+        # Keep the bytes so the client can simply retry /complete.
+        os.replace(final_path, path)
+        raise HTTPException(
+            status_code=503, detail="Transcription queue is full, please retry shortly.")
+
+    session.status = "complete"
+    session.job_id = job.id
+    session.updated_at = datetime.utcnow()
+    db.commit()
+
+    return FastJSONResponse(status_code=202, content={
+        "message": "File uploaded and queued for transcription",
+        "filename": unique_name,
+        "job_id": job.id,
+        "status": job.status,
+        "file_size": session.total_size,
+        "sha256": content_sha256
+    })
+
+
+@router.delete("/api/uploads/{session_id}")
+def abort_upload_session(session_id: str, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    session = _get_session(db, session_id, user)
+    path = _part_path(session.id)
+    if os.path.exists(path):
+        os.remove(path)
+    db.delete(session)
+    db.commit()
+    return {"message": "Upload session aborted."}
@@ -5,6 +5,9 @@ import secrets
 import hashlib
 import sqlite3
 from datetime import datetime
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
 from config import settings
 
 
@@ -21,6 +24,48 @@ def validate_file_extension(filename: str) -> bool:
     return ext in settings.allowed_extensions
 
 
+async def save_upload_stream(upload: UploadFile, dest_path: str, max_bytes: int = None, chunk_size: int = None):
+    """
+    Write an upload to disk chunk by chunk, enforcing the size limit as it
+    streams. Returns (size_in_bytes, sha256_hex). A partial file is removed
+    if the limit is exceeded or the write fails.
+    """
+    max_bytes = settings.max_file_size if max_bytes is None else max_bytes
+    chunk_size = chunk_size or settings.upload_chunk_size
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(dest_path, "wb") as out_file:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds the {max_bytes // 1_000_000} MB upload limit.")
+                digest.update(chunk)
+                await out_file.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    return size, digest.hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = None) -> str:
+    """sha256 hex digest of a file on disk, read in chunks."""
+    chunk_size = chunk_size or settings.upload_chunk_size
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def is_admin_user(email: str) -> bool:
     return email in settings.admin_emails
 
@@ -0,0 +1,35 @@
+# vector_batches.py
+
+import json
+
+# Pinecone rejects upsert requests over 2 MB; stay well under it.
+UPSERT_BATCH_MAX_VECTORS = 100
+UPSERT_BATCH_MAX_BYTES = 1_500_000
+# {"id": ..., "values": ..., "metadata": ...} keys, quotes and separators.
+VECTOR_JSON_OVERHEAD = 48
+
+
+def vector_size(vector) -> int:
+    """
+    JSON-encoded size of one (id, values, metadata) tuple, measured rather
+    than estimated: embedding floats such as 0.02354288473725319 take about
+    20 bytes each, so a fixed per-value guess undercounts badly.
+    """
+    vector_id, values, metadata = vector
+    return (len(json.dumps(vector_id)) + len(json.dumps(list(values)))
+            + len(json.dumps(metadata)) + VECTOR_JSON_OVERHEAD)
+
+
+def batch_for_upsert(vectors, max_vectors=UPSERT_BATCH_MAX_VECTORS, max_bytes=UPSERT_BATCH_MAX_BYTES):
+    """Split vectors into batches bounded by count and payload bytes."""
+    batches, current, current_bytes = [], [], 0
+    for vector in vectors:
+        size = vector_size(vector)
+        if current and (len(current) >= max_vectors or current_bytes + size > max_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(vector)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,90 @@
+# zip_export.py
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+import time
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that hands back what was written."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def prefetch_ordered(items, fetch, window: int = 8):
+    """
+    Yield (item, fetch(item)) in input order while keeping at most `window`
+    fetches in flight, so memory stays bounded however many items there are.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=window) as pool:
+        pending = deque()
+        for item in items:
+            pending.append((item, pool.submit(fetch, item)))
+            if len(pending) >= window:
+                break
+        while pending:
+            item, future = pending.popleft()
+            next_item = next(items, None)
+            if next_item is not None:
+                pending.append((next_item, pool.submit(fetch, next_item)))
+            yield item, future.result()
+
+
+def stream_zip(entries):
+    """
+    Build a ZIP archive incrementally from (arcname, bytes) pairs, yielding
+    compressed bytes as each member is written instead of buffering the
+    whole archive.
+    """
+    sink = _ChunkSink()
+    with ZipFile(sink, mode="w", compression=ZIP_DEFLATED) as zf:
+        for arcname, data in entries:
+            info = ZipInfo(arcname, date_time=time.localtime()[:6])
+            info.compress_type = ZIP_DEFLATED
+            with zf.open(info, mode="w") as member:
+                member.write(data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def _srt_timestamp(seconds: float) -> str:
+    millis = int(round(max(0.0, seconds) * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def segments_to_srt(segments) -> str:
+    """Render {"start", "end", "text"} segments as SubRip subtitles."""
+    blocks = []
+    for i, seg in enumerate(segments, 1):
+        blocks.append(
+            f"{i}\n{_srt_timestamp(seg.get('start') or 0)} --> "
+            f"{_srt_timestamp(seg.get('end') or 0)}\n{(seg.get('text') or '').strip()}\n")
+    return "\n".join(blocks)